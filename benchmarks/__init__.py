@@ -0,0 +1 @@
+# benchmarks — замеры производительности ядра MAS и сравнение с базовой линией (make bench)
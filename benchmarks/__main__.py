@@ -0,0 +1,119 @@
+# benchmarks/__main__.py — CLI: python -m benchmarks [-k PATTERN] [--save-baseline] (make bench)
+"""
+Прогон кейсов, запись результата в JSON и сравнение с базовой линией.
+
+  python -m benchmarks                  # все кейсы, сравнение с benchmarks/baseline.json
+  python -m benchmarks -k workflow      # только кейсы, чьё имя содержит «workflow»
+  python -m benchmarks --save-baseline  # прогон становится новой базовой линией
+  python -m benchmarks --list
+
+Код выхода 1 — регрессия медианы больше порога (--threshold) или упавший кейс;
+2 — нет базовой линии (--allow-missing-baseline — только записать результат).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from benchmarks import cases  # noqa: F401 — регистрирует кейсы
+from benchmarks.harness import (
+    DEFAULT_MIN_TIME_S,
+    DEFAULT_REPEAT,
+    DEFAULT_THRESHOLD,
+    ROOT,
+    compare,
+    environment_mismatch,
+    failures,
+    format_rows,
+    run_suite,
+    select,
+)
+
+BENCH_DIR = ROOT / "benchmarks"
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+RESULTS_DIR = BENCH_DIR / "results"
+
+
+def _progress(name: str, result: dict[str, Any]) -> None:
+    if result["status"] == "ok":
+        print(f"  {name:<40} {result['median_ms']:>12.4f} ms  (±{result['stdev_ms']:.4f}, {result['repeat']}×{result['number']})")
+    else:
+        print(f"  {name:<40} {result['status']}: {result['reason']}")
+
+
+def _write_json(path: Path, data: dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="python -m benchmarks", description="MAS benchmarks with a baseline regression gate")
+    p.add_argument("-k", dest="patterns", action="append", metavar="PATTERN", help="run only cases matching PATTERN (substring or glob; repeatable)")
+    p.add_argument("--list", action="store_true", help="list cases and exit")
+    p.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help=f"timed series per case (default: {DEFAULT_REPEAT})")
+    p.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME_S, help=f"minimal series duration, s (default: {DEFAULT_MIN_TIME_S})")
+    p.add_argument("--quick", action="store_true", help="smoke mode: --repeat 3 --min-time 0.02")
+    p.add_argument("--out", type=Path, help="results JSON (default: benchmarks/results/bench-<UTC time>.json)")
+    p.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    p.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help=f"allowed median slowdown, fraction (default: {DEFAULT_THRESHOLD})")
+    p.add_argument("--save-baseline", action="store_true", help="write this run to --baseline instead of comparing")
+    p.add_argument("--allow-missing-baseline", action="store_true", help="without a baseline only record results (exit 0)")
+    return p
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    selected = select(args.patterns)
+    if args.list:
+        for bench in selected:
+            print(f"{bench.name:<40} {bench.doc}")
+        return 0
+    if not selected:
+        print(f"no benchmark cases match {args.patterns}", file=sys.stderr)
+        return 2
+    repeat, min_time = (3, 0.02) if args.quick else (args.repeat, args.min_time)
+
+    print(f"Running {len(selected)} benchmark case(s)…")
+    report = run_suite(selected, repeat, min_time, progress=_progress)
+    out = args.out or RESULTS_DIR / f"bench-{datetime.now(UTC):%Y%m%dT%H%M%SZ}.json"
+    _write_json(out, report)
+    print(f"Results: {out}")
+    return _gate(args, report)
+
+
+def _gate(args: argparse.Namespace, report: dict[str, Any]) -> int:
+    """Код выхода по результату: сохранение базовой линии или сравнение с ней."""
+    broken = any(result["status"] == "error" for result in report["results"].values())
+    if args.save_baseline:
+        _write_json(args.baseline, report)
+        print(f"Baseline saved: {args.baseline}")
+        return 1 if broken else 0
+    if not args.baseline.exists():
+        if args.allow_missing_baseline:
+            print(f"No baseline at {args.baseline}: results recorded, nothing to compare")
+            return 1 if broken else 0
+        print(f"ERROR: no baseline at {args.baseline} — record one with `make bench-baseline` on the reference machine", file=sys.stderr)
+        return 2
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    for line in environment_mismatch(report["environment"], baseline.get("environment", {})):
+        print(f"WARNING: environment differs from baseline ({line}) — numbers are indicative only")
+    rows = compare(report, baseline, args.threshold)
+    print()
+    for line in format_rows(rows):
+        print(line)
+    failed = failures(rows)
+    if failed:
+        print(f"\nFAIL: {len(failed)} case(s) regressed beyond threshold or failed: {', '.join(row['name'] for row in failed)}")
+        return 1
+    print(f"\nOK: no regressions beyond {args.threshold:.0%} (per-case floors apply)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
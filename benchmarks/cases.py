@@ -0,0 +1,253 @@
+# benchmarks/cases.py — кейсы: WorkflowRunner (конструктор, plan, app_build), FlowMemory, EventBus, /contracts
+from __future__ import annotations
+
+import importlib
+import itertools
+import json
+import sys
+import tempfile
+import textwrap
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from functools import cache
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+from benchmarks.harness import ROOT, CaseUnavailableError, case
+from mas.core.bus import EventBus
+from mas.core.memory import MEMORY_BACKENDS, open_flow_memory
+from mas.core.workflow import WorkflowRunner
+
+APP_BUILD_YAML = ROOT / "configs" / "workflows" / "app_build.yaml"
+BENCH_AGENTS_PKG = "mas_bench_agents"
+REQUEST = {"project": "bench", "goal": "build a small CRUD service", "stack": {"backend": "fastapi", "frontend": "react"}}
+
+# Размеры состояния FlowMemory (число ключей) и число подписчиков EventBus
+MEMORY_SIZES = (100, 1_000, 10_000)
+FANOUT = (1, 10, 100)
+CONTRACTS_KB = 256
+
+# Агент-заглушка для шагов app_build: та же форма работы, что у настоящих —
+# прочитать вход, записать артефакт через RepoOps, вернуть payload
+_BENCH_AGENT = """
+    from mas.core.agent import AgentResult, BaseAgent
+    from mas.tools.repo import RepoOps
+
+
+    class Step(BaseAgent):
+        name = "{name}"
+
+        def run(self, input_data):
+            keys = sorted(input_data) if isinstance(input_data, dict) else []
+            body = "\\n".join(f"# {name}: {{key}}" for key in keys) + "\\n" + "x" * 2048
+            RepoOps(f"{{self.ctx.workspace}}/app").write_file("{name}.md", body)
+            return AgentResult(title="{name}", payload={{"agent": "{name}", "inputs": keys, "files": ["{name}.md"], "notes": ["n"] * 32}})
+"""
+
+# Каталоги фикстур держатся ссылкой до конца процесса (удаляются при выходе)
+_FIXTURE_DIRS: list[tempfile.TemporaryDirectory[str]] = []
+
+
+@cache
+def app_build_fixture() -> tuple[str, str, str]:
+    """
+    (agents_yaml, flow_yaml, agents_pkg): граф шагов configs/workflows/app_build.yaml
+    и пакет агентов-заглушек, по модулю на агента. Каталог живёт до конца процесса.
+    """
+    tmp = tempfile.TemporaryDirectory(prefix="mas-bench-agents-")
+    _FIXTURE_DIRS.append(tmp)
+    root = Path(tmp.name)
+    raw = yaml.safe_load(APP_BUILD_YAML.read_text(encoding="utf-8"))
+    # ключи name/steps могут оказаться на верхнем уровне (без отступа под workflow:) — берём шаги откуда есть
+    wf = raw.get("workflow") or raw
+    flow = {"workflow": {"name": wf.get("name", "app_build"), "steps": wf["steps"]}}
+    flow_yaml = root / "app_build.yaml"
+    flow_yaml.write_text(yaml.safe_dump(flow, sort_keys=False), encoding="utf-8")
+    pkg = root / BENCH_AGENTS_PKG
+    pkg.mkdir()
+    (pkg / "__init__.py").write_text("", encoding="utf-8")
+    agents: dict[str, dict[str, str]] = {}
+    for step in flow["workflow"]["steps"]:
+        name = step["agent"]
+        (pkg / f"{name}.py").write_text(textwrap.dedent(_BENCH_AGENT.format(name=name)).lstrip(), encoding="utf-8")
+        agents[name] = {"type": "Step"}
+    agents_yaml = root / "agents.yaml"
+    agents_yaml.write_text(yaml.safe_dump({"agents": agents}), encoding="utf-8")
+    sys.path.insert(0, str(root))
+    importlib.invalidate_caches()
+    return str(agents_yaml), str(flow_yaml), BENCH_AGENTS_PKG
+
+
+# --- WorkflowRunner ------------------------------------------------------
+
+
+@case("workflow.construct")
+@contextmanager
+def _construct(tmp: Path) -> Iterator[Callable[[], Any]]:
+    """WorkflowRunner(...) для app_build без кэша плана: YAML, валидация, компиляция DAG."""
+    agents, flow, pkg = app_build_fixture()
+
+    def op() -> None:
+        WorkflowRunner(str(tmp / "ws"), agents, flow, agents_pkg=pkg, plan_cache=False).close()
+
+    yield op
+
+
+@case("workflow.construct_cached")
+@contextmanager
+def _construct_cached(tmp: Path) -> Iterator[Callable[[], Any]]:
+    """WorkflowRunner(...) для app_build с тёплым кэшем плана."""
+    agents, flow, pkg = app_build_fixture()
+    WorkflowRunner(str(tmp / "ws"), agents, flow, agents_pkg=pkg).close()
+
+    def op() -> None:
+        WorkflowRunner(str(tmp / "ws"), agents, flow, agents_pkg=pkg).close()
+
+    yield op
+
+
+@case("workflow.plan")
+@contextmanager
+def _plan(tmp: Path) -> Iterator[Callable[[], Any]]:
+    """runner.plan() для app_build (запись plan в журнал)."""
+    agents, flow, pkg = app_build_fixture()
+    runner = WorkflowRunner(str(tmp / "ws"), agents, flow, agents_pkg=pkg)
+    try:
+        yield runner.plan
+    finally:
+        runner.close()
+
+
+@case("workflow.app_build", threshold=0.35)
+@contextmanager
+def _app_build(tmp: Path) -> Iterator[Callable[[], Any]]:
+    """Полный прогон app_build (16 шагов, агенты-заглушки): память, журнал, артефакты."""
+    agents, flow, pkg = app_build_fixture()
+    runner = WorkflowRunner(str(tmp / "ws"), agents, flow, agents_pkg=pkg)
+    try:
+        yield lambda: runner.run(REQUEST)
+    finally:
+        runner.close()
+
+
+# --- FlowMemory ----------------------------------------------------------
+
+
+def _step_value(i: int) -> dict[str, Any]:
+    return {"title": f"step {i}", "files": [f"app/{i}/{n}.py" for n in range(4)], "notes": "n" * 200}
+
+
+def _filled_memory(tmp: Path, backend: str, size: int) -> Any:
+    mem = open_flow_memory(str(tmp), backend, autoflush=False)
+    for i in range(size):
+        mem.set(f"step_{i}", _step_value(i))
+    mem.flush()
+    return mem
+
+
+def _memory_get(backend: str, size: int) -> None:
+    @case(f"memory.{backend}.get[{size}]")
+    @contextmanager
+    def factory(tmp: Path) -> Iterator[Callable[[], Any]]:
+        mem = _filled_memory(tmp, backend, size)
+        keys = [f"step_{i}" for i in range(0, size, max(1, size // 100))]
+
+        def op() -> None:
+            for key in keys:
+                mem.get(key)
+
+        try:
+            yield op
+        finally:
+            mem.close()
+
+    factory.__doc__ = f"FlowMemory({backend}): 100 get() при {size} ключах в состоянии."
+
+
+def _memory_set(backend: str, size: int) -> None:
+    @case(f"memory.{backend}.set_flush[{size}]", threshold=0.35)
+    @contextmanager
+    def factory(tmp: Path) -> Iterator[Callable[[], Any]]:
+        mem = _filled_memory(tmp, backend, size)
+        counter = itertools.count()
+
+        def op() -> None:
+            # как шаг раннера: одна запись и сброс на диск
+            mem.set(f"step_{next(counter) % size}", _step_value(size))
+            mem.flush()
+
+        try:
+            yield op
+        finally:
+            mem.close()
+
+    factory.__doc__ = f"FlowMemory({backend}): set() + flush() при {size} ключах в состоянии."
+
+
+for _backend in MEMORY_BACKENDS:
+    for _size in MEMORY_SIZES:
+        _memory_get(_backend, _size)
+        _memory_set(_backend, _size)
+
+
+# --- EventBus ------------------------------------------------------------
+
+
+def _bus_publish(subscribers: int) -> None:
+    @case(f"bus.publish[{subscribers}]")
+    @contextmanager
+    def factory(tmp: Path) -> Iterator[Callable[[], Any]]:
+        bus = EventBus(mode="sync")
+        patterns = ("step.done.backend", "step.*.backend", "step.#")
+        for i in range(subscribers):
+            bus.subscribe(patterns[i % len(patterns)], lambda event: None)
+        event = {"event": "step_done", "step": "backend", "output_hash": "0" * 64}
+
+        try:
+            yield lambda: bus.publish("step.done.backend", event)
+        finally:
+            bus.close()
+
+    factory.__doc__ = f"EventBus(sync).publish() с {subscribers} подписчиками (тема и шаблоны)."
+
+
+for _subscribers in FANOUT:
+    _bus_publish(_subscribers)
+
+
+# --- API -----------------------------------------------------------------
+
+
+def _contracts(mode: str) -> None:
+    @case(f"api.contracts[{mode}]", threshold=0.35)
+    @contextmanager
+    def factory(tmp: Path) -> Iterator[Callable[[], Any]]:
+        try:
+            from fastapi.testclient import TestClient  # noqa: PLC0415 — fastapi/httpx опциональны
+
+            from mas.server import api  # noqa: PLC0415
+        except ImportError as e:
+            raise CaseUnavailableError(f"fastapi test client is not available: {e}") from e
+        path = tmp / "CONTRACTS.json"
+        entries = [{"name": f"contract_{i}", "version": "1.0", "schema": {"type": "object", "fields": ["id", "name", "payload"]}} for i in range(CONTRACTS_KB * 10)]
+        path.write_text(json.dumps({"contracts": entries}, ensure_ascii=False), encoding="utf-8")
+        saved = api.CONTRACTS_PATH
+        api.CONTRACTS_PATH = path
+        try:
+            with TestClient(api.app) as client:
+
+                def op() -> None:
+                    response = client.get("/contracts", params={"mode": mode})
+                    response.raise_for_status()
+
+                yield op
+        finally:
+            api.CONTRACTS_PATH = saved
+
+    factory.__doc__ = f"GET /contracts?mode={mode} (TestClient, файл контрактов ~{CONTRACTS_KB} КиБ)."
+
+
+for _mode in ("raw", "parsed"):
+    _contracts(_mode)
@@ -0,0 +1,228 @@
+# benchmarks/harness.py — реестр кейсов, замер (timeit), метаданные окружения, сравнение с базовой линией
+from __future__ import annotations
+
+import fnmatch
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from importlib import metadata
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[1]
+# Рост медианы больше чем на 25% относительно базовой линии — регрессия
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_REPEAT = 5
+# Одна серия замера длится не меньше стольких секунд (timeit.autorange)
+DEFAULT_MIN_TIME_S = 0.2
+# Версии этих пакетов попадают в метаданные результата
+PACKAGES = ("pydantic", "PyYAML", "fastapi", "starlette", "httpx")
+
+# Кейс: фабрика контекста (временный каталог → измеряемая операция без аргументов)
+CaseFactory = Callable[[Path], AbstractContextManager[Callable[[], Any]]]
+
+
+class CaseUnavailableError(Exception):
+    """Кейс нельзя выполнить в этом окружении (нет опциональной зависимости, сломан конфиг)."""
+
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    factory: CaseFactory
+    threshold: float | None = None  # свой порог для шумных кейсов
+
+    @property
+    def doc(self) -> str:
+        return (self.factory.__doc__ or "").strip().split("\n", 1)[0]
+
+
+CASES: dict[str, Case] = {}
+
+
+def case(name: str, threshold: float | None = None) -> Callable[[CaseFactory], CaseFactory]:
+    """Регистрирует кейс; имя — «группа.операция[параметр]», по нему работает фильтр -k."""
+
+    def register(factory: CaseFactory) -> CaseFactory:
+        if name in CASES:
+            raise ValueError(f"duplicate benchmark case: {name!r}")
+        CASES[name] = Case(name, factory, threshold)
+        return factory
+
+    return register
+
+
+def select(patterns: list[str] | None) -> list[Case]:
+    """Кейсы в порядке регистрации; patterns — glob или подстрока имени."""
+    if not patterns:
+        return list(CASES.values())
+    return [c for c in CASES.values() if any(p in c.name or fnmatch.fnmatchcase(c.name, p) for p in patterns)]
+
+
+# --- замер ---------------------------------------------------------------
+
+
+def measure(op: Callable[[], Any], repeat: int = DEFAULT_REPEAT, min_time_s: float = DEFAULT_MIN_TIME_S) -> dict[str, Any]:
+    """
+    Время одного вызова op в мс: после прогревочного вызова число вызовов в
+    серии подбирается так, чтобы серия шла не меньше min_time_s (редкие дорогие
+    вызовы — компакция журнала, сброс кэша — усредняются внутри серии), затем
+    repeat серий. Сравнение с базовой линией — по медиане.
+    """
+    op()  # прогрев: импорты, кэши, отложенная работа после наполнения состояния
+    timer = timeit.Timer(op)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time_s:
+            break
+        number = max(number * 2, int(number * min_time_s / elapsed * 1.1) if elapsed > 0 else number * 10)
+    samples = [t / number * 1000 for t in timer.repeat(repeat, number)]
+    ordered = sorted(samples)
+    return {
+        "median_ms": round(statistics.median(samples), 6),
+        "min_ms": round(ordered[0], 6),
+        "max_ms": round(ordered[-1], 6),
+        "mean_ms": round(statistics.fmean(samples), 6),
+        "stdev_ms": round(statistics.stdev(samples), 6) if len(samples) > 1 else 0.0,
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def run_case(bench: Case, repeat: int = DEFAULT_REPEAT, min_time_s: float = DEFAULT_MIN_TIME_S) -> dict[str, Any]:
+    """Результат кейса: статистика замера, либо status=skipped/error с причиной."""
+    with tempfile.TemporaryDirectory(prefix="mas-bench-") as tmp:
+        try:
+            with bench.factory(Path(tmp)) as op:
+                return {"status": "ok", **measure(op, repeat, min_time_s)}
+        except CaseUnavailableError as e:
+            return {"status": "skipped", "reason": str(e)}
+        except Exception as e:
+            return {"status": "error", "reason": f"{type(e).__name__}: {e}"}
+
+
+def run_suite(
+    cases: list[Case],
+    repeat: int = DEFAULT_REPEAT,
+    min_time_s: float = DEFAULT_MIN_TIME_S,
+    progress: Callable[[str, dict[str, Any]], None] | None = None,
+) -> dict[str, Any]:
+    results: dict[str, Any] = {}
+    started = time.perf_counter()
+    for bench in cases:
+        results[bench.name] = run_case(bench, repeat, min_time_s)
+        if progress is not None:
+            progress(bench.name, results[bench.name])
+    return {
+        "environment": environment(),
+        "config": {"repeat": repeat, "min_time_s": min_time_s, "elapsed_s": round(time.perf_counter() - started, 3)},
+        "results": results,
+    }
+
+
+# --- окружение -----------------------------------------------------------
+
+
+def _git(*args: str) -> str | None:
+    try:
+        out = subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, timeout=10, check=True)  # noqa: S603,S607
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip()
+
+
+def _package_versions() -> dict[str, str]:
+    versions: dict[str, str] = {}
+    for name in PACKAGES:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            continue
+    return versions
+
+
+def environment() -> dict[str, Any]:
+    """Где и на чём сняты цифры: без этого сравнение с базовой линией не имеет смысла."""
+    version_file = ROOT / "VERSION"
+    status = _git("status", "--porcelain", "--untracked-files=no")
+    return {
+        "timestamp": datetime.now(UTC).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor() or None,
+        "cpu_count": os.cpu_count(),
+        "gil_enabled": getattr(sys, "_is_gil_enabled", lambda: True)(),
+        "version": version_file.read_text(encoding="utf-8").strip() if version_file.exists() else None,
+        "git_commit": _git("rev-parse", "HEAD"),
+        "git_dirty": bool(status) if status is not None else None,
+        "packages": _package_versions(),
+    }
+
+
+# Различия в этих полях делают сравнение с базовой линией ориентировочным
+_COMPARABLE_KEYS = ("python", "implementation", "machine", "cpu_count", "gil_enabled")
+
+
+def environment_mismatch(current: dict[str, Any], baseline: dict[str, Any]) -> list[str]:
+    return [f"{key}: {baseline.get(key)} -> {current.get(key)}" for key in _COMPARABLE_KEYS if baseline.get(key) != current.get(key)]
+
+
+# --- сравнение -----------------------------------------------------------
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any], threshold: float = DEFAULT_THRESHOLD) -> list[dict[str, Any]]:
+    """
+    Построчное сравнение медиан текущего прогона с базовой линией.
+    status: regression (рост больше порога), improvement (падение больше порога),
+    ok, new (нет в базовой линии), skipped (кейс не измерен в одном из прогонов),
+    error (кейс упал сейчас). Порог кейса (case(..., threshold=)) — нижняя граница
+    для шумных кейсов: общий порог может быть только строже для остальных.
+    """
+    base_results = baseline.get("results", {})
+    rows = []
+    for name, result in current.get("results", {}).items():
+        base = base_results.get(name)
+        bench = CASES.get(name)
+        limit = max(threshold, bench.threshold) if bench is not None and bench.threshold is not None else threshold
+        row: dict[str, Any] = {"name": name, "threshold": limit, "current_ms": result.get("median_ms"), "baseline_ms": None, "ratio": None}
+        if result.get("status") == "error":
+            row["status"] = "error"
+        elif base is None:
+            row["status"] = "new"
+        elif result.get("status") != "ok" or base.get("status") != "ok":
+            row["status"] = "skipped"
+            row["baseline_ms"] = base.get("median_ms")
+        else:
+            row["baseline_ms"] = base["median_ms"]
+            ratio = result["median_ms"] / base["median_ms"] if base["median_ms"] > 0 else 1.0
+            row["ratio"] = round(ratio, 4)
+            row["status"] = "regression" if ratio > 1 + limit else "improvement" if ratio < 1 - limit else "ok"
+        rows.append(row)
+    return rows
+
+
+def failures(rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Строки, из-за которых make bench завершается с ошибкой."""
+    return [row for row in rows if row["status"] in ("regression", "error")]
+
+
+def format_rows(rows: list[dict[str, Any]]) -> Iterator[str]:
+    width = max((len(row["name"]) for row in rows), default=10)
+    yield f"{'case':<{width}}  {'baseline ms':>12}  {'current ms':>12}  {'ratio':>7}  status"
+    for row in rows:
+        base = f"{row['baseline_ms']:.4f}" if row["baseline_ms"] is not None else "-"
+        cur = f"{row['current_ms']:.4f}" if row["current_ms"] is not None else "-"
+        ratio = f"{row['ratio']:.2f}x" if row["ratio"] is not None else "-"
+        yield f"{row['name']:<{width}}  {base:>12}  {cur:>12}  {ratio:>7}  {row['status']}"
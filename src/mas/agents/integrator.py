@@ -10,6 +10,8 @@ from mas.tools.repo import RepoOps
 
 class Integrator(BaseAgent):
     name = "integrator"
+    # пишет файлы в workspace — выход из StepCache их не восстановит
+    cacheable = False
 
     def run(self, input_data: dict[str, Any]) -> AgentResult:
         app_dir = f"{self.ctx.workspace}/app"
@@ -1,8 +1,15 @@
 # mas/cli.py — CLI оболочка поверх WorkflowRunner
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import json
+
 import click
 
+from mas.core.bus_socket import DEFAULT_SOCKET, EventBroker, SocketBus
+from mas.core.eventlog import EventLog
+from mas.core.memory import SQLiteFlowMemory
 from mas.core.workflow import WorkflowRunner
 
 
@@ -14,18 +21,155 @@ def main():
 
 @main.command()
 @click.option("--workflow", required=True, type=click.Path(exists=True))
-@click.option("--request", required=True, type=click.Path(exists=True))
+@click.option("--request", default=None, type=click.Path(exists=True), help="JSON-заявка (один запуск).")
+@click.option("--requests", "requests_jsonl", default=None, type=click.Path(exists=True, dir_okay=False), help="JSONL с заявками (пакетный режим).")
+@click.option("--results", default=None, type=click.Path(dir_okay=False), help="Куда писать результаты пакета (по умолчанию <workspace>/results.jsonl).")
+@click.option("--batch-workers", default=None, type=click.IntRange(min=1), help="Число заявок, выполняемых одновременно в пакетном режиме.")
 @click.option("--agents", default="configs/agents.yaml", type=click.Path(exists=True))
+@click.option("--agents-pkg", default="mas.agents", show_default=True, help="Пакет с модулями агентов.")
 @click.option("--workspace", default="workspace", type=click.Path())
 @click.option(
     "--skip-optional",
     multiple=True,
     help="IDs шагов для пропуска (можно указывать несколько).",
 )
-def run(workflow, request, agents, workspace, skip_optional):
-    runner = WorkflowRunner(workspace, agents, workflow)
-    result = runner.run(request, skip_optional=skip_optional)
-    click.echo(result)
+@click.option("--max-workers", default=None, type=click.IntRange(min=1), help="Размер пула для независимых шагов (1 — последовательно).")
+@click.option("--executor", default="thread", type=click.Choice(["thread", "process"]), help="Пул исполнения шагов.")
+@click.option("--cache/--no-cache", default=False, help="Брать неизменные шаги из кэша (workspace/.cache/steps).")
+@click.option("--flush-every", default=1, type=click.IntRange(min=0), help="Сбрасывать flow_state.json каждые N шагов (0 — в конце).")
+@click.option("--memory-backend", default=None, type=click.Choice(["json", "sqlite", "journal"]), help="Хранилище памяти потока (по умолчанию — из workspace/mas.yaml или json).")
+@click.option("--process-workers", default=None, type=click.IntRange(min=1), help="Размер тёплого пула процессов для агентов с executor: process.")
+@click.option("--plan-cache/--no-plan-cache", default=True, help="Переиспользовать скомпилированный план (workspace/.cache/plans) между запусками.")
+@click.option("--resume", default=None, metavar="RUN_ID", help="Продолжить прерванный запуск (заявка — из журнала, если не задан --request).")
+@click.option("--bus-socket", default=None, type=click.Path(), help=f"Публиковать события запуска в брокер mas bus-broker (обычно {DEFAULT_SOCKET}).")
+@click.option("--blob-threshold", default=None, type=click.IntRange(min=0), help="Выносить значения выходов шагов от N байт в workspace/.blobs (0 — выключено).")
+@click.option("--profile", default=None, type=click.Choice(["cpu", "mem", "both"]), help="Профилировать шаги (cProfile/tracemalloc) в workspace/logs/profiles/<run_id>/.")
+@click.option("--trace", is_flag=True, default=False, help="Трасса запуска (span шагов, инструментов, записи файлов) в workspace/logs/traces/: OTLP JSON и chrome://tracing.")
+def run(
+    workflow,
+    request,
+    requests_jsonl,
+    results,
+    batch_workers,
+    agents,
+    agents_pkg,
+    workspace,
+    skip_optional,
+    max_workers,
+    executor,
+    cache,
+    flush_every,
+    memory_backend,
+    process_workers,
+    plan_cache,
+    resume,
+    bus_socket,
+    blob_threshold,
+    profile,
+    trace,
+):
+    if resume is not None:
+        if requests_jsonl is not None:
+            raise click.UsageError("--resume несовместим с --requests")
+    elif (request is None) == (requests_jsonl is None):
+        raise click.UsageError("укажите ровно одно из --request или --requests")
+    with contextlib.ExitStack() as stack:
+        runner = WorkflowRunner(
+            workspace,
+            agents,
+            workflow,
+            agents_pkg=agents_pkg,
+            max_workers=max_workers,
+            executor=executor,
+            step_cache=cache,
+            flush_every=flush_every,
+            memory_backend=memory_backend,
+            plan_cache=plan_cache,
+            process_workers=process_workers,
+            bus=_connect_bus(stack, bus_socket),
+            blob_threshold=blob_threshold,
+            profile=profile,
+            trace=trace,
+        )
+        if requests_jsonl is not None:
+            # 🆕: пакетный режим — workflow и реестр агентов разбираются один раз
+            click.echo(runner.run_many(requests_jsonl, results_path=results, max_workers=batch_workers, step_workers=max_workers or 1, skip_optional=skip_optional))
+            return
+        if resume is not None:
+            # 🆕: выполненные шаги проверяются по хэшам журнала и не перезапускаются
+            click.echo(runner.resume(resume, request, skip_optional=skip_optional or None))
+            return
+        result = runner.run(request, skip_optional=skip_optional)
+        click.echo(result)
+
+
+def _connect_bus(stack: contextlib.ExitStack, bus_socket: str | None) -> SocketBus | None:
+    """🆕: Шина к брокеру событий; мониторинг вспомогательный — без брокера запуск идёт как обычно."""
+    if bus_socket is None:
+        return None
+    try:
+        return stack.enter_context(SocketBus(bus_socket))
+    except (ConnectionError, RuntimeError) as e:
+        click.echo(f"warning: {e}; events are not published", err=True)
+        return None
+
+
+@main.command("bus-broker")
+@click.option("--socket", "socket_path", default=DEFAULT_SOCKET, show_default=True, type=click.Path())
+@click.option("--log", "log_dir", default=None, type=click.Path(file_okay=False), help="Каталог журнала событий (например, workspace/.monitor/events).")
+@click.option("--log-segments", default=None, type=click.IntRange(min=1), help="Хранить не больше N сегментов журнала.")
+@click.option("--log-max-age", default=None, type=click.FloatRange(min=0), help="Удалять сегменты журнала старше N секунд.")
+def bus_broker(socket_path, log_dir, log_segments, log_max_age):
+    """Локальный брокер событий: раздаёт события mas run (--bus-socket) мониторингу и API."""
+    log = EventLog(log_dir, max_segments=log_segments, max_age_s=log_max_age) if log_dir else None
+    click.echo(f"bus broker listening on {socket_path}")
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(EventBroker(socket_path, log=log).serve())
+    if log is not None:
+        log.close()
+
+
+@main.command("events")
+@click.option("--log", "log_dir", required=True, type=click.Path(exists=True, file_okay=False), help="Каталог журнала событий брокера.")
+@click.option("--from", "from_offset", default=None, type=click.IntRange(min=0), help="Начать с offset.")
+@click.option("--since", default=None, type=float, help="Начать с момента времени (Unix time, с).")
+@click.option("--topic", default="#", show_default=True, help="Шаблон темы (step.#, run.*, ...).")
+def events(log_dir, from_offset, since, topic):
+    """Печатает события из журнала брокера в JSONL (offset, ts, topic, event)."""
+    log = EventLog(log_dir, readonly=True)
+    for record in log.read(from_offset, since=since, pattern=topic):
+        click.echo(json.dumps({"offset": record.offset, "ts": record.ts, "topic": record.topic, "event": record.event}, ensure_ascii=False))
+
+
+def _last_journal_run(workspace):
+    """run_id последнего run_start в журнале workspace/logs/workflow.jsonl (None — запусков не было)."""
+    last = None
+    with contextlib.suppress(FileNotFoundError), open(f"{workspace}/logs/workflow.jsonl", encoding="utf-8") as f:
+        for line in f:
+            with contextlib.suppress(ValueError):
+                record = json.loads(line)
+                if isinstance(record, dict) and record.get("event") == "run_start" and record.get("run_id"):
+                    last = record["run_id"]
+    return last
+
+
+@main.command("memory-import")
+@click.option("--workspace", default="workspace", type=click.Path(exists=True, file_okay=False))
+@click.option("--json-path", default=None, type=click.Path(exists=True, dir_okay=False), help="По умолчанию <workspace>/flow_state.json.")
+@click.option(
+    "--run-id",
+    default=None,
+    help="Запуск, в который импортировать. По умолчанию — последний запуск из журнала workspace: его продолжает mas run --resume RUN_ID --memory-backend sqlite.",
+)
+def memory_import(workspace, json_path, run_id):
+    """Переносит flow_state.json в SQLite-память (flow_state.sqlite3)."""
+    src = json_path or f"{workspace}/flow_state.json"
+    # 🆕: flow_state.json хранит состояние последнего запуска — импортируем под его run_id,
+    # иначе resume() не найдёт выходы шагов в SQLite-памяти
+    run_id = run_id or _last_journal_run(workspace) or "imported"
+    with SQLiteFlowMemory(f"{workspace}/flow_state.sqlite3", run_id=run_id) as mem:
+        count = mem.import_json(src)
+    click.echo(f"imported {count} keys into run {run_id}")
 
 
 if __name__ == "__main__":
@@ -1,29 +1,143 @@
 # core/agent.py — минимальная, но полная реализация базовых сущностей
 from __future__ import annotations
 
+import asyncio
+import copy
+from collections.abc import Mapping
 from typing import Any
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
+from mas.core.cancel import CancelToken
+
+
+class AgentContextSchema(BaseModel):
+    """🆕: Схема AgentContext — для валидации на границе (model_validate), не на каждом шаге."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
 
-class AgentContext(BaseModel):
     workspace: str
-    memory: dict[str, Any] = {}  # простая in-memory мапа; файловая память в FlowMemory
+    memory: dict[str, Any] = {}
+    cancel_token: CancelToken | None = None
 
 
-class AgentResult(BaseModel):
+class AgentResultSchema(BaseModel):
+    """🆕: Схема AgentResult — по ней AgentResult.coerce() проверяет «чужие» результаты."""
+
     title: str
     payload: dict[str, Any]
 
 
+class _Slotted:
+    """
+    🆕: Лёгкая замена pydantic-модели: __slots__, без копирования и проверок
+    при создании. Оставлены методы, которыми пользовались агенты и раннер
+    (model_copy, model_dump, model_validate), — существующий код не меняется.
+    """
+
+    __slots__ = ()
+    _schema: type[BaseModel]
+
+    def model_copy(self, *, update: Mapping[str, Any] | None = None, deep: bool = False) -> Any:
+        """Поверхностная копия (как у pydantic); значения из update подставляются без проверки."""
+        clone = object.__new__(type(self))
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if deep:
+                value = copy.deepcopy(value)
+            object.__setattr__(clone, name, value)
+        for name, value in (update or {}).items():
+            setattr(clone, name, value)
+        return clone
+
+    def model_dump(self) -> dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def model_validate(cls, obj: Any) -> Any:
+        """Полная проверка по схеме: mapping или объект с нужными атрибутами."""
+        data = obj.model_dump() if isinstance(obj, _Slotted) else obj
+        model = cls._schema.model_validate(data, from_attributes=not isinstance(data, Mapping))
+        return cls(**{name: getattr(model, name) for name in cls.__slots__})
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class AgentContext(_Slotted):
+    """
+    Контекст шага. 🆕: обычный класс со __slots__ — раннер создаёт копию на
+    каждую попытку (свой cancel_token), и pydantic здесь был заметен в профиле.
+    """
+
+    __slots__ = ("workspace", "memory", "cancel_token")
+    _schema = AgentContextSchema
+
+    def __init__(self, workspace: str, memory: dict[str, Any] | None = None, cancel_token: CancelToken | None = None):
+        self.workspace = workspace
+        # простая in-memory мапа; файловая память в FlowMemory. 🆕: своя у каждого контекста
+        self.memory: dict[str, Any] = {} if memory is None else memory
+        # 🆕: токен кооперативной отмены попытки шага (таймаут / WorkflowRunner.cancel())
+        self.cancel_token = cancel_token
+
+
+class AgentResult(_Slotted):
+    """
+    Результат шага. 🆕: payload хранится по ссылке — тот же dict уходит в
+    память потока и во вход следующих шагов без копирования. Проверка типов —
+    в AgentResult.coerce() на границе раннера, а не в конструкторе.
+    """
+
+    __slots__ = ("title", "payload")
+    _schema = AgentResultSchema
+
+    def __init__(self, title: str, payload: dict[str, Any]):
+        self.title = title
+        self.payload = payload
+
+    @classmethod
+    def coerce(cls, value: Any) -> AgentResult:
+        """
+        🆕: Результат агента на границе раннера. Корректный AgentResult
+        возвращается как есть (без копии payload); dict, pydantic-модель или
+        объект с title/payload проверяются по схеме (pydantic.ValidationError).
+        """
+        if type(value) is cls and type(value.title) is str and type(value.payload) is dict:
+            return value
+        return cls.model_validate(value)
+
+
 class BaseAgent:
     name: str = "base"
+    # 🆕: версия входит в ключ StepCache — увеличьте при изменении логики агента
+    version: str = "0"
+    # 🆕: False — шаг никогда не берётся из кэша (например, важны побочные эффекты)
+    cacheable: bool = True
 
     def __init__(self, ctx: AgentContext):
         self.ctx = ctx
 
     def run(self, input_data: dict[str, Any]) -> AgentResult:  # pragma: no cover
+        # 🆕: агент, реализующий только arun(), работает и в синхронном раннере
+        if type(self).arun is not BaseAgent.arun:
+            return asyncio.run(self.arun(input_data))
         raise NotImplementedError
 
+    async def arun(self, input_data: dict[str, Any]) -> AgentResult:
+        """
+        🆕: Асинхронная точка входа (AsyncWorkflowRunner). По умолчанию
+        синхронный run() выполняется в потоке, не блокируя event loop;
+        агенты с I/O могут переопределить arun() нативно.
+        """
+        return await asyncio.to_thread(self.run, input_data)
+
 
 # NOTE: ничего не меняли по API; только сделали валидный код и оставили точку расширения.
@@ -0,0 +1,177 @@
+# core/async_workflow.py — asyncio-раннер поверх WorkflowRunner
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from collections.abc import Awaitable, Iterable
+from contextlib import suppress
+from functools import partial
+from typing import Any
+
+from mas.core.agent import AgentContext, AgentResult
+from mas.core.cancel import CancelToken, RunCancelledError, StepTimeoutError
+from mas.core.tracing import traced_acall
+from mas.core.workflow import CANCEL_POLL_S, DagSchedule, FanOut, StepAttempt, WorkflowRunner
+
+
+class AsyncWorkflowRunner(WorkflowRunner):
+    """
+    Выполняет workflow в event loop: шаги — asyncio-задачи, агенты вызываются
+    через BaseAgent.arun() (sync-агенты автоматически уходят в поток).
+
+    Один процесс может вести много запусков одновременно без потока на запуск.
+    Ограничение параллелизма — семафор concurrency: передайте один и тот же
+    asyncio.Semaphore нескольким раннерам, чтобы получить глобальный лимит;
+    число — собственный лимит раннера (по умолчанию max_workers).
+
+    Журнал, память и кэш шагов — те же, что у WorkflowRunner.run(), как и
+    timeout_s/retries/backoff шагов (asyncio.timeout) и отмена через cancel().
+    Агенты с executor: process (agents.yaml), а при executor="process" — все
+    шаги выполняются в тёплом пуле процессов (process_workers).
+    """
+
+    def __init__(self, *args: Any, concurrency: int | asyncio.Semaphore | None = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._concurrency = concurrency
+
+    def _fork(self, workspace: str, max_workers: int) -> AsyncWorkflowRunner:
+        clone = super()._fork(workspace, max_workers)
+        clone._concurrency = self._concurrency
+        return clone  # type: ignore[return-value]
+
+    def _limiter(self) -> asyncio.Semaphore:
+        if isinstance(self._concurrency, asyncio.Semaphore):
+            return self._concurrency
+        return asyncio.Semaphore(self._concurrency or self.max_workers)
+
+    async def arun(
+        self,
+        request_json_path: str | dict[str, Any],
+        skip_optional: Iterable[str] | None = None,
+        cancel_token: CancelToken | None = None,
+    ) -> dict[str, Any]:
+        """Асинхронный аналог run(): тот же вход, итог и записи журнала."""
+        with self._journal.flushing(), self._tracing():
+            req, ctx, skipped, steps = self._begin_run(request_json_path, skip_optional, cancel_token)
+            try:
+                outputs = await self._arun_dag(steps, req, ctx, skipped)
+            finally:
+                self._flush_memory()
+            return self._finish_run(steps, outputs)
+
+    async def aresume(
+        self,
+        run_id: str,
+        request_json_path: str | dict[str, Any] | None = None,
+        skip_optional: Iterable[str] | None = None,
+        cancel_token: CancelToken | None = None,
+    ) -> dict[str, Any]:
+        """Асинхронный аналог resume()."""
+        with self._journal.flushing(), self._tracing():
+            req, ctx, skipped, steps, completed = self._begin_resume(run_id, request_json_path, skip_optional, cancel_token)
+            try:
+                outputs = await self._arun_dag(steps, req, ctx, skipped, completed)
+            finally:
+                self._flush_memory()
+            return self._finish_run(steps, outputs)
+
+    async def _arun_dag(
+        self,
+        steps: list[dict[str, Any]],
+        req: dict[str, Any],
+        ctx: AgentContext,
+        skipped: set[str],
+        completed: dict[str, dict[str, Any]] | None = None,
+    ) -> dict[str, dict[str, Any]]:
+        outputs: dict[str, dict[str, Any]] = dict(completed or {})
+        sched = DagSchedule(steps, self._plan.deps, self._plan.children, completed=outputs)
+        limiter = self._limiter()
+        running: dict[asyncio.Task, StepAttempt] = {}
+        pending: deque[StepAttempt] = deque()
+        fanouts: dict[str, FanOut] = {}
+        failure: BaseException | None = None
+
+        try:
+            while sched.has_ready() or running:
+                self._check_cancelled(running)
+                # Лимит параллелизма — семафор limiter, задачи создаются сразу
+                while failure is None and (attempt := self._next_attempt(sched, pending, req, skipped, fanouts, outputs)) is not None:
+                    running[asyncio.create_task(self._arun_step(limiter, ctx, attempt), name=f"mas-step-{attempt.step['id']}")] = attempt
+
+                if not running:
+                    break
+
+                done, _ = await asyncio.wait(running, timeout=CANCEL_POLL_S, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    attempt = running.pop(task)
+                    try:
+                        result: AgentResult = task.result()
+                    except Exception as e:
+                        # step_timeout/step_retry/step_error уже записаны в _arun_step
+                        failure = failure or e
+                        continue
+                    if self._complete_attempt(attempt, result, fanouts, outputs):
+                        sched.complete(attempt.step["id"])
+        finally:
+            # Отмена внешним кодом (CancelledError) — не оставляем «висящих» задач
+            for task in running:
+                task.cancel()
+
+        if failure is not None:
+            raise failure
+        # Отмена пришла, пока выполнялся последний шаг (он мог вернуться досрочно)
+        self._check_cancelled(running)
+        self._check_stuck(sched)
+        return outputs
+
+    def _agent_call(self, attempt: StepAttempt, step_ctx: AgentContext, scope: asyncio.Timeout | None = None) -> Awaitable[AgentResult]:
+        """Вызов агента: BaseAgent.arun() в event loop или тёплый пул процессов (executor: process); scope — таймаут попытки."""
+        if self._in_process(attempt.step) or self._profiler is not None:
+            on_start = None
+            if scope is not None and scope.when() is not None and not self._in_process(attempt.step):
+                # 🆕: как в run(): ожидание очереди профилировщика в потоке не входит в timeout_s
+                scope.reschedule(None)
+                on_start = partial(asyncio.get_running_loop().call_soon_threadsafe, self._restart_timeout, scope, float(attempt.step["timeout_s"]))
+            fn, args = self._agent_call_args(attempt, step_ctx, on_start)
+            if self._in_process(attempt.step):
+                return asyncio.wrap_future(self._warm_pool().submit(fn, *args))
+            # 🆕: под профилировщиком — синхронный run() в потоке: cProfile не делит время между корутинами
+            return asyncio.to_thread(fn, *args)
+        call = attempt.agent_cls(step_ctx).arun(self.blobs.lazy(attempt.input_data))  # type: ignore[call-arg]
+        if self._run_span is not None:
+            return traced_acall(self._run_span, "step", self._step_attributes(attempt), call)
+        return call
+
+    @staticmethod
+    def _restart_timeout(scope: asyncio.Timeout, timeout_s: float) -> None:
+        with suppress(RuntimeError):  # попытка уже завершилась (отмена) — менять нечего
+            scope.reschedule(asyncio.get_running_loop().time() + timeout_s)
+
+    async def _arun_step(self, limiter: asyncio.Semaphore, ctx: AgentContext, attempt: StepAttempt) -> AgentResult:
+        """Попытки шага с таймаутом и повторами; attempt обновляется на месте (t0, номер)."""
+        timeout_s = attempt.step.get("timeout_s")
+        while True:
+            attempt.t0 = time.time()
+            attempt.token = self._cancel_token.child()
+            step_ctx = ctx.model_copy(update={"cancel_token": attempt.token})
+            try:
+                async with limiter, asyncio.timeout(float(timeout_s) if timeout_s else None) as scope:
+                    result = await self._agent_call(attempt, step_ctx, scope)
+                # 🆕: проверка результата — только на границе раннера (ошибка = сбой попытки)
+                return self._agent_result(attempt, result)
+            except RunCancelledError:
+                raise  # отмена запуска — не сбой попытки, не повторяем
+            except Exception as e:
+                error: BaseException = e
+                if isinstance(e, TimeoutError) and not isinstance(e, StepTimeoutError):
+                    attempt.token.cancel("timeout")
+                    error = self._timeout_error(attempt)
+                delay = self._plan_retry(attempt, error)
+                if delay is None:
+                    self._record_step_error(attempt.step, attempt.t0, error)
+                    if error is e:
+                        raise
+                    raise error from e
+                await asyncio.sleep(delay)
+                attempt.attempt += 1
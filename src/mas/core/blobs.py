@@ -0,0 +1,273 @@
+# core/blobs.py — контентно-адресуемое хранилище крупных значений payload (mmap)
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import ItemsView, Iterator, ValuesView
+from contextlib import suppress
+from pathlib import Path
+from typing import Any
+
+# Значение верхнего уровня payload от этого размера (байт UTF-8/JSON) уходит в блоб
+DEFAULT_THRESHOLD = 256 * 1024
+# Сколько разобранных значений держать в памяти процесса (сумма размеров блобов)
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+REF_KEY = "$blob"
+_REF_FIELDS = frozenset((REF_KEY, "kind", "size"))
+_DIGEST = re.compile(r"[0-9a-f]{64}")
+# Ссылки лежат в payload шага (глубина 1) или во входе fan-in {id: payload} (глубина 2)
+_REF_DEPTH = 2
+
+_STORES: dict[tuple[str, int, int], BlobStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def is_ref(value: Any) -> bool:
+    """
+    Ссылка на блоб: ровно {"$blob": sha256 (64 hex), "kind": "json"|"text", "size": байт}.
+    Проверяется вся форма: выход агента с ключом "$blob" остаётся обычным dict.
+    """
+    if type(value) is not dict or value.keys() != _REF_FIELDS:
+        return False
+    digest, size = value[REF_KEY], value["size"]
+    return type(digest) is str and _DIGEST.fullmatch(digest) is not None and value["kind"] in ("json", "text") and type(size) is int and size >= 0
+
+
+def has_refs(value: Any, depth: int = _REF_DEPTH) -> bool:
+    if is_ref(value):
+        return True
+    if depth <= 0 or type(value) is not dict:
+        return False
+    return any(is_ref(v) or (type(v) is dict and has_refs(v, depth - 1)) for v in value.values())
+
+
+def open_store(root: str, threshold: int = DEFAULT_THRESHOLD, cache_bytes: int = DEFAULT_CACHE_BYTES) -> BlobStore:
+    """Одно хранилище на каталог в процессе — воркеры пула делят mmap и кэш значений между шагами."""
+    key = (root, threshold, cache_bytes)
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = _STORES[key] = BlobStore(root, threshold, cache_bytes)
+        return store
+
+
+class BlobStore:
+    """
+    🆕: Крупные значения выходов шагов — один раз на диск, в payload — ссылка.
+
+    externalize() заменяет значения верхнего уровня payload размером от
+    threshold ссылками; блоб — файл <root>/<kk>/<sha256> (строка — как UTF-8,
+    остальное — JSON), одинаковое содержимое хранится один раз. Память
+    потока и журнал видят только ссылки, поэтому сериализуются быстро.
+
+    Чтение — через mmap: view() отдаёт байты без копирования, load() разбирает
+    значение один раз и держит его в LRU-кэше (cache_bytes), так что десяток
+    шагов, читающих один и тот же выход, платят за разбор один раз. Агент
+    получает вход как LazyPayload (lazy()) — ссылка разворачивается при
+    обращении к ключу. threshold=0 выключает вынос.
+    """
+
+    def __init__(self, root: str | Path, threshold: int = DEFAULT_THRESHOLD, cache_bytes: int = DEFAULT_CACHE_BYTES):
+        self.root = Path(root)
+        self.threshold = threshold
+        self.cache_bytes = cache_bytes
+        self._lock = threading.Lock()
+        self._maps: dict[str, mmap.mmap] = {}
+        self._values: OrderedDict[str, tuple[Any, int]] = OrderedDict()
+        self._cached_bytes = 0
+        self._stats = {"stored": 0, "deduped": 0, "loads": 0, "hits": 0}
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # в процесс пула уходит только путь: там хранилище открывается заново (одно на процесс)
+        return open_store, (str(self.root), self.threshold, self.cache_bytes)
+
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    # --- запись ----------------------------------------------------------
+
+    def put(self, value: Any) -> dict[str, Any] | None:
+        """Сохраняет значение как блоб и возвращает ссылку; None — меньше threshold или не JSON."""
+        if isinstance(value, str):
+            if len(value) * 4 < self.threshold:  # UTF-8 — не больше 4 байт на символ
+                return None
+            kind, data = "text", value.encode("utf-8")
+        else:
+            try:
+                data = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            except (TypeError, ValueError):
+                return None
+            kind = "json"
+        if len(data) < self.threshold:
+            return None
+        digest = hashlib.sha256(data).hexdigest()
+        self._write(digest, data)
+        return {REF_KEY: digest, "kind": kind, "size": len(data)}
+
+    def _write(self, digest: str, data: bytes) -> None:
+        path = self._path(digest)
+        if path.exists():
+            self._stats["deduped"] += 1
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        self._stats["stored"] += 1
+
+    def externalize(self, payload: Any) -> Any:
+        """Payload с крупными значениями верхнего уровня, заменёнными ссылками (исходный dict не меняется)."""
+        if not self.threshold or type(payload) is not dict:
+            return payload
+        out: dict[str, Any] | None = None
+        for key, value in payload.items():
+            if isinstance(value, (str, list, dict)) and not is_ref(value) and (ref := self.put(value)) is not None:
+                if out is None:
+                    out = dict(payload)
+                out[key] = ref
+        return payload if out is None else out
+
+    # --- чтение ----------------------------------------------------------
+
+    def view(self, ref: dict[str, Any]) -> memoryview:
+        """Содержимое блоба без копирования (mmap только для чтения, открыт до close())."""
+        digest = ref[REF_KEY]
+        with self._lock:
+            mm = self._maps.get(digest)
+            if mm is None:
+                if not ref.get("size"):
+                    return memoryview(b"")
+                with self._path(digest).open("rb") as f:
+                    mm = self._maps[digest] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(mm)
+
+    def load(self, ref: dict[str, Any]) -> Any:
+        """Значение блоба; разобранные значения кэшируются (LRU по суммарному размеру)."""
+        digest = ref[REF_KEY]
+        with self._lock:
+            cached = self._values.get(digest)
+            if cached is not None:
+                self._values.move_to_end(digest)
+                self._stats["hits"] += 1
+                return cached[0]
+        text = self._read_text(ref)
+        value = text if ref.get("kind") == "text" else json.loads(text)
+        size = int(ref.get("size", 0))
+        with self._lock:
+            self._stats["loads"] += 1
+            if size <= self.cache_bytes and digest not in self._values:
+                self._values[digest] = (value, size)
+                self._cached_bytes += size
+                while self._cached_bytes > self.cache_bytes:
+                    _, (_, old) = self._values.popitem(last=False)
+                    self._cached_bytes -= old
+        return value
+
+    def _read_text(self, ref: dict[str, Any]) -> str:
+        # своё отображение на время разбора: закрывается сразу, дескрипторы не копятся
+        if not ref.get("size"):
+            return ""
+        with self._path(ref[REF_KEY]).open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return str(mm, "utf-8")
+
+    def lazy(self, value: Any) -> Any:
+        """Вход агента: dict со ссылками — как LazyPayload, остальное — как есть."""
+        if is_ref(value):
+            return self.load(value)
+        return LazyPayload(value, self) if has_refs(value) else value
+
+    def materialize(self, value: Any, depth: int = _REF_DEPTH) -> Any:
+        """Копия value с развёрнутыми ссылками (тот же объект, если ссылок нет)."""
+        if is_ref(value):
+            return self.load(value)
+        if not has_refs(value, depth):
+            return value
+        return {k: self.materialize(v, depth - 1) for k, v in value.items()}
+
+    def available(self, value: Any, depth: int = _REF_DEPTH) -> bool:
+        """Все блобы, на которые ссылается value, есть на диске (resume)."""
+        if is_ref(value):
+            return self._path(value[REF_KEY]).exists()
+        if depth <= 0 or type(value) is not dict:
+            return True
+        return all(self.available(v, depth - 1) for v in value.values())
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "mapped": len(self._maps), "cached": len(self._values), "cached_bytes": self._cached_bytes}
+
+    def close(self) -> None:
+        with self._lock:
+            for mm in self._maps.values():
+                with suppress(BufferError):  # на блоб ещё смотрит чей-то memoryview
+                    mm.close()
+            self._maps.clear()
+            self._values.clear()
+            self._cached_bytes = 0
+
+
+class LazyPayload(dict):
+    """
+    🆕: dict со ссылками на блобы, которые разворачиваются при обращении
+    (d[key], get, items, values, dict(d), json.dumps(d)). Вложенный dict со
+    ссылками (вход fan-in) тоже отдаётся как LazyPayload. Сравнение — по
+    развёрнутым значениям. Развёрнутое значение общее для всех читателей
+    блоба (кэш BlobStore) — не изменяйте его на месте.
+    """
+
+    __slots__ = ("_store",)
+
+    def __init__(self, raw: dict[str, Any], store: BlobStore):
+        super().__init__(raw)
+        self._store = store
+
+    def _resolve(self, value: Any) -> Any:
+        return self._store.lazy(value) if type(value) is dict else value
+
+    def __getitem__(self, key: str) -> Any:
+        return self._resolve(dict.__getitem__(self, key))
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self[key] if key in self else default
+
+    # переопределённый __iter__ заставляет dict(d) и {**d} идти через __getitem__
+    def __iter__(self) -> Iterator[str]:
+        return dict.__iter__(self)
+
+    def items(self) -> ItemsView[str, Any]:  # type: ignore[override]
+        return ItemsView(self)
+
+    def values(self) -> ValuesView[Any]:  # type: ignore[override]
+        return ValuesView(self)
+
+    def copy(self) -> LazyPayload:
+        return LazyPayload(self.raw(), self._store)
+
+    def raw(self) -> dict[str, Any]:
+        """Payload как хранится (со ссылками). dict.copy() здесь не годится — он идёт через __getitem__."""
+        return {key: dict.__getitem__(self, key) for key in dict.keys(self)}
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, dict):
+            return NotImplemented
+        return len(self) == len(other) and all(key in other and self[key] == other[key] for key in self)
+
+    def __ne__(self, other: object) -> bool:
+        eq = self.__eq__(other)
+        return eq if eq is NotImplemented else not eq
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return LazyPayload, (self.raw(), self._store)
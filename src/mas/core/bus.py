@@ -1,17 +1,510 @@
-# core/bus.py — простой синхронный EventBus
+# core/bus.py — EventBus: синхронная доставка или очереди подписчиков (потоки / asyncio)
 from __future__ import annotations
 
+import asyncio
+import inspect
+import itertools
+import threading
+import time
+from collections import deque
 from collections.abc import Callable
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from mas.core.eventlog import EventLog
+
+MODES = ("sync", "thread", "async")
+POLICIES = ("block", "drop_oldest", "drop_newest")
+# Сколько событий подписчика доставляется подряд, прежде чем уступить воркер/loop другим
+DRAIN_BATCH = 64
+# Предел кэша «конкретная тема → подписчики»; при переполнении кэш сбрасывается
+MATCH_CACHE_SIZE = 4096
+
+
+def check_topic(topic: str, pattern: bool = False) -> list[str]:
+    """
+    Разбивает тему на сегменты по точке. В шаблонах подписки сегмент "*"
+    совпадает ровно с одним сегментом темы, "#" — с любым их числом (в т.ч.
+    с нулём). В публикуемой теме шаблонные сегменты недопустимы.
+    """
+    parts = topic.split(".")
+    for part in parts:
+        if not part:
+            raise ValueError(f"empty segment in topic: {topic!r}")
+        if part in ("*", "#"):
+            if not pattern:
+                raise ValueError(f"wildcards are not allowed in published topics: {topic!r}")
+        elif "*" in part or "#" in part:
+            raise ValueError(f"wildcard must be a whole segment: {topic!r}")
+    return parts
+
+
+def match_topic(pattern: str, topic: str) -> bool:
+    """Совпадает ли тема с шаблоном подписки (одиночная проверка, без дерева)."""
+
+    def walk(p: list[str], t: list[str]) -> bool:
+        if not p:
+            return not t
+        if p[0] == "#":
+            return any(walk(p[1:], t[i:]) for i in range(len(t) + 1))
+        return bool(t) and p[0] in ("*", t[0]) and walk(p[1:], t[1:])
+
+    return walk(pattern.split("."), topic.split("."))
+
+
+class _TrieNode:
+    __slots__ = ("children", "subs")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _TrieNode] = {}
+        self.subs: list[Subscription] = []
+
+
+class TopicTrie:
+    """
+    🆕: Дерево шаблонов подписки по сегментам темы ("step.done.backend",
+    "step.*", "step.#"). Поиск подписчиков идёт по сегментам темы, а не по
+    списку подписок: стоимость зависит от глубины темы, а не от их числа.
+    """
+
+    def __init__(self) -> None:
+        self._root = _TrieNode()
+
+    def add(self, pattern: str, sub: Subscription) -> None:
+        node = self._root
+        for part in check_topic(pattern, pattern=True):
+            node = node.children.setdefault(part, _TrieNode())
+        node.subs.append(sub)
+
+    def remove(self, pattern: str, sub: Subscription) -> None:
+        node: _TrieNode | None = self._root
+        for part in pattern.split("."):
+            node = node.children.get(part) if node is not None else None
+        if node is not None and sub in node.subs:
+            node.subs.remove(sub)
+
+    def match(self, topic: str) -> list[Subscription]:
+        """Подписчики темы в порядке подписки (каждый не более одного раза)."""
+        found: dict[int, Subscription] = {}
+        self._walk(self._root, topic.split("."), 0, found)
+        return sorted(found.values(), key=lambda sub: sub.seq)
+
+    def _walk(self, node: _TrieNode, parts: list[str], i: int, found: dict[int, Subscription]) -> None:
+        multi = node.children.get("#")
+        if multi is not None:
+            # "#" поглощает 0..n оставшихся сегментов
+            for j in range(i, len(parts) + 1):
+                self._walk(multi, parts, j, found)
+        if i == len(parts):
+            for sub in node.subs:
+                found.setdefault(sub.seq, sub)
+            return
+        for key in (parts[i], "*"):
+            child = node.children.get(key)
+            if child is not None:
+                self._walk(child, parts, i + 1, found)
+
+
+class Subscription:
+    """
+    🆕: Подписчик с собственной ограниченной очередью и метриками.
+    События одного подписчика доставляются строго по порядку и по одному.
+    """
+
+    def __init__(self, topic: str, handler: Callable[[Any], Any], maxsize: int, policy: str, seq: int = 0):
+        self.topic = topic  # тема или шаблон ("step.*", "step.#")
+        self.seq = seq  # порядковый номер подписки: порядок вызова в sync-режиме
+        self.handler = handler
+        self.maxsize = maxsize
+        self.policy = policy
+        self.queue: deque[tuple[float, Any]] = deque()  # (время постановки, событие)
+        self.active = False  # дренаж запущен (задача в пуле / asyncio-задача)
+        self.space: asyncio.Event | None = None  # async-режим: «в очереди есть место»
+        self.held: list[Any] | None = None  # живые события, отложенные на время replay
+        # метрики
+        self.published = 0
+        self.delivered = 0
+        self.replayed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error: str | None = None
+        self.max_queued = 0
+        self.last_lag_s = 0.0
+        self.max_lag_s = 0.0
+        self.total_lag_s = 0.0
+
+    @property
+    def name(self) -> str:
+        return getattr(self.handler, "__qualname__", repr(self.handler))
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "topic": self.topic,
+            "handler": self.name,
+            "policy": self.policy,
+            "maxsize": self.maxsize,
+            "queued": len(self.queue),
+            "max_queued": self.max_queued,
+            "published": self.published,
+            "delivered": self.delivered,
+            "replayed": self.replayed,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "last_lag_s": self.last_lag_s,
+            "max_lag_s": self.max_lag_s,
+            "avg_lag_s": self.total_lag_s / self.delivered if self.delivered else 0.0,
+        }
 
 
 class EventBus:
-    def __init__(self):
+    """
+    Шина событий «тема → обработчики».
+
+    🆕 Режимы доставки (mode):
+      - "sync"   — как раньше: publish() вызывает обработчики в потоке
+                   издателя, исключения обработчиков летят наружу;
+      - "thread" — у каждого подписчика ограниченная очередь (maxsize), её
+                   разбирает общий пул потоков (workers); медленный обработчик
+                   не задерживает издателя и других подписчиков;
+      - "async"  — то же, но очереди разбирают asyncio-задачи в loop
+                   (корутинные обработчики ожидаются, обычные — вызываются).
+
+    Переполнение очереди (policy): "block" — издатель ждёт места,
+    "drop_oldest" — вытесняется самое старое событие, "drop_newest" —
+    отбрасывается новое. Ошибки обработчиков в очередях не роняют шину:
+    они считаются в stats() (errors, last_error) вместе с задержкой
+    доставки (lag) и числом потерянных событий.
+
+    🆕 Темы иерархические, через точку ("step.done.backend"). Подписка может
+    быть на шаблон: "*" — ровно один сегмент ("step.*.backend"), "#" — любое
+    число сегментов ("step.#"). Шаблоны компилируются в TopicTrie, а
+    результат сопоставления кэшируется по конкретной теме: повторная
+    публикация в ту же тему — один поиск в словаре, сколько бы ни было
+    подписчиков. Подписка сбрасывает кэш.
+
+    🆕 log (EventLog): каждое событие дописывается в журнал до доставки, а
+    subscribe(..., replay_from=offset | replay_since=ts) сначала проигрывает
+    новому подписчику подходящие события из журнала, затем переключает его на
+    живые — без пропусков и повторов: события, пришедшие во время replay,
+    придерживаются и доставляются следом.
+
+    drain() ждёт доставки всех событий, close() — прекращает приём, дожидается
+    доставки и останавливает пул. В async-режиме из потока loop используйте
+    apublish()/adrain()/aclose(): блокирующие вызовы там приведут к взаимоблокировке.
+    """
+
+    def __init__(
+        self,
+        mode: str = "sync",
+        maxsize: int = 1000,
+        policy: str = "block",
+        workers: int = 4,
+        loop: asyncio.AbstractEventLoop | None = None,
+        log: EventLog | None = None,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"unknown bus mode: {mode!r} (expected one of {MODES})")
+        self._check_queue(maxsize, policy)
+        self.mode = mode
+        self.maxsize = maxsize
+        self.policy = policy
         self._subs: dict[str, list[Callable[[Any], None]]] = {}
+        self._subscriptions: dict[str, list[Subscription]] = {}
+        self._trie = TopicTrie()
+        self._seq = itertools.count()
+        self._matches: dict[str, tuple[Subscription, ...]] = {}
+        self._lock = threading.Condition()  # очереди, счётчик pending, ожидание места/дренажа
+        self._pending = 0  # события в очередях + доставляемые сейчас
+        self._closed = False
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mas-bus") if mode == "thread" else None
+        self._loop = loop
+        self.log = log
+
+    @staticmethod
+    def _check_queue(maxsize: int, policy: str) -> None:
+        if policy not in POLICIES:
+            raise ValueError(f"unknown backpressure policy: {policy!r} (expected one of {POLICIES})")
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+
+    def subscribe(
+        self,
+        topic: str,
+        handler: Callable[[Any], None],
+        maxsize: int | None = None,
+        policy: str | None = None,
+        replay_from: int | None = None,
+        replay_since: float | None = None,
+    ) -> Subscription:
+        """
+        Подписка на тему или шаблон; maxsize/policy — переопределение настроек шины для этого подписчика.
+        🆕 replay_from/replay_since — догнать журнал (нужен log) с offset/момента времени:
+        replay выполняется в вызывающем потоке, subscribe() возвращается после него.
+        """
+        check_topic(topic, pattern=True)
+        replay = replay_from is not None or replay_since is not None
+        if replay and self.log is None:
+            raise ValueError("replay needs an EventBus with log=EventLog(...)")
+        if replay and inspect.iscoroutinefunction(handler):
+            raise ValueError("replay does not support coroutine handlers")
+        with self._lock:
+            sub = Subscription(topic, handler, maxsize or self.maxsize, policy or self.policy, seq=next(self._seq))
+            self._check_queue(sub.maxsize, sub.policy)
+            # Под той же блокировкой, что и запись в журнал в publish(): всё до end —
+            # в replay, всё после — живые события (придерживаются до конца replay)
+            end = self.log.next_offset if replay and self.log is not None else 0
+            sub.held = [] if replay else None
+            self._subs.setdefault(topic, []).append(handler)
+            self._subscriptions.setdefault(topic, []).append(sub)
+            self._trie.add(topic, sub)
+            self._matches = {}
+        if replay and self.log is not None:
+            for record in self.log.read(replay_from, since=replay_since, pattern=topic, end=end):
+                sub.replayed += 1
+                self._call(sub, record.event)
+            self._release_held(sub)
+        return sub
+
+    def _call(self, sub: Subscription, event: Any) -> None:
+        """Доставка в потоке вызывающего (replay): ошибки считаются, как в очередях."""
+        try:
+            sub.handler(event)
+        except Exception as e:
+            sub.errors += 1
+            sub.last_error = f"{type(e).__name__}: {e}"
+
+    def _release_held(self, sub: Subscription) -> None:
+        while True:
+            with self._lock:
+                batch = sub.held
+                if not batch:
+                    sub.held = None
+                    return
+                sub.held = []
+            for event in batch:
+                self._call(sub, event)
+                sub.delivered += 1
 
-    def subscribe(self, topic: str, handler: Callable[[Any], None]) -> None:
-        self._subs.setdefault(topic, []).append(handler)
+    def _hold(self, sub: Subscription, event: Any) -> bool:
+        """Под self._lock: подписчик ещё в replay — событие откладывается."""
+        if sub.held is None:
+            return False
+        sub.published += 1
+        sub.held.append(event)
+        return True
+
+    def _route(self, topic: str, event: Any) -> tuple[Subscription, ...]:
+        """Подписчики темы; с журналом — запись и выбор подписчиков атомарно относительно subscribe()."""
+        if self.log is None:
+            return self._match(topic)
+        with self._lock:
+            subs = self._match(topic)
+            self.log.append(topic, event)
+        return subs
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        """🆕: Отписка; уже поставленные в очередь события подписчика ещё будут доставлены."""
+        with self._lock:
+            subs = self._subscriptions.get(sub.topic, [])
+            if sub not in subs:
+                return
+            subs.remove(sub)
+            self._subs[sub.topic].remove(sub.handler)
+            self._trie.remove(sub.topic, sub)
+            self._matches = {}
+
+    def _match(self, topic: str) -> tuple[Subscription, ...]:
+        """🆕: Подписчики конкретной темы; результат поиска в TopicTrie кэшируется."""
+        subs = self._matches.get(topic)
+        if subs is not None:
+            return subs
+        check_topic(topic)
+        with self._lock:
+            subs = tuple(self._trie.match(topic))
+            if len(self._matches) >= MATCH_CACHE_SIZE:
+                self._matches = {}
+            self._matches[topic] = subs
+        return subs
 
     def publish(self, topic: str, event: Any) -> None:
-        for h in self._subs.get(topic, []):
-            h(event)
+        if self._closed:
+            raise RuntimeError("EventBus is closed")
+        if self.mode == "sync":
+            for sub in self._route(topic, event):
+                if sub.held is not None:
+                    with self._lock:
+                        if self._hold(sub, event):
+                            continue
+                sub.published += 1
+                sub.handler(event)
+                sub.delivered += 1
+            return
+        if self.mode == "async" and self._may_block(topic) and self._in_loop_thread():
+            raise RuntimeError("blocking publish() from the event loop thread; use await bus.apublish()")
+        for sub in self._route(topic, event):
+            with self._lock:
+                if self._hold(sub, event):
+                    continue
+                while sub.policy == "block" and len(sub.queue) >= sub.maxsize and not self._closed:
+                    self._lock.wait()
+                self._enqueue(sub, event)
+
+    async def apublish(self, topic: str, event: Any) -> None:
+        """Публикация из корутины: при policy=block ждёт места, не блокируя loop."""
+        if self.mode != "async":
+            self.publish(topic, event)
+            return
+        if self._closed:
+            raise RuntimeError("EventBus is closed")
+        self._loop = self._loop or asyncio.get_running_loop()
+        for sub in self._route(topic, event):
+            while sub.held is None and sub.policy == "block" and len(sub.queue) >= sub.maxsize and not self._closed:
+                sub.space = sub.space or asyncio.Event()
+                sub.space.clear()
+                await sub.space.wait()
+            with self._lock:
+                if not self._hold(sub, event):
+                    self._enqueue(sub, event)
+
+    def _may_block(self, topic: str) -> bool:
+        return any(sub.policy == "block" for sub in self._match(topic))
+
+    def _enqueue(self, sub: Subscription, event: Any) -> None:
+        """Под self._lock: кладёт событие по политике и запускает дренаж подписчика."""
+        sub.published += 1
+        if self._closed:
+            # издатель дождался места уже после close()
+            sub.dropped += 1
+            return
+        if len(sub.queue) >= sub.maxsize:
+            sub.dropped += 1
+            if sub.policy == "drop_newest":
+                return
+            sub.queue.popleft()  # drop_oldest
+            self._pending -= 1
+        sub.queue.append((time.monotonic(), event))
+        sub.max_queued = max(sub.max_queued, len(sub.queue))
+        self._pending += 1
+        if not sub.active:
+            sub.active = True
+            self._start_drain(sub)
+
+    def _start_drain(self, sub: Subscription) -> None:
+        if self._pool is not None:
+            self._pool.submit(self._drain_thread, sub)
+            return
+        loop = self._loop
+        if loop is None:
+            try:
+                loop = self._loop = asyncio.get_running_loop()
+            except RuntimeError:
+                raise RuntimeError("async EventBus needs a running loop (pass loop= or publish from a coroutine)") from None
+        loop.call_soon_threadsafe(lambda: loop.create_task(self._drain_async(sub)))
+
+    def _next(self, sub: Subscription) -> tuple[float, Any] | None:
+        with self._lock:
+            if not sub.queue:
+                sub.active = False
+                return None
+            item = sub.queue.popleft()
+            self._lock.notify_all()
+        if sub.space is not None:
+            sub.space.set()
+        return item
+
+    def _done(self, sub: Subscription, enqueued: float, error: BaseException | None) -> None:
+        lag = time.monotonic() - enqueued
+        with self._lock:
+            sub.delivered += 1
+            sub.last_lag_s = lag
+            sub.max_lag_s = max(sub.max_lag_s, lag)
+            sub.total_lag_s += lag
+            if error is not None:
+                sub.errors += 1
+                sub.last_error = f"{type(error).__name__}: {error}"
+            self._pending -= 1
+            self._lock.notify_all()
+
+    def _drain_thread(self, sub: Subscription) -> None:
+        for _ in range(DRAIN_BATCH):
+            if (item := self._next(sub)) is None:
+                return
+            enqueued, event = item
+            error: BaseException | None = None
+            try:
+                sub.handler(event)
+            except Exception as e:
+                error = e
+            self._done(sub, enqueued, error)
+        # Уступаем воркер: занятый подписчик не должен морить остальных
+        try:
+            self._pool.submit(self._drain_thread, sub)  # type: ignore[union-attr]
+        except RuntimeError:  # пул остановлен close(timeout)
+            sub.active = False
+
+    async def _drain_async(self, sub: Subscription) -> None:
+        delivered = 0
+        while (item := self._next(sub)) is not None:
+            enqueued, event = item
+            error: BaseException | None = None
+            try:
+                result = sub.handler(event)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                error = e
+            self._done(sub, enqueued, error)
+            delivered += 1
+            if delivered % DRAIN_BATCH == 0:
+                await asyncio.sleep(0)
+
+    def _in_loop_thread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop or self._loop is None
+        except RuntimeError:
+            return False
+
+    def stats(self) -> list[dict[str, Any]]:
+        """Метрики подписчиков: очередь, доставлено/потеряно/ошибки, задержка доставки (lag)."""
+        with self._lock:
+            return [sub.stats() for subs in self._subscriptions.values() for sub in subs]
+
+    def drain(self, timeout: float | None = None) -> bool:
+        """Ждёт доставки всех опубликованных событий. False — не успели за timeout."""
+        if self.mode == "async" and self._in_loop_thread():
+            raise RuntimeError("blocking drain() from the event loop thread; use await bus.adrain()")
+        with self._lock:
+            return self._lock.wait_for(lambda: self._pending == 0, timeout)
+
+    async def adrain(self, timeout: float | None = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._pending:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.005)
+        return True
+
+    def close(self, timeout: float | None = None) -> bool:
+        """Прекращает приём событий, дожидается доставки очередей и останавливает пул."""
+        drained = self.drain(timeout) if self.mode != "sync" else True
+        with self._lock:
+            self._closed = True
+            self._lock.notify_all()
+        if self._pool is not None:
+            self._pool.shutdown(wait=drained)
+        return drained
+
+    async def aclose(self, timeout: float | None = None) -> bool:
+        drained = await self.adrain(timeout)
+        with self._lock:
+            self._closed = True
+            self._lock.notify_all()
+        return drained
+
+    def __enter__(self) -> EventBus:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
@@ -0,0 +1,354 @@
+# core/bus_socket.py — EventBus между процессами: локальный брокер на Unix-сокете
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import socket
+import struct
+import threading
+from collections.abc import Callable
+from contextlib import suppress
+from pathlib import Path
+from typing import IO, Any
+
+from mas.core.bus import EventBus, Subscription
+from mas.core.eventlog import EventLog
+
+DEFAULT_SOCKET = "workspace/.monitor/bus.sock"
+# Кадр: вид (1 байт) + длина тела (4 байта, big-endian), затем тело — JSON
+_HEADER = struct.Struct("!BI")
+KIND_SUB = 1  # тело — список шаблонов тем
+KIND_PUB = 2  # тело — пачка [[тема, событие], ...]
+MAX_FRAME = 64 * 1024 * 1024
+# Клиент копит события не дольше FLUSH_INTERVAL_S и не больше BATCH_SIZE штук на кадр
+BATCH_SIZE = 256
+FLUSH_INTERVAL_S = 0.005
+# Брокер: сколько байт может скопиться в буфере записи медленного клиента, прежде чем пачки начнут теряться
+CLIENT_BUFFER_LIMIT = 4 * 1024 * 1024
+
+
+def encode_frame(kind: int, body: bytes) -> bytes:
+    return _HEADER.pack(kind, len(body)) + body
+
+
+def encode_batch(items: list[str]) -> bytes:
+    """Пачка уже сериализованных элементов "[тема, событие]" → тело кадра KIND_PUB."""
+    return ("[" + ",".join(items) + "]").encode()
+
+
+def read_frame(stream: IO[bytes]) -> tuple[int, Any] | None:
+    """Блокирующее чтение кадра; None — соединение закрыто."""
+    header = stream.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return None
+    kind, size = _HEADER.unpack(header)
+    if size > MAX_FRAME:
+        raise ValueError(f"frame too large: {size} bytes")
+    body = stream.read(size)
+    if len(body) < size:
+        return None
+    return kind, json.loads(body)
+
+
+async def _aread_frame(reader: asyncio.StreamReader) -> tuple[int, Any] | None:
+    try:
+        kind, size = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+        if size > MAX_FRAME:
+            raise ValueError(f"frame too large: {size} bytes")
+        return kind, json.loads(await reader.readexactly(size))
+    except asyncio.IncompleteReadError:
+        return None
+
+
+class _BrokerClient:
+    """Подключение к брокеру: его подписки и исходящая пачка."""
+
+    def __init__(self, writer: asyncio.StreamWriter, buffer_limit: int):
+        self.writer = writer
+        self.buffer_limit = buffer_limit
+        self.subs: list[Subscription] = []
+        self.out: list[str] = []
+        self.scheduled = False
+        self.last_seq = -1
+        self.delivered = 0
+        self.dropped = 0
+
+    def deliver(self, message: tuple[int, _BrokerClient, str]) -> None:
+        seq, sender, item = message
+        # Своё событие не возвращаем; пересекающиеся шаблоны не дают дубликатов
+        if sender is self or seq == self.last_seq:
+            return
+        self.last_seq = seq
+        self.out.append(item)
+        if not self.scheduled:
+            # Всё, что пришло одним входящим кадром, уходит клиенту одним кадром
+            self.scheduled = True
+            asyncio.get_running_loop().call_soon(self.flush)
+
+    def flush(self) -> None:
+        self.scheduled = False
+        batch, self.out = self.out, []
+        if not batch or self.writer.is_closing():
+            return
+        if self.writer.transport.get_write_buffer_size() > self.buffer_limit:
+            # Клиент не успевает читать — теряем пачку, а не память брокера
+            self.dropped += len(batch)
+            return
+        self.writer.write(encode_frame(KIND_PUB, encode_batch(batch)))
+        self.delivered += len(batch)
+
+
+class EventBroker:
+    """
+    🆕: Локальный брокер событий на Unix-сокете. Клиенты (SocketBus) присылают
+    пачки событий и шаблоны подписки; брокер рассылает каждое событие всем
+    остальным клиентам с подходящим шаблоном. Маршрутизация — тем же
+    EventBus (sync) с деревом шаблонов и кэшем тем.
+
+    serve() — корутина для отдельного процесса (mas bus-broker), start()/stop() —
+    брокер в фоновом потоке текущего процесса (тесты, встраивание).
+
+    🆕 log (EventLog) — брокер дописывает в журнал каждое разосланное событие;
+    опоздавший монитор догоняет запуск, читая журнал (EventLog(dir, readonly=True)
+    или mas events), а не workflow.jsonl с начала.
+    """
+
+    def __init__(self, path: str | Path = DEFAULT_SOCKET, buffer_limit: int = CLIENT_BUFFER_LIMIT, log: EventLog | None = None):
+        self.path = Path(path)
+        self.buffer_limit = buffer_limit
+        self.log = log
+        self._router = EventBus()
+        self._clients: set[_BrokerClient] = set()
+        self._seq = itertools.count()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._server: asyncio.AbstractServer | None = None
+        self._stopped: asyncio.Future[None] | None = None
+        self._thread: threading.Thread | None = None
+        self._ready = threading.Event()
+        self._error: BaseException | None = None
+
+    async def serve(self) -> None:
+        """Принимает подключения до stop() (или отмены задачи)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Сокет от упавшего брокера мешает bind()
+        self.path.unlink(missing_ok=True)
+        self._loop = asyncio.get_running_loop()
+        self._stopped = self._loop.create_future()
+        self._server = await asyncio.start_unix_server(self._handle, path=str(self.path))
+        self._ready.set()
+        try:
+            # Не serve_forever(): при остановке он ждёт, пока отключатся все клиенты
+            await self._stopped
+        finally:
+            self._server.close()
+            for client in list(self._clients):
+                client.writer.close()
+            with suppress(OSError):
+                self.path.unlink()
+
+    def start(self, timeout: float = 5.0) -> EventBroker:
+        def main() -> None:
+            try:
+                asyncio.run(self.serve())
+            except BaseException as e:
+                self._error = e
+                self._ready.set()
+
+        self._thread = threading.Thread(target=main, name="mas-bus-broker", daemon=True)
+        self._thread.start()
+        if not self._ready.wait(timeout) or self._error is not None:
+            raise RuntimeError(f"bus broker failed to start at {self.path}") from self._error
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._loop is not None and self._stopped is not None:
+            with suppress(RuntimeError):  # loop уже остановлен
+                self._loop.call_soon_threadsafe(lambda: self._stopped.done() or self._stopped.set_result(None))  # type: ignore[union-attr]
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self) -> list[dict[str, Any]]:
+        return [{"patterns": [sub.topic for sub in c.subs], "delivered": c.delivered, "dropped": c.dropped, "queued": len(c.out)} for c in list(self._clients)]
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        client = _BrokerClient(writer, self.buffer_limit)
+        self._clients.add(client)
+        try:
+            while (frame := await _aread_frame(reader)) is not None:
+                kind, body = frame
+                if kind == KIND_SUB:
+                    client.subs.extend(self._router.subscribe(pattern, client.deliver) for pattern in body)
+                elif kind == KIND_PUB:
+                    for topic, event in body:
+                        self._route(client, topic, event)
+        except (ConnectionError, ValueError):
+            pass  # оборванное соединение или мусор в кадре — просто отключаем клиента
+        finally:
+            for sub in client.subs:
+                self._router.unsubscribe(sub)
+            self._clients.discard(client)
+            writer.close()
+
+    def _route(self, sender: _BrokerClient, topic: str, event: Any) -> None:
+        if not isinstance(topic, str):
+            return
+        item = json.dumps([topic, event], ensure_ascii=False, separators=(",", ":"))
+        with suppress(ValueError):  # шаблон вместо темы — событие не рассылается и не журналируется
+            self._router.publish(topic, (next(self._seq), sender, item))
+            if self.log is not None:
+                self.log.append(topic, event)
+
+
+class SocketBus(EventBus):
+    """
+    🆕: EventBus, связанный с другими процессами через EventBroker.
+
+    publish() доставляет событие локальным подписчикам (как EventBus в
+    выбранном mode) и ставит его в исходящую пачку: фоновый поток отправляет
+    пачку одним кадром, когда в ней batch_size событий или прошло
+    flush_interval_s. subscribe() дополнительно подписывает процесс на
+    шаблон у брокера: чужие события публикуются в локальную шину и
+    обратно в брокер не уходят.
+
+    События сериализуются в JSON при publish() (не-JSON значения — через str()).
+    Потеря связи с брокером не ломает издателя: локальная доставка
+    продолжается, неотправленные события считаются в transport_stats().
+    """
+
+    def __init__(
+        self,
+        path: str | Path = DEFAULT_SOCKET,
+        *,
+        batch_size: int = BATCH_SIZE,
+        flush_interval_s: float = FLUSH_INTERVAL_S,
+        connect_timeout: float = 5.0,
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+        if not hasattr(socket, "AF_UNIX"):
+            raise RuntimeError("SocketBus needs Unix domain sockets")
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._sock.settimeout(connect_timeout)
+            self._sock.connect(str(self.path))
+            self._sock.settimeout(None)
+        except OSError as e:
+            self._sock.close()
+            raise ConnectionError(f"bus broker is not available at {self.path}: {e}") from e
+        self.connected = True
+        self._out: list[str] = []
+        self._out_cond = threading.Condition()
+        self._send_lock = threading.Lock()
+        self._stopping = False
+        self.sent = 0
+        self.received = 0
+        self.unsent = 0
+        self._sender = threading.Thread(target=self._send_loop, name="mas-bus-send", daemon=True)
+        self._reader = threading.Thread(target=self._read_loop, name="mas-bus-recv", daemon=True)
+        self._sender.start()
+        self._reader.start()
+
+    def subscribe(  # noqa: PLR0913, PLR0917 — сигнатура EventBus.subscribe
+        self,
+        topic: str,
+        handler: Callable[[Any], Any],
+        maxsize: int | None = None,
+        policy: str | None = None,
+        replay_from: int | None = None,
+        replay_since: float | None = None,
+    ) -> Subscription:
+        # replay — из локального журнала (log=...), затем живые события, в т.ч. от брокера
+        sub = super().subscribe(topic, handler, maxsize, policy, replay_from=replay_from, replay_since=replay_since)
+        self._write(KIND_SUB, json.dumps([topic]).encode(), 0)
+        return sub
+
+    def publish(self, topic: str, event: Any) -> None:
+        try:
+            super().publish(topic, event)
+        finally:
+            self._queue_remote(topic, event)
+
+    async def apublish(self, topic: str, event: Any) -> None:
+        if self.mode != "async":
+            self.publish(topic, event)
+            return
+        try:
+            await super().apublish(topic, event)
+        finally:
+            self._queue_remote(topic, event)
+
+    def _queue_remote(self, topic: str, event: Any) -> None:
+        item = json.dumps([topic, event], ensure_ascii=False, separators=(",", ":"), default=str)
+        with self._out_cond:
+            self._out.append(item)
+            # Первое событие пачки запускает отсчёт flush_interval_s, полная пачка — отправку
+            if len(self._out) in (1, self.batch_size):
+                self._out_cond.notify()
+
+    def _send_loop(self) -> None:
+        while True:
+            with self._out_cond:
+                self._out_cond.wait_for(lambda: self._out or self._stopping)
+                # Добираем пачку: до batch_size событий или flush_interval_s
+                self._out_cond.wait_for(lambda: len(self._out) >= self.batch_size or self._stopping, timeout=self.flush_interval_s)
+                batch, self._out = self._out, []
+                stopping = self._stopping
+            if batch:
+                self._write(KIND_PUB, encode_batch(batch), len(batch))
+            if stopping:
+                return
+
+    def _write(self, kind: int, body: bytes, count: int) -> None:
+        with self._send_lock:
+            if not self.connected:
+                self.unsent += count
+                return
+            try:
+                self._sock.sendall(encode_frame(kind, body))
+                self.sent += count
+            except OSError:
+                self.connected = False
+                self.unsent += count
+
+    def _read_loop(self) -> None:
+        with suppress(OSError, ValueError), self._sock.makefile("rb") as stream:
+            while (frame := read_frame(stream)) is not None:
+                kind, body = frame
+                if kind != KIND_PUB:
+                    continue
+                for topic, event in body:
+                    self.received += 1
+                    # Только локальная доставка: ошибки обработчиков и закрытая шина не роняют приём
+                    with suppress(Exception):
+                        EventBus.publish(self, topic, event)
+        self.connected = False
+
+    def transport_stats(self) -> dict[str, Any]:
+        with self._out_cond:
+            queued = len(self._out)
+        return {"path": str(self.path), "connected": self.connected, "sent": self.sent, "received": self.received, "unsent": self.unsent, "queued": queued}
+
+    def close(self, timeout: float | None = None) -> bool:
+        """Локальная шина закрывается как EventBus; исходящая пачка дописывается в сокет."""
+        drained = super().close(timeout)
+        self._close_transport(timeout)
+        return drained
+
+    async def aclose(self, timeout: float | None = None) -> bool:
+        drained = await super().aclose(timeout)
+        await asyncio.to_thread(self._close_transport, timeout)
+        return drained
+
+    def _close_transport(self, timeout: float | None) -> None:
+        with self._out_cond:
+            self._stopping = True
+            self._out_cond.notify()
+        self._sender.join(timeout)
+        with suppress(OSError):
+            self._sock.shutdown(socket.SHUT_RDWR)
+        self._sock.close()
+        self._reader.join(timeout)
@@ -0,0 +1,75 @@
+# core/cancel.py — кооперативная отмена запусков и шагов
+from __future__ import annotations
+
+import threading
+
+
+class RunCancelledError(Exception):
+    """Запуск workflow отменён (WorkflowRunner.cancel() или внешний CancelToken)."""
+
+
+class StepTimeoutError(TimeoutError):
+    """Шаг не уложился в timeout_s (после всех повторов)."""
+
+
+class CancelToken:
+    """
+    Токен кооперативной отмены. Агент получает его в AgentContext.cancel_token
+    и периодически проверяет cancelled / raise_if_cancelled() — принудительно
+    прервать поток Python нельзя.
+
+    child() — дочерний токен: отменяется вместе с родителем, но его можно
+    отменить и отдельно (так раннер отменяет одну попытку шага по таймауту).
+
+    При передаче в другой процесс (executor=process) копируется только
+    состояние на момент отправки: отмена через границу процесса не доходит.
+    """
+
+    def __init__(self, parent: CancelToken | None = None):
+        self._event = threading.Event()
+        self._parent = parent
+        self.reason: str | None = None
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        if self._parent is not None and self._parent.cancelled:
+            self.reason = self._parent.reason
+            return True
+        return False
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancelled:
+            raise RunCancelledError(self.reason or "cancelled")
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Ждёт отмены не дольше timeout; удобно вместо time.sleep() в агентах."""
+        if self._parent is None:
+            return self._event.wait(timeout)
+        step = 0.05 if timeout is None else min(0.05, timeout)
+        waited = 0.0
+        while not self.cancelled:
+            if timeout is not None and waited >= timeout:
+                return False
+            self._event.wait(step)
+            waited += step
+        return True
+
+    def child(self) -> CancelToken:
+        return CancelToken(parent=self)
+
+    def __getstate__(self) -> dict[str, object]:
+        return {"cancelled": self.cancelled, "reason": self.reason}
+
+    def __setstate__(self, state: dict[str, object]) -> None:
+        self._event = threading.Event()
+        self._parent = None
+        self.reason = None
+        if state["cancelled"]:
+            self.cancel(str(state["reason"]))
@@ -0,0 +1,285 @@
+# core/eventlog.py — сегментированный журнал событий EventBus с повтором (replay)
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any
+
+from mas.core.bus import match_topic
+
+# Запись сегмента: длина тела, crc32 тела, offset, ts — затем тело (JSON [тема, событие])
+_RECORD = struct.Struct("!IIQd")
+# Запись индекса: позиция записи в сегменте, ts — по одной на событие (offset = base + номер)
+_INDEX = struct.Struct("!Qd")
+
+
+@dataclass(frozen=True)
+class LogRecord:
+    offset: int
+    ts: float
+    topic: str
+    event: Any
+
+
+class _Segment:
+    """Пара файлов <base>.log / <base>.idx; base — offset первой записи."""
+
+    def __init__(self, directory: Path, base: int):
+        self.base = base
+        self.log_path = directory / f"{base:020d}.log"
+        self.idx_path = directory / f"{base:020d}.idx"
+
+    def index(self) -> bytes:
+        """Индекс целиком; хвост неполной записи отбрасывается."""
+        try:
+            data = self.idx_path.read_bytes()
+        except FileNotFoundError:
+            return b""
+        return data[: len(data) - len(data) % _INDEX.size]
+
+    def count(self) -> int:
+        try:
+            return self.idx_path.stat().st_size // _INDEX.size
+        except FileNotFoundError:
+            return 0
+
+    def last_ts(self) -> float | None:
+        idx = self.index()
+        return _INDEX.unpack_from(idx, len(idx) - _INDEX.size)[1] if idx else None
+
+    def unlink(self) -> None:
+        self.log_path.unlink(missing_ok=True)
+        self.idx_path.unlink(missing_ok=True)
+
+
+class EventLog:
+    """
+    🆕: Долговременный журнал событий: append-only сегменты с индексом offset → позиция.
+
+    Каждому событию присваивается offset (сквозной номер). Сегмент <base>.log
+    закрывается, когда превышает segment_bytes; рядом лежит <base>.idx —
+    по 16 байт на событие (позиция в .log и ts), поэтому поиск по offset —
+    одно чтение, по времени — двоичный поиск в индексе.
+
+    Хранение (retention): при ротации удаляются старейшие сегменты сверх
+    max_segments и сегменты, последнее событие которых старше max_age_s.
+    Текущий сегмент не удаляется никогда.
+
+    Читать журнал можно из другого процесса: EventLog(dir, readonly=True) не
+    трогает файлы, а запись видна читателю только после записи её индекса
+    (индекс пишется после тела). При открытии на запись недописанный хвост
+    (падение посреди записи) отрезается, индекс восстанавливается по .log.
+    fsync=True — fsync после каждой записи (медленно, но переживает сбой ОС).
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        segment_bytes: int = 16 * 1024 * 1024,
+        max_segments: int | None = None,
+        max_age_s: float | None = None,
+        fsync: bool = False,
+        readonly: bool = False,
+    ):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self.max_age_s = max_age_s
+        self.fsync = fsync
+        self.readonly = readonly
+        self._lock = threading.Lock()
+        self._log: IO[bytes] | None = None
+        self._idx: IO[bytes] | None = None
+        self._last_ts = 0.0
+        if not readonly:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self._segments = self._scan()
+        self._next = self._segments[-1].base + self._segments[-1].count() if self._segments else 0
+        if not readonly:
+            self._recover()
+            self._retain()
+
+    # --- состояние -------------------------------------------------------
+
+    def _scan(self) -> list[_Segment]:
+        if not self.directory.is_dir():
+            return []
+        bases = sorted(int(p.stem) for p in self.directory.glob("*.log") if p.stem.isdigit())
+        return [_Segment(self.directory, base) for base in bases]
+
+    def _refresh(self) -> None:
+        """Читатель: подхватывает сегменты и записи, добавленные писателем."""
+        if self.readonly:
+            self._segments = self._scan()
+            self._next = self._segments[-1].base + self._segments[-1].count() if self._segments else 0
+
+    @property
+    def first_offset(self) -> int:
+        self._refresh()
+        return self._segments[0].base if self._segments else self._next
+
+    @property
+    def next_offset(self) -> int:
+        """Offset, который получит следующее событие (= число событий за всё время)."""
+        self._refresh()
+        return self._next
+
+    def _recover(self) -> None:
+        """Сверяет последний сегмент с индексом: отрезает неполный хвост, достраивает индекс."""
+        if not self._segments:
+            return
+        seg = self._segments[-1]
+        entries: list[bytes] = []
+        pos = 0
+        with seg.log_path.open("rb") as f:
+            data = f.read()
+        while pos + _RECORD.size <= len(data):
+            size, crc, _, ts = _RECORD.unpack_from(data, pos)
+            body = data[pos + _RECORD.size : pos + _RECORD.size + size]
+            if len(body) < size or zlib.crc32(body) != crc:
+                break
+            entries.append(_INDEX.pack(pos, ts))
+            self._last_ts = ts
+            pos += _RECORD.size + size
+        if pos != len(data):
+            with seg.log_path.open("r+b") as f:
+                f.truncate(pos)
+        if len(entries) != seg.count():
+            seg.idx_path.write_bytes(b"".join(entries))
+        self._next = seg.base + len(entries)
+
+    def _retain(self) -> None:
+        now = time.time()
+        while len(self._segments) > 1:
+            oldest = self._segments[0]
+            too_many = self.max_segments is not None and len(self._segments) > self.max_segments
+            last_ts = oldest.last_ts()
+            too_old = self.max_age_s is not None and (last_ts is None or now - last_ts > self.max_age_s)
+            if not (too_many or too_old):
+                break
+            oldest.unlink()
+            self._segments.pop(0)
+
+    # --- запись ----------------------------------------------------------
+
+    def append(self, topic: str, event: Any, ts: float | None = None) -> int:
+        """Дописывает событие, возвращает его offset. Не-JSON значения сериализуются через str()."""
+        if self.readonly:
+            raise RuntimeError("EventLog is opened read-only")
+        body = json.dumps([topic, event], ensure_ascii=False, separators=(",", ":"), default=str).encode()
+        with self._lock:
+            # ts не убывает: иначе поиск по времени в индексе был бы неверным
+            ts = self._last_ts = max(time.time() if ts is None else ts, self._last_ts)
+            log, idx = self._active()
+            offset = self._next
+            pos = log.tell()
+            log.write(_RECORD.pack(len(body), zlib.crc32(body), offset, ts) + body)
+            log.flush()
+            # индекс — после тела: читатель не увидит запись, пока она не дописана
+            idx.write(_INDEX.pack(pos, ts))
+            idx.flush()
+            if self.fsync:
+                os.fsync(log.fileno())
+                os.fsync(idx.fileno())
+            self._next += 1
+            if log.tell() >= self.segment_bytes:
+                self._close_files()
+                self._segments.append(_Segment(self.directory, self._next))
+                self._retain()
+        return offset
+
+    def _active(self) -> tuple[IO[bytes], IO[bytes]]:
+        if self._log is None or self._idx is None:
+            if not self._segments:
+                self._segments.append(_Segment(self.directory, self._next))
+            seg = self._segments[-1]
+            self._log = seg.log_path.open("ab")
+            self._idx = seg.idx_path.open("ab")
+        return self._log, self._idx
+
+    def _close_files(self) -> None:
+        for f in (self._log, self._idx):
+            if f is not None:
+                f.close()
+        self._log = self._idx = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_files()
+
+    def __enter__(self) -> EventLog:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    # --- чтение ----------------------------------------------------------
+
+    def offset_for_time(self, since: float) -> int:
+        """Первый offset с ts >= since (next_offset, если таких нет)."""
+        self._refresh()
+        for seg in self._segments:
+            idx = seg.index()
+            n = len(idx) // _INDEX.size
+            if not n or _INDEX.unpack_from(idx, (n - 1) * _INDEX.size)[1] < since:
+                continue
+            ts_at = _IndexTimes(idx)
+            return seg.base + bisect.bisect_left(ts_at, since)
+        return self._next
+
+    def read(self, offset: int | None = None, since: float | None = None, pattern: str = "#", end: int | None = None) -> Iterator[LogRecord]:
+        """
+        События начиная с offset (или с момента since), до end (не включая) или
+        до конца журнала на момент вызова; pattern — шаблон темы как у EventBus.
+        Удалённые retention события пропускаются.
+        """
+        start = offset if offset is not None else (self.offset_for_time(since) if since is not None else 0)
+        stop = self.next_offset if end is None else end
+        for seg in list(self._segments):
+            idx = seg.index()
+            seg_end = seg.base + len(idx) // _INDEX.size
+            if seg_end <= start or seg.base >= stop:
+                continue
+            first = max(start, seg.base)
+            try:
+                f = seg.log_path.open("rb")
+            except FileNotFoundError:  # сегмент удалён retention во время чтения
+                continue
+            with f:
+                f.seek(_INDEX.unpack_from(idx, (first - seg.base) * _INDEX.size)[0])
+                for _ in range(first, min(seg_end, stop)):
+                    size, _, rec_offset, ts = _RECORD.unpack(f.read(_RECORD.size))
+                    topic, event = json.loads(f.read(size))
+                    if pattern == "#" or match_topic(pattern, topic):
+                        yield LogRecord(rec_offset, ts, topic, event)
+
+    def stats(self) -> dict[str, Any]:
+        self._refresh()
+        return {
+            "directory": str(self.directory),
+            "segments": len(self._segments),
+            "first_offset": self.first_offset,
+            "next_offset": self._next,
+            "bytes": sum(seg.log_path.stat().st_size for seg in self._segments if seg.log_path.exists()),
+        }
+
+
+class _IndexTimes:
+    """Последовательность ts из индекса сегмента — для bisect без распаковки всего индекса."""
+
+    def __init__(self, idx: bytes):
+        self._idx = idx
+
+    def __len__(self) -> int:
+        return len(self._idx) // _INDEX.size
+
+    def __getitem__(self, i: int) -> float:
+        return _INDEX.unpack_from(self._idx, i * _INDEX.size)[1]
@@ -0,0 +1,138 @@
+# core/journal.py — буферизованная запись журнала выполнения (workflow.jsonl)
+from __future__ import annotations
+
+import atexit
+import json
+import threading
+import weakref
+from collections.abc import Iterator
+from contextlib import contextmanager, suppress
+from pathlib import Path
+from typing import IO, Any
+
+# Как часто фоновый поток сбрасывает накопленные записи, с
+FLUSH_INTERVAL_S = 0.2
+
+
+class _Flusher:
+    """
+    Один фоновый daemon-поток на процесс для всех JournalWriter: раз в
+    FLUSH_INTERVAL_S (или сразу по wake() при переполнении буфера) сбрасывает
+    записи на диск. Поток на каждый журнал не нужен — в пакетном режиме
+    раннеров (и журналов) тысячи.
+    """
+
+    def __init__(self) -> None:
+        self._sinks: weakref.WeakSet[JournalWriter] = weakref.WeakSet()
+        self._cond = threading.Condition()
+        self._woken = False
+        self._thread: threading.Thread | None = None
+
+    def register(self, sink: JournalWriter) -> None:
+        with self._cond:
+            self._sinks.add(sink)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="mas-journal", daemon=True)
+                self._thread.start()
+
+    def wake(self) -> None:
+        with self._cond:
+            self._woken = True
+            self._cond.notify()
+
+    def flush_all(self) -> None:
+        with self._cond:
+            sinks = list(self._sinks)
+        for sink in sinks:
+            sink.flush()
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._woken, timeout=FLUSH_INTERVAL_S)
+                self._woken = False
+            self.flush_all()
+
+
+_FLUSHER = _Flusher()
+atexit.register(_FLUSHER.flush_all)
+
+
+class JournalWriter:
+    """
+    JSONL-журнал с буфером в памяти: файл открыт всё время жизни writer'а,
+    write() только сериализует запись и кладёт её в буфер.
+
+    На диск записи попадают:
+      - фоновым потоком — раз в FLUSH_INTERVAL_S или при max_records/max_bytes
+        в буфере;
+      - синхронно — flush(), выход из flushing() (в т.ч. по исключению),
+        close(), завершение интерпретатора;
+      - синхронно в write(), если фоновый поток не успевает (буфер вчетверо
+        больше порога).
+
+    Ошибки записи подавляются: журнал вспомогательный и не должен ронять запуск.
+    После close() writer продолжает работать без буфера (открыл-дописал-закрыл).
+    """
+
+    def __init__(self, path: str | Path, max_records: int = 512, max_bytes: int = 256 * 1024):
+        self.path = Path(path)
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self._buf: list[str] = []
+        self._buf_bytes = 0
+        self._buf_lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._file: IO[str] | None = None
+        self._closed = False
+        _FLUSHER.register(self)
+
+    def write(self, record: dict[str, Any]) -> None:
+        # Сериализуем сразу: запись может измениться у вызывающего после write()
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._buf_lock:
+            self._buf.append(line)
+            self._buf_bytes += len(line)
+            full = len(self._buf) >= self.max_records or self._buf_bytes >= self.max_bytes
+            overflow = len(self._buf) >= 4 * self.max_records or self._buf_bytes >= 4 * self.max_bytes
+        if self._closed or overflow:
+            self.flush()
+        elif full:
+            _FLUSHER.wake()
+
+    def flush(self) -> None:
+        with self._io_lock:
+            with self._buf_lock:
+                lines, self._buf, self._buf_bytes = self._buf, [], 0
+            if not lines:
+                return
+            with suppress(OSError):
+                if self._closed:
+                    with self.path.open("a", encoding="utf-8") as f:
+                        f.writelines(lines)
+                    return
+                if self._file is None:
+                    self._file = self.path.open("a", encoding="utf-8")
+                self._file.writelines(lines)
+                self._file.flush()
+
+    @contextmanager
+    def flushing(self) -> Iterator[JournalWriter]:
+        """Гарантированный сброс журнала по выходу из блока — и при исключении."""
+        try:
+            yield self
+        finally:
+            self.flush()
+
+    def close(self) -> None:
+        self.flush()
+        with self._io_lock:
+            self._closed = True
+            if self._file is not None:
+                with suppress(OSError):
+                    self._file.close()
+                self._file = None
+
+    def __del__(self) -> None:
+        with suppress(Exception):
+            self.close()
@@ -2,27 +2,394 @@
 from __future__ import annotations
 
 import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
 from pathlib import Path
 from typing import Any
 
 
 class FlowMemory:
-    def __init__(self, path: str):
+    """
+    Память потока в JSON-файле (flow_state.json) с кэшем в процессе.
+
+    Файл читается один раз при открытии; get() обслуживается из памяти,
+    set() помечает состояние «грязным». Запись на диск — в flush()
+    (атомарно: временный файл + os.replace), при выходе из with-блока и,
+    если autoflush=True (по умолчанию, как раньше), после каждого set().
+
+    Значения не копируются: объект, переданный в set() и возвращённый get(),
+    общий — не изменяйте его на месте.
+    """
+
+    def __init__(self, path: str, autoflush: bool = True, indent: int | None = 2):
         self.path = Path(path)
         self.path.parent.mkdir(parents=True, exist_ok=True)
-        if not self.path.exists():
+        self.autoflush = autoflush
+        self.indent = indent
+        self._lock = threading.RLock()
+        self._dirty = False
+        if self.path.exists():
+            self._data: dict[str, Any] = self._read()
+        else:
+            self._data = {}
             self._write({})
 
     def _write(self, data: dict[str, Any]) -> None:
-        self.path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        text = json.dumps(data, ensure_ascii=False, indent=self.indent)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.chmod(tmp, 0o644)  # mkstemp создаёт 0600; оставляем права как у write_text
+            os.replace(tmp, self.path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
 
     def _read(self) -> dict[str, Any]:
         return json.loads(self.path.read_text(encoding="utf-8"))
 
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def get(self, key: str, default=None):
+        return self._data.get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._dirty = True
+            if self.autoflush:
+                self.flush()
+
+    def flush(self) -> None:
+        """Сбрасывает изменения на диск (no-op, если изменений не было)."""
+        with self._lock:
+            if self._dirty:
+                self._write(self._data)
+                self._dirty = False
+
+    def reload(self) -> None:
+        """Перечитывает файл (несохранённые изменения теряются)."""
+        with self._lock:
+            self._data = self._read()
+            self._dirty = False
+
+    def start_run(self, run_id: str) -> None:
+        """Для совместимости с SQLiteFlowMemory: JSON-файл хранит только последний запуск."""
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> FlowMemory:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+class SQLiteFlowMemory:
+    """
+    Память потока в SQLite: одна строка на ключ (шаг) в рамках run_id.
+
+    - get()/set() читают и пишут только свой ключ, а не весь документ;
+    - WAL-режим (PRAGMA как в scripts/sqlite/ddl.sql): читатели (API, TUI)
+      видят состояние во время выполнения, не мешая писателю;
+    - история прошлых запусков хранится по run_id (keep_history=False —
+      при start_run() старые запуски удаляются).
+
+    Интерфейс совместим с FlowMemory (get/set/flush/close, with-блок).
+    """
+
+    PRAGMAS = (
+        "PRAGMA foreign_keys = ON",
+        "PRAGMA journal_mode = WAL",
+        "PRAGMA synchronous = NORMAL",
+        "PRAGMA temp_store = MEMORY",
+    )
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS flow_runs (run_id TEXT PRIMARY KEY, started_at REAL NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS flow_state ("
+        " run_id TEXT NOT NULL REFERENCES flow_runs(run_id) ON DELETE CASCADE,"
+        " key TEXT NOT NULL, value TEXT NOT NULL, updated_at REAL NOT NULL,"
+        " PRIMARY KEY (run_id, key))",
+    )
+
+    def __init__(
+        self,
+        path: str,
+        run_id: str = "latest",
+        autoflush: bool = True,
+        keep_history: bool = True,
+        read_only: bool = False,
+    ):
+        self.path = Path(path)
+        self.autoflush = autoflush
+        self.keep_history = keep_history
+        self.read_only = read_only
+        self._lock = threading.RLock()
+        self._dirty = False
+        if read_only:
+            self._conn = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+            self.run_id = run_id if run_id != "latest" else (self.runs()[-1:] or ["latest"])[0]
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        for stmt in (*self.PRAGMAS, *self.SCHEMA):
+            self._conn.execute(stmt)
+        self._conn.commit()
+        self.run_id = run_id
+        self._registered: str | None = None  # run_id, уже записанный в flow_runs
+
+    def _ensure_run(self, run_id: str) -> None:
+        # Запуск регистрируется при первой записи — пустые запуски не засоряют историю
+        if self._registered != run_id:
+            self._conn.execute("INSERT OR IGNORE INTO flow_runs (run_id, started_at) VALUES (?, ?)", (run_id, time.time()))
+            self._registered = run_id
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def start_run(self, run_id: str) -> None:
+        """Переключает запись на новый run_id (вызывается WorkflowRunner.run)."""
+        with self._lock:
+            self.flush()
+            self.run_id = run_id
+            if not self.keep_history:
+                self._conn.execute("DELETE FROM flow_runs WHERE run_id != ?", (run_id,))
+                self._conn.commit()
+
+    def runs(self) -> list[str]:
+        """run_id в порядке начала запусков."""
+        with self._lock:
+            rows = self._conn.execute("SELECT run_id FROM flow_runs ORDER BY started_at, rowid").fetchall()
+        return [r[0] for r in rows]
+
     def get(self, key: str, default=None):
-        return self._read().get(key, default)
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM flow_state WHERE run_id = ? AND key = ?", (self.run_id, key)).fetchone()
+        return json.loads(row[0]) if row else default
 
     def set(self, key: str, value: Any) -> None:
-        data = self._read()
-        data[key] = value
-        self._write(data)
+        text = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._ensure_run(self.run_id)
+            self._conn.execute(
+                "INSERT INTO flow_state (run_id, key, value, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(run_id, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                (self.run_id, key, text, time.time()),
+            )
+            self._dirty = True
+            if self.autoflush:
+                self.flush()
+
+    def snapshot(self, run_id: str | None = None) -> dict[str, Any]:
+        """Всё состояние запуска как dict (формат flow_state.json)."""
+        with self._lock:
+            rows = self._conn.execute("SELECT key, value FROM flow_state WHERE run_id = ? ORDER BY updated_at, rowid", (run_id or self.run_id,)).fetchall()
+        return {k: json.loads(v) for k, v in rows}
+
+    def import_json(self, json_path: str, run_id: str | None = None) -> int:
+        """
+        Миграция: импортирует существующий flow_state.json в запуск run_id
+        (по умолчанию — текущий). Возвращает число импортированных ключей.
+        """
+        data = json.loads(Path(json_path).read_text(encoding="utf-8"))
+        with self._lock:
+            current = self.run_id
+            self.run_id = run_id or current
+            try:
+                for key, value in data.items():
+                    self.set(key, value)
+                self.flush()
+            finally:
+                self.run_id = current
+        return len(data)
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._dirty:
+                self._conn.commit()
+                self._dirty = False
+
+    def reload(self) -> None:
+        """Для совместимости с FlowMemory: чтения и так идут в БД."""
+
+    def close(self) -> None:
+        with self._lock:
+            if not self.read_only:
+                self.flush()
+            self._conn.close()
+
+    def __enter__(self) -> SQLiteFlowMemory:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+class JournalFlowMemory:
+    """
+    Память потока как журнал операций: каждая set() — одна JSON-строка в
+    конце лога (O(payload), а не O(всё состояние)). При открытии снимок
+    (<name>.snapshot.json) и лог воспроизводятся в dict в памяти.
+
+    - восстановление после сбоя: недописанная последняя строка отбрасывается;
+    - лог — заодно аудит изменений состояния по ходу запуска (op=run отмечает
+      начало WorkflowRunner.run);
+    - компакция: при превышении compact_max_bytes / compact_max_records
+      состояние пишется в снимок, лог обнуляется (None — порог отключён).
+
+    Интерфейс совместим с FlowMemory (get/set/flush/close, with-блок).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        autoflush: bool = True,
+        compact_max_bytes: int | None = 8 * 1024 * 1024,
+        compact_max_records: int | None = 10_000,
+    ):
+        self.path = Path(path)
+        self.snapshot_path = self.path.with_suffix(".snapshot.json")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.autoflush = autoflush
+        self.compact_max_bytes = compact_max_bytes
+        self.compact_max_records = compact_max_records
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._data: dict[str, Any] = {}
+        self._records = 0
+        self._replay()
+        self._log = self.path.open("a", encoding="utf-8")
+
+    def _replay(self) -> None:
+        if self.snapshot_path.exists():
+            self._data = json.loads(self.snapshot_path.read_text(encoding="utf-8"))
+        if not self.path.exists():
+            return
+        good_bytes = 0
+        with self.path.open("rb") as f:
+            for raw in f:
+                try:
+                    rec = json.loads(raw)
+                except ValueError:
+                    break  # недописанная запись после сбоя — дальше не читаем
+                if not raw.endswith(b"\n") or not self._valid_record(rec):
+                    break  # разобралась, но это не операция лога (правка руками, обрыв) — тоже хвост
+                good_bytes += len(raw)
+                self._records += 1
+                if rec.get("op") == "set":
+                    self._data[rec["key"]] = rec["value"]
+        if good_bytes != self.path.stat().st_size:
+            with self.path.open("r+b") as f:
+                f.truncate(good_bytes)
+
+    @staticmethod
+    def _valid_record(rec: Any) -> bool:
+        if not isinstance(rec, dict) or not isinstance(rec.get("op"), str):
+            return False
+        return rec["op"] != "set" or (isinstance(rec.get("key"), str) and "value" in rec)
+
+    def _append(self, line: str) -> None:
+        self._log.write(line + "\n")
+        self._records += 1
+        self._dirty = True
+        if self.autoflush:
+            self.flush()
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def start_run(self, run_id: str) -> None:
+        """Отмечает начало запуска в логе (для аудита)."""
+        with self._lock:
+            self._append(json.dumps({"op": "run", "run_id": run_id, "ts": time.time()}))
+
+    def get(self, key: str, default=None):
+        return self._data.get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            line = json.dumps({"op": "set", "key": key, "value": value, "ts": time.time()}, ensure_ascii=False)
+            # Сначала состояние, затем лог: flush() внутри _append может запустить компакцию
+            self._data[key] = value
+            self._append(line)
+
+    def history(self) -> list[dict[str, Any]]:
+        """Операции лога после последней компакции (аудит)."""
+        with self._lock:
+            self._log.flush()
+            return [json.loads(line) for line in self.path.read_text(encoding="utf-8").splitlines()]
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._dirty:
+                self._log.flush()
+                self._dirty = False
+            if self._needs_compaction():
+                self.compact()
+
+    def _needs_compaction(self) -> bool:
+        if self.compact_max_records is not None and self._records > self.compact_max_records:
+            return True
+        return self.compact_max_bytes is not None and self._log.tell() > self.compact_max_bytes
+
+    def compact(self) -> None:
+        """Пишет снимок состояния (атомарно) и начинает лог заново."""
+        with self._lock:
+            self._log.flush()
+            fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.snapshot_path.name}.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(json.dumps(self._data, ensure_ascii=False))
+                os.replace(tmp, self.snapshot_path)
+            except BaseException:
+                Path(tmp).unlink(missing_ok=True)
+                raise
+            # Снимок уже содержит все операции: повторное применение лога при сбое
+            # между этими шагами безопасно (set идемпотентен).
+            self._log.close()
+            self._log = self.path.open("w", encoding="utf-8")
+            self._records = 0
+
+    def reload(self) -> None:
+        with self._lock:
+            self._log.close()
+            self._data, self._records = {}, 0
+            self._replay()
+            self._log = self.path.open("a", encoding="utf-8")
+            self._dirty = False
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            self._log.close()
+
+    def __enter__(self) -> JournalFlowMemory:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+# Бэкенды памяти потока: имя → (класс, имя файла в workspace)
+MEMORY_BACKENDS: dict[str, tuple[type, str]] = {
+    "json": (FlowMemory, "flow_state.json"),
+    "sqlite": (SQLiteFlowMemory, "flow_state.sqlite3"),
+    "journal": (JournalFlowMemory, "flow_state.jsonl"),
+}
+
+
+def open_flow_memory(workspace: str, backend: str = "json", **kwargs: Any) -> FlowMemory | SQLiteFlowMemory | JournalFlowMemory:
+    """Открывает память потока выбранного бэкенда в каталоге workspace."""
+    if backend not in MEMORY_BACKENDS:
+        raise ValueError(f"unknown memory backend: {backend!r} (expected one of {tuple(MEMORY_BACKENDS)})")
+    cls, filename = MEMORY_BACKENDS[backend]
+    return cls(str(Path(workspace) / filename), **kwargs)
@@ -0,0 +1,242 @@
+# core/plan.py — скомпилированный план workflow и его дисковый кэш
+from __future__ import annotations
+
+import hashlib
+import heapq
+import json
+import os
+import tempfile
+from contextlib import suppress
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+from mas.core.registry import agent_executors, agent_specs
+
+# Версия формата файла плана: при изменении компиляции старые записи кэша не подходят
+PLAN_FORMAT = 3
+EXECUTORS = ("thread", "process")
+
+
+def step_sources(step: dict[str, Any]) -> list[str]:
+    """
+    Источники входа шага: input_from — id шага, "request" или список из них
+    (fan-in). Порядок сохраняется, повторы убираются.
+    """
+    input_from = step.get("input_from", "request")
+    sources = input_from if isinstance(input_from, list) else [input_from]
+    return [src for i, src in enumerate(sources) if src not in sources[:i]]
+
+
+def check_flow(flow: Any, agent_names: Any) -> tuple[bool, list[str]]:
+    """
+    Проверяет базовые свойства:
+      - наличие workflow.steps (list);
+      - уникальные id шагов;
+      - каждый step.agent зарегистрирован (agent_names поддерживает in);
+      - input_from == "request" или ссылается на существующий предыдущий шаг;
+        список input_from — то же для каждого элемента;
+      - timeout_s/backoff — неотрицательные числа, retries — целое ≥ 0;
+      - foreach — непустое имя поля (допустим путь через точку).
+
+    Возвращает кортеж: (ok, список_ошибок). Не выбрасывает исключений.
+    """
+    errors: list[str] = []
+    wf = flow or {}
+    steps = (wf.get("workflow") or {}).get("steps")
+    if not isinstance(steps, list) or not steps:
+        errors.append("workflow.steps must be a non-empty list")
+        return False, errors
+
+    seen_ids: set[str] = set()
+    for idx, step in enumerate(steps):
+        sid = step.get("id")
+        agent = step.get("agent")
+        input_from = step.get("input_from", "request")
+
+        if not sid or not isinstance(sid, str):
+            errors.append(f"step[{idx}] has invalid 'id'")
+        elif sid in seen_ids:
+            errors.append(f"duplicate step id: {sid}")
+        else:
+            seen_ids.add(sid)
+
+        if not agent or not isinstance(agent, str):
+            errors.append(f"step[{idx}] has invalid 'agent'")
+        elif agent not in agent_names:
+            errors.append(f"agent not found in registry: {agent}")
+
+        if isinstance(input_from, list) and (not input_from or not all(isinstance(src, str) for src in input_from)):
+            errors.append(f"step[{idx}] input_from must be a step id, 'request' or a non-empty list of them")
+        else:
+            for src in step_sources(step):
+                if src != "request" and src not in seen_ids:
+                    # требуем, чтобы ссылка указывала на уже встреченный шаг
+                    errors.append(f"step[{idx}] input_from '{src}' must refer to a previous step id or 'request'")
+
+        errors.extend(_check_step_options(idx, step))
+
+    return (len(errors) == 0), errors
+
+
+def _check_step_options(idx: int, step: dict[str, Any]) -> list[str]:
+    """Ограничения выполнения шага (timeout_s/retries/backoff) и foreach."""
+    errors: list[str] = []
+    for field in ("timeout_s", "backoff"):
+        value = step.get(field)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, int | float) or value < 0):
+            errors.append(f"step[{idx}] '{field}' must be a non-negative number")
+    retries = step.get("retries", 0)
+    if isinstance(retries, bool) or not isinstance(retries, int) or retries < 0:
+        errors.append(f"step[{idx}] 'retries' must be a non-negative integer")
+    foreach = step.get("foreach")
+    if foreach is not None and (not isinstance(foreach, str) or not foreach):
+        errors.append(f"step[{idx}] 'foreach' must be a non-empty field name")
+    return errors
+
+
+def build_dag(steps: list[dict[str, Any]]) -> tuple[dict[str, list[str]], dict[str, list[str]]]:
+    """
+    Строит граф зависимостей по полю input_from (в т.ч. списку источников).
+
+    Возвращает (deps, children): для каждого шага — список предшественников
+    и список потомков. Ссылки на несуществующие шаги не образуют рёбер
+    (поведение как раньше: вход будет прочитан из памяти потока).
+    """
+    ids = {step["id"] for step in steps}
+    deps: dict[str, list[str]] = {step["id"]: [] for step in steps}
+    children: dict[str, list[str]] = {step["id"]: [] for step in steps}
+    for step in steps:
+        for src in step_sources(step):
+            if isinstance(src, str) and src != "request" and src in ids and src != step["id"]:
+                deps[step["id"]].append(src)
+                children[src].append(step["id"])
+    return deps, children
+
+
+def topo_order(steps: list[dict[str, Any]], deps: dict[str, list[str]], children: dict[str, list[str]]) -> list[str]:
+    """Топологический порядок; среди готовых шагов — раньше идущий в YAML. Шаги в цикле — в конце."""
+    index: dict[str, int] = {}
+    for idx, step in enumerate(steps):
+        index.setdefault(step["id"], idx)
+    remaining = {sid: len(up) for sid, up in deps.items()}
+    ready = [(index[sid], sid) for sid, n in remaining.items() if n == 0]
+    heapq.heapify(ready)
+    order: list[str] = []
+    while ready:
+        _, sid = heapq.heappop(ready)
+        order.append(sid)
+        for child in children[sid]:
+            remaining[child] -= 1
+            if remaining[child] == 0:
+                heapq.heappush(ready, (index[child], child))
+    placed = set(order)
+    order.extend(sid for sid in sorted(index, key=index.__getitem__) if sid not in placed)
+    return order
+
+
+@dataclass(frozen=True)
+class CompiledPlan:
+    """
+    Результат разбора и проверки workflow: всё, что раннеру нужно до запуска.
+
+    - key      — sha256 от содержимого flow/agents YAML и agents_pkg;
+    - flow     — разобранный workflow YAML;
+    - agents   — реестр: имя → "module:Class" (классы импортируются лениво);
+    - executors — агенты с явным executor из agents.yaml (thread|process);
+    - order    — топологический порядок шагов;
+    - deps/children — проверенные рёбра DAG по input_from;
+    - ok/errors — итог check_flow().
+
+    Для совместимости с прежним plan() поддерживает plan["ok"], plan["errors"],
+    plan["steps"] (см. summary()).
+    """
+
+    key: str
+    flow: Any
+    agents: dict[str, str]
+    executors: dict[str, str]
+    order: list[str]
+    deps: dict[str, list[str]]
+    children: dict[str, list[str]]
+    ok: bool
+    errors: list[str]
+
+    @property
+    def steps(self) -> list[dict[str, Any]]:
+        return ((self.flow or {}).get("workflow") or {}).get("steps") or []
+
+    def summary(self) -> dict[str, Any]:
+        plan_steps = [{"id": s.get("id"), "agent": s.get("agent"), "input_from": s.get("input_from", "request")} for s in self.steps]
+        return {"ok": self.ok, "errors": list(self.errors), "steps": plan_steps, "order": list(self.order)}
+
+    def __getitem__(self, key: str) -> Any:
+        return self.summary()[key]
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"format": PLAN_FORMAT, **asdict(self)}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> CompiledPlan:
+        if data.get("format") != PLAN_FORMAT:
+            raise ValueError(f"unsupported plan format: {data.get('format')!r}")
+        return cls(**{k: v for k, v in data.items() if k != "format"})
+
+
+def plan_key(flow_text: bytes, agents_text: bytes, agents_pkg: str) -> str:
+    h = hashlib.sha256(f"mas-plan/{PLAN_FORMAT}/{agents_pkg}\0".encode())
+    for chunk in (flow_text, agents_text):
+        h.update(len(chunk).to_bytes(8, "big"))
+        h.update(chunk)
+    return h.hexdigest()
+
+
+def compile_plan(flow_yaml: str, cfg_agents_path: str, agents_pkg: str, cache_dir: str | Path | None = None) -> tuple[CompiledPlan, bool]:
+    """
+    Компилирует план или берёт его из cache_dir/<key>.json.
+    Возвращает (план, взят_ли_из_кэша). Битая или устаревшая запись кэша
+    молча перекомпилируется и перезаписывается.
+    """
+    flow_text = Path(flow_yaml).read_bytes()
+    agents_text = Path(cfg_agents_path).read_bytes()
+    key = plan_key(flow_text, agents_text, agents_pkg)
+
+    path = Path(cache_dir) / f"{key}.json" if cache_dir is not None else None
+    if path is not None:
+        with suppress(OSError, ValueError, TypeError):
+            return CompiledPlan.from_dict(json.loads(path.read_text(encoding="utf-8"))), True
+
+    flow = yaml.safe_load(flow_text)
+    agents_cfg = yaml.safe_load(agents_text)
+    agents = agent_specs(agents_cfg, agents_pkg)
+    executors = agent_executors(agents_cfg)
+    ok, errors = check_flow(flow, agents)
+    bad = [f"agent {name}: unknown executor {ex!r} (expected one of {EXECUTORS})" for name, ex in executors.items() if ex not in EXECUTORS]
+    ok, errors = ok and not bad, errors + bad
+    # Невалидный поток всё равно исполняется «мягко» (как раньше) —
+    # граф строим по шагам, у которых есть id
+    steps = ((flow or {}).get("workflow") or {}).get("steps") if isinstance(flow, dict) else None
+    valid = [s for s in steps or [] if isinstance(s, dict) and isinstance(s.get("id"), str)]
+    deps, children = build_dag(valid)
+    order = topo_order(valid, deps, children)
+    plan = CompiledPlan(key=key, flow=flow, agents=agents, executors=executors, order=order, deps=deps, children=children, ok=ok, errors=errors)
+
+    if path is not None:
+        # YAML с не-JSON значениями (даты и т.п.) просто не кэшируется
+        with suppress(TypeError, ValueError):
+            _write_atomic(path, json.dumps(plan.to_dict(), ensure_ascii=False))
+    return plan, False
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    with suppress(OSError):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, path)
+        except OSError:
+            Path(tmp).unlink(missing_ok=True)
@@ -0,0 +1,102 @@
+# core/procpool.py — «тёплый» пул процессов для CPU-тяжёлых агентов
+from __future__ import annotations
+
+import atexit
+import importlib
+import multiprocessing
+import os
+import threading
+from collections.abc import Iterable
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import suppress
+from typing import Any
+
+from mas.core.agent import AgentContext, AgentResult
+from mas.core.registry import resolve_class
+
+# fork из многопоточного процесса (журнал, пулы шагов) может зависнуть на чужой
+# блокировке. forkserver не подходит: его сервер запускается один раз и не видит
+# каталогов, добавленных в sys.path позже (пакеты агентов). spawn передаёт
+# воркеру текущий sys.path при каждом старте.
+MP_CONTEXT = multiprocessing.get_context("spawn")
+
+
+def _init_worker(modules: tuple[str, ...]) -> None:
+    """Инициализатор процесса: заранее импортирует модули агентов (ошибки проявятся при вызове)."""
+    for name in modules:
+        with suppress(Exception):
+            importlib.import_module(name)
+
+
+def _ready() -> int:
+    return os.getpid()
+
+
+def execute_ref(ref: str, ctx: AgentContext, input_data: Any) -> AgentResult:
+    """
+    Выполнение шага в процессе пула. Передаётся ссылка "module:Class", а не
+    класс: воркер берёт класс из своего кэша (модуль уже импортирован).
+    """
+    agent_cls, _ = resolve_class(ref)
+    return agent_cls(ctx).run(input_data)  # type: ignore[call-arg]
+
+
+class WarmProcessPool:
+    """
+    ProcessPoolExecutor, процессы которого стартуют сразу (а не при первой
+    задаче) и импортируют модули агентов в инициализаторе. Пул живёт между
+    запусками — ради этого его и держат «тёплым»; закрывается при выходе
+    из интерпретатора.
+    """
+
+    def __init__(self, max_workers: int, preload: Iterable[str] = ()):
+        self.max_workers = max_workers
+        self.preload = tuple(sorted(set(preload)))
+        self._lock = threading.Lock()
+        self._pool = self._start()
+
+    def _start(self) -> ProcessPoolExecutor:
+        pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=MP_CONTEXT, initializer=_init_worker, initargs=(self.preload,))
+        # Прогрев: по задаче на воркер — процессы создаются и проходят инициализацию
+        for _ in range(self.max_workers):
+            pool.submit(_ready)
+        return pool
+
+    def submit(self, fn: Any, *args: Any) -> Future:
+        """Задача в пул; если воркер умер (BrokenProcessPool), пул пересоздаётся и задача отправляется заново."""
+        pool = self._pool
+        try:
+            return pool.submit(fn, *args)
+        except BrokenProcessPool:
+            with self._lock:
+                if self._pool is pool:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    self._pool = self._start()
+            return self._pool.submit(fn, *args)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+_POOLS: dict[tuple[int, tuple[str, ...]], WarmProcessPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def warm_pool(max_workers: int, preload: Iterable[str] = ()) -> WarmProcessPool:
+    """Общий для процесса тёплый пул с данным размером и набором предзагружаемых модулей."""
+    key = (max_workers, tuple(sorted(set(preload))))
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = _POOLS[key] = WarmProcessPool(max_workers, key[1])
+        return pool
+
+
+@atexit.register
+def _shutdown_pools() -> None:
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        pool.shutdown(wait=False)
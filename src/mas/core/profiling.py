@@ -0,0 +1,187 @@
+# core/profiling.py — профилирование шагов WorkflowRunner (cProfile, tracemalloc, RSS)
+from __future__ import annotations
+
+import cProfile
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+try:  # только Unix; без него в метриках нет process_peak_rss_kb
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None  # type: ignore[assignment]
+
+try:  # опционально: текущий RSS на любой ОС (без него — /proc/self/statm, только Linux)
+    import psutil
+except ImportError:
+    psutil = None  # type: ignore[assignment]
+
+PROFILE_MODES = ("cpu", "mem", "both")
+# Сколько строк с наибольшим приростом памяти писать в <шаг>.alloc.txt
+ALLOC_TOP_N = 25
+# Как часто ожидающий профилировщика шаг проверяет отмену, с
+_WAIT_POLL_S = 0.1
+
+# cProfile (sys.monitoring) и tracemalloc — одни на интерпретатор: в процессе
+# одновременно профилируется один шаг, остальные ждут
+_LOCK = threading.Lock()
+_ALLOC_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+)
+
+
+@dataclass(frozen=True)
+class ProfiledResult:
+    """Результат агента и метрики шага — так профилированный вызов возвращается из пула."""
+
+    result: Any
+    metrics: dict[str, Any]
+
+
+def _peak_rss_kb() -> int | None:
+    # ru_maxrss: Linux — КиБ, macOS — байты
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def _rss_kb() -> int | None:
+    """Текущий RSS процесса, КиБ (в отличие от ru_maxrss может и уменьшаться); None — нечем измерить."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss // 1024
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+@dataclass(frozen=True)
+class StepProfiler:
+    """
+    🆕: Профилировщик шагов одного запуска (WorkflowRunner(profile=...), mas run --profile).
+
+    mode: "cpu" — cProfile, <label>.pstats; "mem" — tracemalloc, <label>.alloc.txt
+    (top-N строк по приросту памяти за шаг); "both" — оба. В любом режиме
+    метрики шага: cpu_ms (процессорное время потока шага), rss_kb (текущий RSS
+    после шага) и rss_delta_kb (его изменение за шаг), alloc_kb / alloc_peak_kb
+    (mem). process_peak_rss_kb — пик RSS всего процесса (ru_maxrss) на момент
+    конца шага: он не убывает, поэтому по нему не видно, какой шаг тяжелее.
+    Файлы — в directory (workspace/logs/profiles/<run_id>/), пути в метриках —
+    относительно неё.
+
+    Экземпляр пиклится (только mode, directory, top_n), поэтому работает и в
+    тёплом пуле процессов. В одном процессе одновременно профилируется один
+    шаг: параллельные шаги потоков на время профилирования выполняются по одному
+    (ожидание очереди не входит в timeout_s шага — см. on_start в call()).
+    """
+
+    mode: str
+    directory: str
+    top_n: int = ALLOC_TOP_N
+
+    def __post_init__(self) -> None:
+        if self.mode not in PROFILE_MODES:
+            raise ValueError(f"unknown profile mode: {self.mode!r} (expected one of {PROFILE_MODES})")
+
+    @property
+    def cpu(self) -> bool:
+        return self.mode in ("cpu", "both")
+
+    @property
+    def mem(self) -> bool:
+        return self.mode in ("mem", "both")
+
+    def call(self, label: str, token: Any, on_start: Callable[[], None] | None, fn: Any, *args: Any) -> ProfiledResult:
+        """
+        Выполняет fn(*args) под профилировщиком; token (CancelToken) прерывает ожидание
+        очереди. on_start() вызывается, когда очередь подошла: с этого момента раннер
+        отсчитывает timeout_s шага (ожидание чужих шагов — не время шага).
+        """
+        while not _LOCK.acquire(timeout=_WAIT_POLL_S):
+            if token is not None and token.cancelled:
+                # попытку уже отменили — выполняем без профиля, агент сам увидит отмену
+                return ProfiledResult(fn(*args), {"skipped": "cancelled"})
+        try:
+            if on_start is not None:
+                on_start()
+            return self._call_locked(label, fn, *args)
+        finally:
+            _LOCK.release()
+
+    def _call_locked(self, label: str, fn: Any, *args: Any) -> ProfiledResult:
+        directory = Path(self.directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        started_tracing = self.mem and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if self.mem:
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot().filter_traces(_ALLOC_FILTERS)
+            traced0 = tracemalloc.get_traced_memory()[0]
+        profiler = cProfile.Profile() if self.cpu else None
+        rss0 = _rss_kb()
+        cpu0 = time.thread_time()
+        if profiler is not None:
+            try:
+                profiler.enable()
+            except ValueError:  # процесс уже под внешним профилировщиком — без .pstats
+                profiler = None
+        try:
+            try:
+                result = fn(*args)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+            metrics: dict[str, Any] = {"cpu_ms": round((time.thread_time() - cpu0) * 1000, 3)}
+            # профилируемые шаги процесса идут по одному — изменение RSS относится к этому шагу
+            rss = _rss_kb()
+            if rss is not None and rss0 is not None:
+                metrics.update(rss_kb=rss, rss_delta_kb=rss - rss0)
+            process_peak = _peak_rss_kb()
+            if process_peak is not None:
+                metrics["process_peak_rss_kb"] = process_peak
+            if profiler is not None:
+                profiler.dump_stats(directory / f"{label}.pstats")
+                metrics["pstats"] = f"{label}.pstats"
+            if self.mem:
+                traced, peak = tracemalloc.get_traced_memory()
+                after = tracemalloc.take_snapshot().filter_traces(_ALLOC_FILTERS)
+                top = after.compare_to(before, "lineno")[: self.top_n]
+                (directory / f"{label}.alloc.txt").write_text("".join(f"{stat}\n" for stat in top), encoding="utf-8")
+                metrics.update(alloc_kb=round((traced - traced0) / 1024, 1), alloc_peak_kb=round((peak - traced0) / 1024, 1), alloc=f"{label}.alloc.txt")
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+        return ProfiledResult(result, metrics)
+
+
+def profiled_call(profiler: StepProfiler, label: str, token: Any, on_start: Callable[[], None] | None, fn: Any, *args: Any) -> ProfiledResult:
+    """Функция модульного уровня — для пулов потоков и процессов (pickle по ссылке; в процесс on_start=None)."""
+    return profiler.call(label, token, on_start, fn, *args)
+
+
+def merge_metrics(total: dict[str, Any] | None, item: dict[str, Any]) -> dict[str, Any]:
+    """Метрики foreach-шага по элементам: время и аллокации суммируются, пики — максимум."""
+    if total is None:
+        return {key: value for key, value in item.items() if isinstance(value, (int, float))}
+    merged = dict(total)
+    for key, value in item.items():
+        if not isinstance(value, (int, float)):
+            continue
+        if key in ("rss_kb", "process_peak_rss_kb", "alloc_peak_kb"):
+            merged[key] = max(merged.get(key, value), value)
+        else:
+            merged[key] = round(merged.get(key, 0) + value, 3)
+    return merged
@@ -0,0 +1,100 @@
+# core/registry.py — ленивый реестр агентов (импорт модуля при первом использовании)
+from __future__ import annotations
+
+import importlib
+import threading
+import time
+from collections.abc import Iterator, Mapping
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+from mas.core.agent import BaseAgent
+
+# Общий для процесса кэш классов агентов: "module:Class" -> класс.
+# Несколько раннеров (run_many, тесты, сервер) не импортируют один и тот же агент повторно.
+_CLASS_CACHE: dict[str, type[BaseAgent]] = {}
+_CLASS_CACHE_LOCK = threading.Lock()
+
+
+def resolve_class(ref: str) -> tuple[type[BaseAgent], bool]:
+    """
+    Возвращает (класс, был_ли_в_кэше) по ссылке "module:Class".
+    Импорт выполняется не более одного раза на процесс.
+    """
+    cls = _CLASS_CACHE.get(ref)
+    if cls is not None:
+        return cls, True
+    with _CLASS_CACHE_LOCK:
+        cls = _CLASS_CACHE.get(ref)
+        if cls is not None:
+            return cls, True
+        module_name, _, attr = ref.partition(":")
+        cls = getattr(importlib.import_module(module_name), attr)
+        _CLASS_CACHE[ref] = cls
+        return cls, False
+
+
+def agent_specs(cfg: dict[str, Any], agents_pkg: str) -> dict[str, str]:
+    """Разбор agents.yaml: имя → "module:Class" (модуль по умолчанию — <agents_pkg>.<name>)."""
+    return {name: f"{meta.get('module') or f'{agents_pkg}.{name}'}:{meta['type']}" for name, meta in cfg["agents"].items()}
+
+
+def agent_executors(cfg: dict[str, Any]) -> dict[str, str]:
+    """Агенты agents.yaml с явным executor (thread|process): имя → executor."""
+    return {name: meta["executor"] for name, meta in cfg["agents"].items() if meta.get("executor") is not None}
+
+
+class AgentRegistry(Mapping[str, type[BaseAgent]]):
+    """
+    Реестр агентов из agents.yaml без импорта модулей при создании.
+
+    Запись agents.yaml: {type: Class[, module: pkg.mod][, executor: process]}; по умолчанию модуль —
+    <agents_pkg>.<name>. Проверка «агент зарегистрирован» (in, len, iter) не
+    импортирует ничего; класс импортируется при первом registry[name] /
+    resolve(name) и кладётся в общий кэш процесса.
+    """
+
+    def __init__(self, specs: dict[str, str]):
+        self._specs = specs
+        self._resolved: dict[str, type[BaseAgent]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_yaml(cls, path: str, agents_pkg: str) -> AgentRegistry:
+        return cls(agent_specs(yaml.safe_load(Path(path).read_text(encoding="utf-8")), agents_pkg))
+
+    def ref(self, name: str) -> str:
+        """Ссылка "module:Class" агента (KeyError для незарегистрированного)."""
+        return self._specs[name]
+
+    def resolve(self, name: str) -> tuple[type[BaseAgent], dict[str, Any] | None]:
+        """
+        Возвращает (класс, запись об импорте). Запись — только при первом
+        обращении к агенту через этот реестр: {agent, ref, duration_ms, process_cached}.
+        """
+        cls = self._resolved.get(name)
+        if cls is not None:
+            return cls, None
+        with self._lock:
+            cls = self._resolved.get(name)
+            if cls is not None:
+                return cls, None
+            ref = self._specs[name]
+            t0 = time.perf_counter()
+            cls, cached = resolve_class(ref)
+            self._resolved[name] = cls
+        return cls, {"agent": name, "ref": ref, "duration_ms": round((time.perf_counter() - t0) * 1000, 3), "process_cached": cached}
+
+    def __getitem__(self, name: str) -> type[BaseAgent]:
+        return self.resolve(name)[0]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._specs
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._specs)
+
+    def __len__(self) -> int:
+        return len(self._specs)
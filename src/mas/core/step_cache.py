@@ -0,0 +1,113 @@
+# core/step_cache.py — контентно-адресуемый кэш результатов шагов
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from contextlib import suppress
+from pathlib import Path
+from typing import Any
+
+
+def canonical_json(data: Any) -> str:
+    """Каноничная JSON-форма (сортировка ключей, без пробелов) — основа ключа кэша."""
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def content_hash(data: Any) -> str:
+    """Короткий sha256 каноничной JSON-формы (журнал: input_hash/output_hash шагов)."""
+    return hashlib.sha256(canonical_json(data).encode("utf-8")).hexdigest()[:16]
+
+
+class StepCache:
+    """
+    Дисковый кэш выходов шагов WorkflowRunner.
+
+    Ключ — sha256 от (класс агента + его version, id шага, каноничный вход).
+    Записи лежат в <root>/<kk>/<key>.json; mtime записи обновляется при
+    попадании, поэтому evict() вытесняет давно не использованные записи.
+
+    Ограничения (None — без ограничения):
+      - max_entries — число записей;
+      - max_bytes   — суммарный размер;
+      - max_age_s   — возраст с последнего использования.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        max_entries: int | None = 10_000,
+        max_bytes: int | None = 256 * 1024 * 1024,
+        max_age_s: float | None = 7 * 24 * 3600,
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+
+    @staticmethod
+    def key(agent_cls: type, step_id: str, input_data: Any) -> str:
+        agent_ref = f"{agent_cls.__module__}.{agent_cls.__qualname__}@{getattr(agent_cls, 'version', '0')}"
+        material = canonical_json({"agent": agent_ref, "step": step_id, "input": input_data})
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        """Возвращает закэшированный payload или None (промах/просрочка/битая запись)."""
+        path = self._path(key)
+        try:
+            if self.max_age_s is not None and time.time() - path.stat().st_mtime > self.max_age_s:
+                path.unlink(missing_ok=True)
+                return None
+            payload = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        with suppress(OSError):
+            os.utime(path)  # «касание» для LRU-вытеснения
+        return payload
+
+    def put(self, key: str, payload: dict[str, Any]) -> bool:
+        """Атомарно сохраняет payload. Несериализуемые выходы не кэшируются (False)."""
+        try:
+            text = json.dumps(payload, ensure_ascii=False)
+        except (TypeError, ValueError):
+            return False
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, path)
+        except OSError:
+            Path(tmp).unlink(missing_ok=True)
+            return False
+        return True
+
+    def evict(self) -> int:
+        """Удаляет просроченные записи, затем самые старые сверх лимитов. Возвращает число удалённых."""
+        entries: list[tuple[float, int, Path]] = []
+        for path in self.root.glob("*/*.json"):
+            with suppress(OSError):
+                st = path.stat()
+                entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()  # старые — первыми
+
+        now = time.time()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            expired = self.max_age_s is not None and now - mtime > self.max_age_s
+            over_count = self.max_entries is not None and len(entries) - removed > self.max_entries
+            over_size = self.max_bytes is not None and total > self.max_bytes
+            if not (expired or over_count or over_size):
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
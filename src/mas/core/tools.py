@@ -1,19 +1,421 @@
 # core/tools.py — протоколы инструментов и набор
 from __future__ import annotations
 
+import asyncio
+import bisect
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Iterable
+from concurrent.futures import Future
+from dataclasses import dataclass, field
 from typing import Any, Protocol
 
+from mas.core.step_cache import canonical_json
+from mas.core.tracing import span
+
+# Границы корзин гистограммы задержек, мс (последняя корзина — всё, что больше)
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+
+
+# Размер семафора Toolset.gather() по умолчанию
+GATHER_CONCURRENCY = 8
+# Шаг опроса свободного слота max_concurrency из корутины (слоты общие с потоками)
+_SLOT_POLL_S = 0.005
+
 
 class Tool(Protocol):
     def __call__(self, **kwargs) -> Any: ...
 
 
+class AsyncTool(Protocol):
+    """🆕: Асинхронный инструмент: async def __call__(**kwargs)."""
+
+    def __call__(self, **kwargs) -> Awaitable[Any]: ...
+
+
+@dataclass(frozen=True)
+class ToolCall:
+    """🆕: Вызов для Toolset.gather(): имя инструмента и его kwargs."""
+
+    name: str
+    kwargs: dict[str, Any] = field(default_factory=dict)
+
+
+def _is_async(tool: Any) -> bool:
+    # функция/метод async def или объект с async def __call__
+    return inspect.iscoroutinefunction(tool) or (not inspect.isroutine(tool) and inspect.iscoroutinefunction(type(tool).__call__))
+
+
+async def _await(aw: Awaitable[Any]) -> Any:
+    return await aw
+
+
+async def _call_async(tool: Any, kwargs: dict[str, Any]) -> Any:
+    """async-инструмент ожидается, синхронный выполняется в потоке, не блокируя loop."""
+    if _is_async(tool):
+        return await tool(**kwargs)
+    result = await asyncio.to_thread(lambda: tool(**kwargs))
+    return await result if inspect.isawaitable(result) else result
+
+
+@dataclass(frozen=True)
+class ToolPolicy:
+    """
+    🆕: Политика вызова инструмента (Toolset.register(..., policy=...)).
+
+    - memoize        — кэшировать результат по kwargs (каноничный JSON —
+                       kwargs должны быть JSON-совместимыми);
+                       одинаковые одновременные вызовы выполняются один раз;
+    - cache_size     — LRU: сколько результатов хранить;
+    - ttl_s          — срок жизни результата (None — бессрочно);
+    - max_concurrency — сколько вызовов инструмента выполняется одновременно;
+    - rate / burst   — token bucket: не больше rate вызовов в секунду
+                       в среднем, до burst подряд.
+
+    Кэш — в памяти процесса: он общий для шагов и запусков, использующих
+    один Toolset (run_many, сервер). Результат из кэша — тот же объект:
+    вызывающий не должен его изменять.
+    """
+
+    memoize: bool = False
+    cache_size: int = 256
+    ttl_s: float | None = None
+    max_concurrency: int | None = None
+    rate: float | None = None
+    burst: int = 1
+
+
+class LatencyHistogram:
+    """🆕: Гистограмма задержек с фиксированными корзинами (LATENCY_BUCKETS_MS)."""
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, ms: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+            self.count += 1
+            self.total_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> float | None:
+        """Оценка q-квантиля (0..1) — верхняя граница корзины; None — наблюдений нет."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return float(LATENCY_BUCKETS_MS[i]) if i < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            buckets = {f"le_{b}": n for b, n in zip(LATENCY_BUCKETS_MS, self.counts, strict=False)}
+            buckets["inf"] = self.counts[-1]
+            count, total, peak = self.count, self.total_ms, self.max_ms
+        return {
+            "count": count,
+            "avg_ms": total / count if count else None,
+            "max_ms": peak,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "buckets": buckets,
+        }
+
+
+class TokenBucket:
+    """🆕: Ограничитель частоты: rate токенов в секунду, не больше burst в запасе."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be > 0 and burst >= 1")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Берёт токен в долг; возвращает, сколько секунд подождать до его «погашения»."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= 1
+            # Долг распределяет ожидающих по очереди: каждый ждёт свой слот
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def acquire(self) -> float:
+        """Берёт токен, при необходимости ждёт. Возвращает время ожидания, с."""
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self) -> float:
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class PolicyTool:
+    """🆕: Инструмент, обёрнутый политикой: кэш, лимиты и метрики вызовов."""
+
+    def __init__(self, name: str, tool: Tool, policy: ToolPolicy):
+        self.name = name
+        self.tool = tool
+        self.policy = policy
+        self.latency = LatencyHistogram()
+        self._bucket = TokenBucket(policy.rate, policy.burst) if policy.rate else None
+        self._slots = threading.BoundedSemaphore(policy.max_concurrency) if policy.max_concurrency else None
+        self._cache: OrderedDict[str, tuple[float | None, Any]] = OrderedDict()
+        self._inflight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hits = 0
+        self.misses = 0
+        self.deduped = 0  # дождались одинакового вызова, выполнявшегося одновременно
+        self.errors = 0
+        self.throttled_s = 0.0
+
+    def __call__(self, **kwargs: Any) -> Any:
+        key, hit, pending, future = self._begin(kwargs)
+        if hit is not None:
+            return hit[0]
+        if pending is not None:
+            return pending.result()
+        try:
+            result = self._invoke(kwargs)
+        except BaseException as e:
+            self._fail(key, future, e)
+            raise
+        return self._store(key, future, result)
+
+    async def acall(self, **kwargs: Any) -> Any:
+        """🆕: Вызов из корутины: async-инструмент ожидается, синхронный — выполняется в потоке."""
+        key, hit, pending, future = self._begin(kwargs)
+        if hit is not None:
+            return hit[0]
+        if pending is not None:
+            return await asyncio.wrap_future(pending)
+        try:
+            result = await self._ainvoke(kwargs)
+        except BaseException as e:
+            self._fail(key, future, e)
+            raise
+        return self._store(key, future, result)
+
+    def _begin(self, kwargs: dict[str, Any]) -> tuple[str | None, tuple[Any] | None, Future | None, Future | None]:
+        """
+        Учёт вызова и поиск в кэше: (ключ, (результат,) при попадании,
+        future одинакового выполняющегося вызова, future этого вызова — если выполнять его).
+        """
+        with self._lock:
+            self.calls += 1
+        if not self.policy.memoize:
+            return None, None, None, None
+        key = canonical_json(kwargs)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > time.monotonic()):
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return key, (entry[1],), None, None
+            # Такой же вызов уже выполняется — ждём его результат, а не вызываем повторно
+            pending = self._inflight.get(key)
+            if pending is not None:
+                self.deduped += 1
+                return key, None, pending, None
+            self.misses += 1
+            future = self._inflight[key] = Future()
+        return key, None, None, future
+
+    def _store(self, key: str | None, future: Future | None, result: Any) -> Any:
+        if key is None or future is None:
+            return result
+        with self._lock:
+            self._inflight.pop(key, None)
+            expires = time.monotonic() + self.policy.ttl_s if self.policy.ttl_s is not None else None
+            self._cache[key] = (expires, result)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.policy.cache_size:
+                self._cache.popitem(last=False)
+        future.set_result(result)
+        return result
+
+    def _fail(self, key: str | None, future: Future | None, error: BaseException) -> None:
+        if key is None or future is None:
+            return
+        with self._lock:
+            self._inflight.pop(key, None)
+        future.set_exception(error)
+
+    def _invoke(self, kwargs: dict[str, Any]) -> Any:
+        if self._bucket is not None:
+            waited = self._bucket.acquire()
+            with self._lock:
+                self.throttled_s += waited
+        if self._slots is not None:
+            self._slots.acquire()
+        t0 = time.perf_counter()
+        try:
+            result = self.tool(**kwargs)
+            if inspect.isawaitable(result):
+                # async-инструмент из синхронного кода
+                result = asyncio.run(_await(result))
+            return result
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            self.latency.observe((time.perf_counter() - t0) * 1000)
+            if self._slots is not None:
+                self._slots.release()
+
+    async def _ainvoke(self, kwargs: dict[str, Any]) -> Any:
+        if self._bucket is not None:
+            waited = await self._bucket.aacquire()
+            with self._lock:
+                self.throttled_s += waited
+        if self._slots is not None:
+            # Семафор общий с синхронными вызовами из потоков — не блокируем loop
+            while not self._slots.acquire(blocking=False):
+                await asyncio.sleep(_SLOT_POLL_S)
+        t0 = time.perf_counter()
+        try:
+            return await _call_async(self.tool, kwargs)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            self.latency.observe((time.perf_counter() - t0) * 1000)
+            if self._slots is not None:
+                self._slots.release()
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            counters = {
+                "calls": self.calls,
+                "hits": self.hits,
+                "misses": self.misses,
+                "deduped": self.deduped,
+                "errors": self.errors,
+                "cached": len(self._cache),
+                "throttled_s": self.throttled_s,
+            }
+        return {**counters, "latency": self.latency.snapshot()}
+
+
 class Toolset:
+    """
+    Набор инструментов «имя → вызываемый объект».
+
+    🆕 Инструменты могут быть синхронными (Tool) и асинхронными (AsyncTool):
+    call() выполняет любой из них синхронно, acall() — из корутины (синхронный
+    инструмент уходит в поток). gather()/agather() выполняют пачку вызовов
+    одновременно под общим таймаутом и семафором, результаты — в порядке вызовов.
+    """
+
     def __init__(self, **tools: dict[str, Tool]):
         self._tools = tools
 
     def get(self, name: str) -> Tool:
         return self._tools[name]
 
-    def register(self, name: str, tool: Tool) -> None:
-        self._tools[name] = tool
+    def register(self, name: str, tool: Tool, policy: ToolPolicy | None = None) -> None:
+        """🆕 policy — кэш результатов, лимит параллелизма и частоты, гистограмма задержек."""
+        self._tools[name] = PolicyTool(name, tool, policy) if policy is not None else tool
+
+    def call(self, name: str, **kwargs: Any) -> Any:
+        # 🆕: span tool.call — дочерний span шага при трассировке запуска
+        with span("tool.call", tool=name):
+            result = self._tools[name](**kwargs)
+            # async-инструмент без политики: выполняем до результата
+            return asyncio.run(_await(result)) if inspect.isawaitable(result) else result
+
+    async def acall(self, name: str, **kwargs: Any) -> Any:
+        tool = self._tools[name]
+        with span("tool.call", tool=name):
+            if isinstance(tool, PolicyTool):
+                return await tool.acall(**kwargs)
+            return await _call_async(tool, kwargs)
+
+    async def agather(
+        self,
+        calls: Iterable[ToolCall | tuple[str, dict[str, Any]]],
+        timeout: float | None = None,
+        concurrency: int = GATHER_CONCURRENCY,
+        return_exceptions: bool = False,
+    ) -> list[Any]:
+        """
+        🆕: Выполняет вызовы одновременно (не больше concurrency сразу) и
+        возвращает результаты в порядке calls.
+
+        timeout — общий на всю пачку. По умолчанию первая ошибка (в порядке
+        calls) или истечение таймаута (TimeoutError) отменяет незавершённые
+        вызовы и пробрасывается. return_exceptions=True — ошибки и
+        TimeoutError для незавершённых вызовов возвращаются на их местах.
+        Синхронные инструменты выполняются в потоках: отмена не прерывает
+        уже начатый вызов, его результат просто не ждут.
+        """
+        items = [c if isinstance(c, ToolCall) else ToolCall(*c) for c in calls]
+        if not items:
+            return []
+        slots = asyncio.Semaphore(concurrency)
+
+        async def run(call: ToolCall) -> Any:
+            async with slots:
+                return await self.acall(call.name, **call.kwargs)
+
+        tasks = [asyncio.ensure_future(run(call)) for call in items]
+        try:
+            done, pending = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.ALL_COMPLETED if return_exceptions else asyncio.FIRST_EXCEPTION)
+        finally:
+            for task in tasks:
+                task.cancel()  # no-op для завершённых; при отмене самого agather — гасим всё
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        timed_out = TimeoutError(f"{len(pending)} of {len(tasks)} tool calls did not finish in {timeout}s")
+        if return_exceptions:
+            return [timed_out if task in pending else (task.exception() or task.result()) for task in tasks]
+        for task in tasks:
+            if task in done and task.exception() is not None:
+                raise task.exception()  # type: ignore[misc]
+        if pending:
+            raise timed_out
+        return [task.result() for task in tasks]
+
+    def gather(
+        self,
+        calls: Iterable[ToolCall | tuple[str, dict[str, Any]]],
+        timeout: float | None = None,
+        concurrency: int = GATHER_CONCURRENCY,
+        return_exceptions: bool = False,
+    ) -> list[Any]:
+        """🆕: agather() для синхронного кода (BaseAgent.run); из корутины используйте await agather()."""
+        return asyncio.run(self.agather(calls, timeout=timeout, concurrency=concurrency, return_exceptions=return_exceptions))
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """🆕: Метрики инструментов, зарегистрированных с политикой."""
+        return {name: tool.stats() for name, tool in self._tools.items() if isinstance(tool, PolicyTool)}
+
+    def clear_cache(self, name: str | None = None) -> None:
+        for tool_name, tool in self._tools.items():
+            if isinstance(tool, PolicyTool) and name in (None, tool_name):
+                tool.clear_cache()
@@ -0,0 +1,217 @@
+# core/tracing.py — вложенные span запуска (run → step → tool → file) и экспорт OTLP JSON / Chrome trace
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections.abc import Awaitable, Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+SERVICE_NAME = "mas"
+# Монотонные часы → Unix-время: опорная точка берётся один раз на процесс,
+# длительности span считаются по perf_counter_ns и не «прыгают» вместе с системными часами
+_WALL_ANCHOR_NS = time.time_ns()
+_PERF_ANCHOR_NS = time.perf_counter_ns()
+
+_CURRENT: ContextVar[Span | None] = ContextVar("mas_span", default=None)
+_NOOP: AbstractContextManager[None] = nullcontext()
+
+
+def _now_ns() -> int:
+    return _WALL_ANCHOR_NS + time.perf_counter_ns() - _PERF_ANCHOR_NS
+
+
+@dataclass
+class Span:
+    """Участок работы: имя, родитель, время (нс, Unix), атрибуты, процесс и поток."""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    start_ns: int
+    end_ns: int = 0
+    attributes: dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+    pid: int = field(default_factory=os.getpid)
+    tid: int = field(default_factory=threading.get_native_id)
+    tracer: Tracer | None = field(default=None, repr=False, compare=False)
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def __getstate__(self) -> dict[str, Any]:
+        # в другой процесс span уходит без трассировщика (см. traced_call)
+        return {**self.__dict__, "tracer": None}
+
+
+@dataclass(frozen=True)
+class TracedResult:
+    """Результат шага из процесса пула и span, записанные в этом процессе."""
+
+    result: Any
+    spans: list[Span]
+
+
+class Tracer:
+    """
+    🆕: Сборщик span одной трассы (WorkflowRunner(trace=True), mas run --trace).
+
+    Текущий span хранится в contextvars: span() внутри шага, инструмента или
+    RepoOps становится дочерним без передачи трассировщика явно. В пулы
+    потоков и процессов родитель передаётся явно (traced_call); span из
+    процесса пула возвращаются вместе с результатом и добавляются сюда.
+    Время — монотонное (perf_counter_ns), привязанное к Unix-времени.
+    """
+
+    def __init__(self, trace_id: str | None = None):
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self._spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, parent: Span | None = None, **attributes: Any) -> Iterator[Span]:
+        parent = parent if parent is not None else _CURRENT.get()
+        current = Span(name, self.trace_id, os.urandom(8).hex(), parent.span_id if parent else None, _now_ns(), attributes=attributes, tracer=self)
+        token = _CURRENT.set(current)
+        try:
+            yield current
+        except BaseException as e:
+            current.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            current.end_ns = _now_ns()
+            _CURRENT.reset(token)
+            self.add([current])
+
+    def add(self, spans: list[Span]) -> None:
+        with self._lock:
+            self._spans.extend(spans)
+
+    def spans(self) -> list[Span]:
+        with self._lock:
+            return sorted(self._spans, key=lambda s: s.start_ns)
+
+    def export(self, directory: str | Path, stem: str) -> dict[str, Path]:
+        """Пишет <stem>.otlp.json и <stem>.trace.json (chrome://tracing, Perfetto)."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        spans = self.spans()
+        paths = {"otlp": directory / f"{stem}.otlp.json", "chrome": directory / f"{stem}.trace.json"}
+        paths["otlp"].write_text(json.dumps(to_otlp(spans), ensure_ascii=False), encoding="utf-8")
+        paths["chrome"].write_text(json.dumps(to_chrome(spans), ensure_ascii=False), encoding="utf-8")
+        return paths
+
+
+def current_span() -> Span | None:
+    return _CURRENT.get()
+
+
+def span(name: str, **attributes: Any) -> AbstractContextManager[Span | None]:
+    """
+    Дочерний span текущего — для инструментируемого кода (Toolset, RepoOps, агенты).
+    Вне трассы — общий no-op контекст, почти бесплатно.
+    """
+    current = _CURRENT.get()
+    if current is None or current.tracer is None:
+        return _NOOP
+    return current.tracer.span(name, **attributes)
+
+
+def traced_call(parent: Span, name: str, attributes: dict[str, Any], fn: Any, *args: Any) -> Any:
+    """
+    Выполняет fn(*args) в span name — дочернем parent. Функция модульного уровня
+    для пулов: в потоке span пишется в трассировщик parent, в процессе пула
+    (parent пришёл без трассировщика) — в локальный, и результат возвращается
+    как TracedResult вместе с его span.
+    """
+    tracer = parent.tracer
+    local = tracer is None
+    if tracer is None:
+        tracer = Tracer(parent.trace_id)
+    with tracer.span(name, parent=parent, **attributes):
+        result = fn(*args)
+    return TracedResult(result, tracer.spans()) if local else result
+
+
+async def traced_acall(parent: Span, name: str, attributes: dict[str, Any], aw: Awaitable[Any]) -> Any:
+    """Асинхронный вариант traced_call для корутины в том же процессе."""
+    if parent.tracer is None:
+        return await aw
+    with parent.tracer.span(name, parent=parent, **attributes):
+        return await aw
+
+
+# --- экспорт -------------------------------------------------------------
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}  # int64 в OTLP JSON — строкой
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, default=str)}
+
+
+def to_otlp(spans: list[Span]) -> dict[str, Any]:
+    """ExportTraceServiceRequest в JSON-кодировке OTLP (resourceSpans → scopeSpans → spans)."""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+                "scopeSpans": [
+                    {
+                        "scope": {"name": "mas.core.tracing"},
+                        "spans": [
+                            {
+                                "traceId": s.trace_id,
+                                "spanId": s.span_id,
+                                "parentSpanId": s.parent_id or "",
+                                "name": s.name,
+                                "kind": 1,  # SPAN_KIND_INTERNAL
+                                "startTimeUnixNano": str(s.start_ns),
+                                "endTimeUnixNano": str(s.end_ns),
+                                "attributes": [
+                                    {"key": key, "value": _otlp_value(value)}
+                                    for key, value in {**s.attributes, "process.pid": s.pid, "thread.id": s.tid}.items()
+                                    if value is not None
+                                ],
+                                "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+                            }
+                            for s in spans
+                        ],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+def to_chrome(spans: list[Span]) -> dict[str, Any]:
+    """Trace Event Format: события "X" (начало + длительность, мкс от начала трассы), pid/tid — реальные."""
+    t0 = min((s.start_ns for s in spans), default=0)
+    events = [
+        {
+            "name": s.name,
+            "cat": s.name.split(".", 1)[0],
+            "ph": "X",
+            "ts": (s.start_ns - t0) / 1000,
+            "dur": (s.end_ns - s.start_ns) / 1000,
+            "pid": s.pid,
+            "tid": s.tid,
+            "args": {**s.attributes, **({"error": s.error} if s.error else {})},
+        }
+        for s in spans
+    ]
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
@@ -1,24 +1,156 @@
 from __future__ import annotations
 
-import importlib  # 🛠️ [SAFE REFACTOR] поднято на верхний уровень (ruff PLC0415)
+import heapq
+import itertools
 import json
+import os
+import re
+import threading
 import time
-from collections.abc import Iterable
+import uuid
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ThreadPoolExecutor, wait
 
 # 🆕: используем suppress вместо «try/except/pass» для соответствия Bandit B110
-from contextlib import suppress
+from contextlib import contextmanager, suppress
+from dataclasses import dataclass, replace
+from functools import partial
 from pathlib import Path
 from typing import Any
 
 import yaml
 
 from mas.core.agent import AgentContext, AgentResult, BaseAgent
-from mas.core.memory import FlowMemory
+from mas.core.blobs import DEFAULT_THRESHOLD, BlobStore
+from mas.core.bus import EventBus
+from mas.core.cancel import CancelToken, RunCancelledError, StepTimeoutError
+from mas.core.journal import JournalWriter
+from mas.core.memory import open_flow_memory
+from mas.core.plan import EXECUTORS, CompiledPlan, compile_plan, step_sources
+from mas.core.procpool import WarmProcessPool, execute_ref, warm_pool
+from mas.core.profiling import PROFILE_MODES, ProfiledResult, StepProfiler, merge_metrics, profiled_call
+from mas.core.registry import AgentRegistry
+from mas.core.step_cache import StepCache, content_hash
+from mas.core.tracing import Span, TracedResult, Tracer, traced_call
 
 # [LEGACY NOTE]
 # Ранее использовались: from typing import Any, Dict, List, Optional, Tuple
 # Заменено на встроенные типы (dict/list/tuple), чтобы удовлетворить ruff (UP035/UP006).
 
+# Как часто цикл планировщика проверяет отмену запуска, с
+CANCEL_POLL_S = 0.1
+_RETRY_SEQ = itertools.count()
+
+
+def _execute_agent(agent_cls: type[BaseAgent], ctx: AgentContext, input_data: Any) -> AgentResult:
+    """
+    🆕: Выполнение одного шага в пуле потоков (в процессах — execute_ref по
+    ссылке "module:Class", см. core/procpool.py).
+    """
+    agent: BaseAgent = agent_cls(ctx)  # type: ignore[call-arg]
+    return agent.run(input_data)
+
+
+def _submit_daemon(fn: Any, *args: Any) -> Future:
+    """
+    🆕: Запуск в отдельном daemon-потоке вместо пула. Так выполняются шаги
+    с timeout_s: зависшая попытка, брошенная по таймауту, не занимает
+    воркер пула и не держит процесс при выходе.
+    """
+    fut: Future = Future()
+
+    def _target() -> None:
+        if not fut.set_running_or_notify_cancel():
+            return
+        try:
+            fut.set_result(fn(*args))
+        except BaseException as e:
+            fut.set_exception(e)
+
+    threading.Thread(target=_target, name="mas-step-timed", daemon=True).start()
+    return fut
+
+
+@dataclass
+class StepAttempt:
+    """🆕: Одна попытка выполнения шага (номер попытки, дедлайн, токен отмены)."""
+
+    step: dict[str, Any]
+    agent_cls: type[BaseAgent]
+    input_data: Any
+    cache_key: str | None
+    attempt: int = 1
+    t0: float = 0.0
+    deadline: float | None = None
+    token: CancelToken | None = None
+    item: int | None = None  # 🆕: номер элемента foreach (None — обычный шаг)
+    profile: dict[str, Any] | None = None  # 🆕: метрики профилировщика (profile=...)
+
+
+@dataclass
+class FanOut:
+    """🆕: Шаг с foreach в работе: общая попытка шага и выходы элементов по номерам."""
+
+    attempt: StepAttempt
+    results: list[Any]
+    pending: int
+
+
+class DagSchedule:
+    """
+    🆕: Очередь готовых шагов DAG. Шаг становится готовым, когда завершены
+    все его предшественники; среди готовых первым выдаётся шаг, идущий
+    раньше в YAML (min-heap по индексу).
+
+    completed — шаги, уже выполненные ранее (resume): они не выдаются,
+    а зависимости от них считаются удовлетворёнными.
+    """
+
+    def __init__(
+        self,
+        steps: list[dict[str, Any]],
+        deps: dict[str, list[str]],
+        children: dict[str, list[str]],
+        completed: Iterable[str] = (),
+    ):
+        done = set(completed)
+        self._steps = steps
+        self._index = {step["id"]: idx for idx, step in enumerate(steps)}
+        self._children = children
+        self._remaining = {sid: sum(1 for u in up if u not in done) for sid, up in deps.items() if sid not in done}
+        self._ready = [(self._index[sid], sid) for sid, n in self._remaining.items() if n == 0]
+        heapq.heapify(self._ready)
+
+    def has_ready(self) -> bool:
+        return bool(self._ready)
+
+    def pop(self) -> dict[str, Any]:
+        _, step_id = heapq.heappop(self._ready)
+        return self._steps[self._index[step_id]]
+
+    def stuck(self) -> list[str]:
+        """Шаги, которые так и не стали готовыми (цикл по input_from), — в порядке YAML."""
+        return sorted((sid for sid, n in self._remaining.items() if n > 0), key=self._index.__getitem__)
+
+    def complete(self, step_id: str) -> None:
+        for child in self._children[step_id]:
+            if child not in self._remaining:
+                continue
+            self._remaining[child] -= 1
+            if self._remaining[child] == 0:
+                heapq.heappush(self._ready, (self._index[child], child))
+
+
+def event_topic(record: dict[str, Any]) -> str:
+    """
+    🆕: Тема шины для записи журнала: "step_done" + agent → "step.done.<agent>", "run_start" → "run.start".
+    Имя агента — один сегмент темы: ".", "*" и "#" в нём заменяются на "_" ("api.v2" → "step.done.api_v2").
+    """
+    topic = str(record["event"]).replace("_", ".")
+    agent = re.sub(r"[.*#]+", "_", str(record.get("agent") or ""))
+    return f"{topic}.{agent}" if agent else topic
+
 
 class WorkflowRunner:
     """
@@ -32,7 +164,51 @@ class WorkflowRunner:
     🆕 Новое (добавлено как дополнение, без ломки API):
       - _validate_flow(): предварительная валидация структуры workflow.
       - plan(): «сухой план» выполнения с проверкой доступности агентов и связей.
+        🆕: возвращает CompiledPlan (core/plan.py), кэшируемый на диске (plan_cache).
       - Журнал execution-journal в workspace/logs/workflow.jsonl.
+      - DAG-планировщик: независимые шаги (по input_from) выполняются параллельно
+        в пуле потоков (max_workers), при executor="process" — в тёплом пуле
+        процессов (process_workers); max_workers=1 даёт
+        прежний последовательный порядок.
+      - FlowMemory без перечитывания файла: сброс на диск на границах шагов
+        (flush_every) и гарантированно в конце run, в т.ч. при ошибке.
+      - memory_backend: "json" (flow_state.json), "sqlite" (flow_state.sqlite3,
+        строка на шаг, история запусков по run_id) или "journal" (flow_state.jsonl,
+        append-only лог операций с компакцией в снимок).
+      - StepCache (step_cache): шаг с неизменными агентом и входом не выполняется
+        повторно, выход берётся из кэша (событие step_cached в журнале).
+      - timeout_s / retries / backoff у шага, кооперативная отмена
+        (cancel(), AgentContext.cancel_token); события step_timeout,
+        step_retry, run_cancelled.
+      - run_many(): пакетный прогон JSONL-заявок в пуле, каждая в своём workspace.
+      - Журнал пишется буферизованно (JournalWriter: фоновый сброс по
+        размеру/времени, гарантированный сброс в конце run и при ошибке);
+        _validate_flow() выполняется один раз (при компиляции плана).
+      - Fan-in / fan-out: input_from может быть списком шагов (вход —
+        {id: выход}), foreach: <поле> запускает агента параллельно для каждого
+        элемента списка во входе; выход шага — {"items": [...], "count": n}.
+      - executor: process у агента в agents.yaml — шаги этого агента идут в
+        общий тёплый пул процессов (process_workers), воркеры которого заранее
+        импортируют модули таких агентов.
+      - Ленивый реестр агентов: модуль агента импортируется при первом
+        использовании (событие agent_import с временем импорта).
+      - bus (EventBus): каждое событие журнала публикуется и в шину с темой
+        вида "step.done.<agent>" / "run.start" — мониторинг подписывается на
+        семейства событий шаблонами ("step.#", "step.*.backend").
+      - BlobStore (core/blobs.py): значения выхода шага от blob_threshold байт
+        (аргумент или memory.blob_threshold в mas.yaml, 0 — выключено) хранятся
+        блобами в workspace/.blobs, в памяти потока — ссылки; агент получает
+        вход как LazyPayload, ссылки разворачиваются при обращении (mmap).
+      - profile ("cpu" | "mem" | "both", mas run --profile): вызов агента идёт
+        под cProfile/tracemalloc (core/profiling.py), файлы .pstats и .alloc.txt —
+        в logs/profiles/<run_id>/, метрики (cpu_ms, rss_delta_kb, alloc_kb) —
+        в поле profile события step_done.
+      - trace (mas run --trace): вложенные span run → step → tool.call →
+        file.write (core/tracing.py) с монотонным временем; в конце запуска —
+        logs/traces/<run_id>.otlp.json (OTLP JSON) и <run_id>.trace.json
+        (chrome://tracing), где видно, как перекрываются параллельные шаги.
+      - resume(run_id): продолжение прерванного запуска; шаги, чьи вход и выход
+        совпадают с хэшами из журнала (step_done/step_cached), не выполняются.
       - run() принимает прежний аргумент (путь к JSON), но теперь умеет:
           * читать JSON как из файла, так и из строки JSON (fallback);
           * писать подробный журнал выполнения;
@@ -45,17 +221,72 @@ class WorkflowRunner:
         cfg_agents_path: str,
         flow_yaml: str,
         agents_pkg: str = "mas.agents",
+        max_workers: int | None = None,
+        executor: str = "thread",
+        step_cache: StepCache | bool | None = None,
+        flush_every: int = 1,
+        memory_backend: str | None = None,
+        plan_cache: str | bool | None = None,
+        process_workers: int | None = None,
+        bus: EventBus | None = None,
+        blob_threshold: int | None = None,
+        profile: str | None = None,
+        trace: bool = False,
     ):
+        if executor not in EXECUTORS:
+            raise ValueError(f"unknown executor: {executor!r} (expected one of {EXECUTORS})")
+        if profile is not None and profile not in PROFILE_MODES:
+            raise ValueError(f"unknown profile mode: {profile!r} (expected one of {PROFILE_MODES})")
+        self.profile = profile
+        self.trace = trace
+        self.executor = executor
+        # Как у ThreadPoolExecutor по умолчанию: min(32, cpu + 4)
+        self.max_workers = max(1, max_workers or min(32, (os.cpu_count() or 1) + 4))
+        self.flush_every = flush_every
+        # 🆕: размер тёплого пула процессов для агентов с executor: process (agents.yaml)
+        self.process_workers = max(1, process_workers or os.cpu_count() or 1)
+        self.bus = bus
+        self.blob_threshold = blob_threshold
+        # 🆕: flow и agents.yaml компилируются в CompiledPlan (разбор, реестр,
+        # проверка, рёбра DAG). plan_cache=True — кэш в workspace/.cache/plans,
+        # ключ — хэш содержимого YAML: повторный запуск CLI не разбирает YAML.
+        if plan_cache is True:
+            plan_cache = str(Path(workspace) / ".cache" / "plans")
+        t0 = time.perf_counter()
+        self._plan, plan_cached = compile_plan(flow_yaml, cfg_agents_path, agents_pkg, cache_dir=plan_cache or None)
+        plan_ms = round((time.perf_counter() - t0) * 1000, 3)
+        self.flow = self._plan.flow
+        self._agents = AgentRegistry(dict(self._plan.agents))
+        self._init_workspace(workspace, memory_backend, step_cache)
+        self._append_journal({"event": "plan_load", "key": self._plan.key, "cached": plan_cached, "duration_ms": plan_ms, "ts": time.time()})
+
+    def _init_workspace(self, workspace: str, memory_backend: str | None, step_cache: StepCache | bool | None) -> None:
+        """🆕: Состояние, привязанное к workspace (память, кэш, журнал). Используется и в run_many."""
         self.workspace = Path(workspace)
         self.workspace.mkdir(parents=True, exist_ok=True)
-        self.memory = FlowMemory(str(self.workspace / "flow_state.json"))
-        self.flow = yaml.safe_load(Path(flow_yaml).read_text(encoding="utf-8"))
-        self._agents = self._load_agents_registry(cfg_agents_path, agents_pkg)
+        # 🆕: бэкенд памяти — аргумент или workspace/mas.yaml (memory.backend), по умолчанию json.
+        # Память с кэшем в процессе; на диск — пачками на границах шагов
+        # (каждые flush_every завершённых шагов; 0 — только в конце run).
+        memory_cfg = self._workspace_config().get("memory", {})
+        self.memory_backend = memory_backend or memory_cfg.get("backend", "json")
+        self.memory = open_flow_memory(str(self.workspace), self.memory_backend, autoflush=False)
+        # 🆕: крупные значения выходов шагов — блобами, в памяти потока только ссылки
+        threshold = self.blob_threshold if self.blob_threshold is not None else memory_cfg.get("blob_threshold", DEFAULT_THRESHOLD)
+        self.blobs = BlobStore(self.workspace / ".blobs", threshold=int(threshold))
+        self.run_id: str | None = None
+        self._cancel_token = CancelToken()
+        self._profiler: StepProfiler | None = None
+        self._run_span: Span | None = None
+        self._unflushed_steps = 0
+        # 🆕: step_cache=True — кэш по умолчанию в workspace/.cache/steps
+        self.step_cache = StepCache(str(self.workspace / ".cache" / "steps")) if step_cache is True else (step_cache or None)
 
         # 🆕: предзаготовим путь к журналу (не ломает совместимость)
         self._logs_dir = self.workspace / "logs"
         self._logs_dir.mkdir(parents=True, exist_ok=True)
         self._journal_path = self._logs_dir / "workflow.jsonl"
+        # 🆕: файл журнала открыт постоянно, записи сбрасываются пачками (core/journal.py)
+        self._journal = JournalWriter(self._journal_path)
 
         # 🆕: мягкая предварительная валидация (без исключений, но с сохранением статуса)
         ok, errors = self._validate_flow()
@@ -70,64 +301,58 @@ class WorkflowRunner:
                     "ts": time.time(),
                 }
             )
+            self._journal.flush()
 
-    def _load_agents_registry(self, path: str, agents_pkg: str):
-        # LEGACY (для трассировки и сохранения строк):
-        #   ранее импорт был внутри функции:
-        #       import importlib
-        #   ruff (PLC0415) требует импорт на верхнем уровне — мы подняли его выше.
-        cfg = yaml.safe_load(Path(path).read_text(encoding="utf-8"))
-        reg: dict[str, BaseAgent] = {}
-        for name, meta in cfg["agents"].items():
-            module = importlib.import_module(f"{agents_pkg}.{name}")
-            cls = getattr(module, meta["type"])
-            reg[name] = cls
-        return reg
-
-    # 🆕: аккуратная валидация описания потока
-    def _validate_flow(self) -> tuple[bool, list[str]]:
+    def _fork(self, workspace: str, max_workers: int) -> WorkflowRunner:
         """
-        Проверяет базовые свойства:
-          - наличие workflow.steps (list);
-          - уникальные id шагов;
-          - каждый step.agent зарегистрирован;
-          - input_from == "request" или ссылается на существующий предыдущий шаг.
-
-        Возвращает кортеж: (ok, список_ошибок). Не выбрасывает исключений.
-        """
-        errors: list[str] = []
-        wf = self.flow or {}
-        steps = (wf.get("workflow") or {}).get("steps")
-        if not isinstance(steps, list) or not steps:
-            errors.append("workflow.steps must be a non-empty list")
-            return False, errors
-
-        seen_ids: set[str] = set()
-        for idx, step in enumerate(steps):
-            sid = step.get("id")
-            agent = step.get("agent")
-            input_from = step.get("input_from", "request")
-
-            if not sid or not isinstance(sid, str):
-                errors.append(f"step[{idx}] has invalid 'id'")
-            elif sid in seen_ids:
-                errors.append(f"duplicate step id: {sid}")
-            else:
-                seen_ids.add(sid)
+        🆕: Копия раннера для другого workspace без повторного разбора YAML и
+        импорта агентов (flow и реестр общие). Кэш шагов — свой в workspace копии
+        с теми же лимитами: ключ не учитывает workspace, и попадание из чужого
+        кэша пропустило бы запись артефактов агентом в этот workspace.
+        """
+        clone = object.__new__(type(self))
+        clone.executor = self.executor
+        clone.max_workers = max_workers
+        clone.flush_every = self.flush_every
+        clone.process_workers = self.process_workers
+        clone.bus = self.bus
+        clone.blob_threshold = self.blob_threshold
+        clone.profile = self.profile
+        clone.trace = self.trace
+        clone._plan = self._plan
+        clone.flow = self.flow
+        clone._agents = self._agents
+        step_cache = None
+        if self.step_cache is not None:
+            cache = self.step_cache
+            step_cache = StepCache(str(Path(workspace) / ".cache" / "steps"), cache.max_entries, cache.max_bytes, cache.max_age_s)
+        clone._init_workspace(workspace, self.memory_backend, step_cache)
+        return clone
 
-            if not agent or not isinstance(agent, str):
-                errors.append(f"step[{idx}] has invalid 'agent'")
-            elif agent not in self._agents:
-                errors.append(f"agent not found in registry: {agent}")
+    def _workspace_config(self) -> dict[str, Any]:
+        """🆕: Необязательный конфиг workspace/mas.yaml (например, memory.backend)."""
+        path = self.workspace / "mas.yaml"
+        if not path.exists():
+            return {}
+        return yaml.safe_load(path.read_text(encoding="utf-8")) or {}
 
-            if input_from != "request" and input_from not in seen_ids:
-                # требуем, чтобы ссылка указывала на уже встреченный шаг
-                errors.append(f"step[{idx}] input_from '{input_from}' must refer to a previous step id or 'request'")
+    def _agent_class(self, name: str) -> type[BaseAgent]:
+        """🆕: Класс агента из ленивого реестра; первый импорт журналируется."""
+        cls, imported = self._agents.resolve(name)
+        if imported is not None:
+            self._append_journal({"event": "agent_import", "run_id": self.run_id, **imported, "ts": time.time()})
+        return cls
 
-        return (len(errors) == 0), errors
+    # 🆕: аккуратная валидация описания потока
+    def _validate_flow(self) -> tuple[bool, list[str]]:
+        """
+        Итог проверки потока (см. plan.check_flow): (ok, список_ошибок).
+        🆕: проверка выполняется один раз при компиляции плана, не на каждый run.
+        """
+        return self._plan.ok, list(self._plan.errors)
 
     # 🆕: сухой план выполнения с диагностикой
-    def plan(self) -> dict[str, Any]:
+    def plan(self) -> CompiledPlan:
         """
         Возвращает структуру плана:
             {
@@ -136,17 +361,22 @@ class WorkflowRunner:
               "steps": [{"id":..., "agent":..., "input_from":...}, ...]
             }
         Не изменяет состояние памяти, не выполняет агентов.
+
+        🆕: возвращается скомпилированный план (CompiledPlan): прежние ключи
+        доступны как plan["ok"] и т.д., плюс order (топологический порядок),
+        deps/children и реестр агентов. summary() — прежний dict.
         """
-        ok, errors = self._validate_flow()
-        wf = (self.flow or {}).get("workflow", {})
-        steps = wf.get("steps") or []
-        plan_steps = [{"id": s.get("id"), "agent": s.get("agent"), "input_from": s.get("input_from", "request")} for s in steps]
-        summary = {"ok": ok, "errors": errors, "steps": plan_steps}
         # логируем план (не мешает совместимости)
-        self._append_journal({"event": "plan", "summary": summary, "ts": time.time()})
-        return summary
+        with self._journal.flushing():
+            self._append_journal({"event": "plan", "summary": self._plan.summary(), "ts": time.time()})
+        return self._plan
 
-    def run(self, request_json_path: str, skip_optional: Iterable[str] | None = None) -> dict[str, Any]:
+    def run(
+        self,
+        request_json_path: str | dict[str, Any],
+        skip_optional: Iterable[str] | None = None,
+        cancel_token: CancelToken | None = None,
+    ) -> dict[str, Any]:
         """
         Выполняет workflow.
 
@@ -156,32 +386,152 @@ class WorkflowRunner:
         Расширение:
           - Если request_json_path не является существующим файлом, предпримем
             попытку интерпретировать значение как JSON-строку (fallback).
+          - 🆕: можно передать уже разобранный запрос (dict).
+          - 🆕: cancel_token — внешняя отмена (как и WorkflowRunner.cancel()).
         """
-        # === ЧТЕНИЕ ВХОДА (совместимо + расширено) ===
-        req: dict[str, Any]
-        req_path = Path(request_json_path)
-        if req_path.exists():
-            req = json.loads(req_path.read_text(encoding="utf-8"))
-        else:
-            # 🆕: пробуем разобрать как JSON-строку (без падения API)
+        with self._journal.flushing(), self._tracing():
+            req, ctx, skipped, steps = self._begin_run(request_json_path, skip_optional, cancel_token)
             try:
-                req = json.loads(request_json_path)
-            except Exception as e:
-                # Журнал + понятная ошибка
-                self._append_journal(
-                    {
-                        "event": "request_error",
-                        "message": "cannot parse request_json_path as file or JSON string",
-                        "value": request_json_path[:2000],  # защита от больших строк
-                        "error": str(e),
-                        "ts": time.time(),
-                    }
-                )
-                raise
+                outputs = self._run_dag(steps, req, ctx, skipped)
+            finally:
+                self._flush_memory()
+            return self._finish_run(steps, outputs)
+
+    def resume(
+        self,
+        run_id: str,
+        request_json_path: str | dict[str, Any] | None = None,
+        skip_optional: Iterable[str] | None = None,
+        cancel_token: CancelToken | None = None,
+    ) -> dict[str, Any]:
+        """
+        🆕: Продолжает запуск run_id с места остановки (ошибка, отмена, падение процесса).
+
+        Заявка и skip_optional по умолчанию берутся из записи run_start журнала.
+        Шаг считается выполненным, если в журнале есть его step_done/step_cached
+        этого запуска, его вход совпадает с input_hash, выход в памяти потока —
+        с output_hash, а шаг-источник тоже выполнен. Остальные шаги (и всё,
+        что от них зависит) выполняются заново. Итог — как у run().
+        """
+        with self._journal.flushing(), self._tracing():
+            req, ctx, skipped, steps, completed = self._begin_resume(run_id, request_json_path, skip_optional, cancel_token)
+            try:
+                outputs = self._run_dag(steps, req, ctx, skipped, completed)
+            finally:
+                self._flush_memory()
+            return self._finish_run(steps, outputs)
+
+    @contextmanager
+    def _tracing(self) -> Iterator[None]:
+        """
+        🆕: Span запуска (trace=True). Шаги — дочерние span (traced_call в пуле),
+        внутри них — tool.call / file.write. Трасса пишется в logs/traces/ и
+        при ошибке запуска — именно тогда она нужнее всего.
+        """
+        if not self.trace:
+            yield
+            return
+        tracer = Tracer()
+        try:
+            with tracer.span("run", workflow=(self.flow or {}).get("workflow", {}).get("name")) as run_span:
+                self._run_span = run_span
+                yield
+        finally:
+            self._run_span = None
+            run_span.set(run_id=self.run_id)
+            paths = tracer.export(self._logs_dir / "traces", self.run_id or tracer.trace_id)
+            self._append_journal({"event": "trace_export", "run_id": self.run_id, "trace_id": tracer.trace_id, **{k: str(v) for k, v in paths.items()}, "ts": time.time()})
+
+    def _begin_resume(
+        self,
+        run_id: str,
+        request_json_path: str | dict[str, Any] | None,
+        skip_optional: Iterable[str] | None,
+        cancel_token: CancelToken | None,
+    ) -> tuple[dict[str, Any], AgentContext, set[str], list[dict[str, Any]], dict[str, dict[str, Any]]]:
+        """🆕: Общее начало resume()/aresume(): журнал запуска, вход, проверенные шаги."""
+        records = self._run_records(run_id)
+        start = next((r for r in records if r.get("event") == "run_start"), None)
+        if start is None:
+            raise ValueError(f"запуск {run_id!r} не найден в журнале {self._journal_path}")
+        if request_json_path is None:
+            request_json_path = start.get("request")
+            if request_json_path is None:
+                raise ValueError(f"в журнале нет заявки запуска {run_id!r}: передайте request_json_path")
+        if skip_optional is None:
+            skip_optional = start.get("skip_optional")
+
+        req, ctx, skipped, steps = self._begin_run(request_json_path, skip_optional, cancel_token, run_id=run_id)
+        completed = self._verified_steps(steps, req, records)
+        self._append_journal({"event": "run_resume", "run_id": run_id, "completed": list(completed), "ts": time.time()})
+        return req, ctx, skipped, steps, completed
+
+    def _run_records(self, run_id: str) -> list[dict[str, Any]]:
+        """🆕: Записи журнала запуска run_id (битые строки пропускаются)."""
+        self._journal.flush()
+        records: list[dict[str, Any]] = []
+        with suppress(FileNotFoundError), self._journal_path.open(encoding="utf-8") as f:
+            for line in f:
+                with suppress(ValueError):
+                    record = json.loads(line)
+                    if isinstance(record, dict) and record.get("run_id") == run_id:
+                        records.append(record)
+        return records
+
+    def _verified_steps(self, steps: list[dict[str, Any]], req: dict[str, Any], records: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+        """
+        🆕: Шаги запуска, которые можно не выполнять повторно: {step_id: выход}.
+        Проверка идёт в порядке YAML, поэтому изменение заявки или выхода
+        шага инвалидирует и все шаги ниже по потоку.
+        """
+        done = {r["step_id"]: r for r in records if r.get("event") in ("step_done", "step_cached") and "output_hash" in r}
+        completed: dict[str, dict[str, Any]] = {}
+        for step in steps:
+            record = done.get(step["id"])
+            if record is None or record.get("agent") != step["agent"]:
+                continue
+            if any(src != "request" and src not in completed for src in step_sources(step)):
+                continue
+            input_data = self._step_input(step, req, completed.get)
+            if content_hash(input_data) != record.get("input_hash"):
+                continue
+            output = self.memory.get(step["id"])
+            if output is None or content_hash(output) != record["output_hash"] or not self.blobs.available(output):
+                continue
+            completed[step["id"]] = output
+        return completed
+
+    def _begin_run(
+        self,
+        request_json_path: str | dict[str, Any],
+        skip_optional: Iterable[str] | None,
+        cancel_token: CancelToken | None = None,
+        run_id: str | None = None,
+    ) -> tuple[dict[str, Any], AgentContext, set[str], list[dict[str, Any]]]:
+        """🆕: Общее начало run()/arun(): вход, контекст, run_id, валидация."""
+        # === ЧТЕНИЕ ВХОДА (совместимо + расширено) ===
+        req = self._load_request(request_json_path)
 
         ctx = AgentContext(workspace=str(self.workspace))
         skipped = set(skip_optional or [])
-        last_output: dict[str, Any] | None = None
+
+        # 🆕: идентификатор запуска (SQLite-память хранит состояние по run_id);
+        # resume() продолжает прежний run_id. Заявка в run_start нужна для resume.
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self._cancel_token = cancel_token or CancelToken()
+        self._profiler = StepProfiler(self.profile, str(self._logs_dir / "profiles" / self.run_id)) if self.profile else None
+        self.memory.start_run(self.run_id)
+        self._append_journal(
+            {
+                "event": "run_start",
+                "run_id": self.run_id,
+                "memory_backend": self.memory_backend,
+                "request": req,
+                "skip_optional": sorted(skipped),
+                "resumed": run_id is not None,
+                "ts": time.time(),
+            }
+        )
 
         wf = (self.flow or {}).get("workflow", {})
         steps: list[dict[str, Any]] = wf.get("steps") or []
@@ -190,72 +540,635 @@ class WorkflowRunner:
         ok, errors = self._validate_flow()
         if not ok:
             self._append_journal({"event": "pre_run_validation", "ok": False, "errors": errors, "ts": time.time()})
+        return req, ctx, skipped, steps
 
-        for step in steps:
-            t0 = time.time()
-            step_id = step["id"]
-            agent_name = step["agent"]
-            input_from = step.get("input_from", "request")
-
-            # Пропуск опциональных шагов без нарушения совместимости
-            if step_id in skipped:
-                self.memory.set(step_id, {"skipped": True})
-                self._append_journal({"event": "skip_step", "step_id": step_id, "agent": agent_name, "ts": time.time()})
-                continue
+    def _finish_run(self, steps: list[dict[str, Any]], outputs: dict[str, dict[str, Any]]) -> dict[str, Any]:
+        """🆕: Общее завершение run()/arun(): вытеснение кэша, итог, run_done."""
+        if self.step_cache is not None:
+            self.step_cache.evict()
 
-            # === ПОЛУЧЕНИЕ ВХОДА ===
-            if input_from == "request":
-                input_data = req
-            else:
-                input_data = self.memory.get(input_from)
+        # Результат — выход последнего выполненного шага в порядке YAML (как раньше)
+        last_output = next((outputs[s["id"]] for s in reversed(steps) if s["id"] in outputs), None)
+        summary: dict[str, Any] = {"status": "ok", "result": self.blobs.materialize(last_output)}
+        self._append_journal({"event": "run_done", "summary": summary, "ts": time.time()})
+        return summary
+
+    def _run_dag(
+        self,
+        steps: list[dict[str, Any]],
+        req: dict[str, Any],
+        ctx: AgentContext,
+        skipped: set[str],
+        completed: dict[str, dict[str, Any]] | None = None,
+    ) -> dict[str, dict[str, Any]]:
+        """
+        🆕: DAG-планировщик. Шаги, не зависящие друг от друга (fan-out после
+        techbase/be), выполняются параллельно; порядок записей в памяти и журнале
+        определяется моментом завершения шага. Возвращает выходы выполненных шагов.
+
+        Шаги с timeout_s ограничены по времени (зависшая попытка бросается, её
+        токен отмены взводится), упавшие попытки повторяются до retries раз с
+        паузой backoff · 2^(n-1). WorkflowRunner.cancel() прерывает запуск.
+        completed — выходы шагов, проверенных resume(): они не выполняются.
+        """
+        outputs: dict[str, dict[str, Any]] = dict(completed or {})
+        sched = DagSchedule(steps, self._plan.deps, self._plan.children, completed=outputs)
+        running: dict[Future, StepAttempt] = {}
+        pending: deque[StepAttempt] = deque()  # готовые к запуску попытки (элементы foreach)
+        fanouts: dict[str, FanOut] = {}
+        retry_queue: list[tuple[float, int, StepAttempt]] = []  # (когда, порядок, попытка)
+        failure: BaseException | None = None
+        abandoned = False  # есть брошенные попытки — не ждём их при закрытии пула
+
+        pool = self._make_executor()
+        try:
+            while sched.has_ready() or pending or running or (retry_queue and failure is None):
+                self._check_cancelled(running)
 
-            # === ВЫЗОВ АГЕНТА ===
-            # AgentCls = self._agents[agent_name]  # ← ОРИГИНАЛ (оставлено для истории; нарушал стиль N806)
-            agent_cls = self._agents[agent_name]  # 🆕: то же самое, но в нижнем регистре для стиля
-            agent: BaseAgent = agent_cls(ctx)  # type: ignore[call-arg]
+                # Повторы, у которых истекла пауза backoff
+                while retry_queue and failure is None and retry_queue[0][0] <= time.monotonic():
+                    attempt = heapq.heappop(retry_queue)[2]
+                    running[self._submit_attempt(pool, ctx, attempt)] = attempt
 
-            # Выполнение с базовым перехватом ошибок для журнала (не меняет API исключений наружу)
+                # Отдаём в пул не больше max_workers шагов: при max_workers=1
+                # порядок выполнения совпадает с порядком в YAML (как раньше).
+                while failure is None and len(running) < self.max_workers and (attempt := self._next_attempt(sched, pending, req, skipped, fanouts, outputs)) is not None:
+                    # === ВЫЗОВ АГЕНТА (в пуле) ===
+                    running[self._submit_attempt(pool, ctx, attempt)] = attempt
+
+                if not running and not (retry_queue and failure is None):
+                    break
+
+                done, _ = wait(running, timeout=self._wait_timeout(running, retry_queue), return_when=FIRST_COMPLETED)
+                for fut in done:
+                    attempt = running.pop(fut)
+                    # Выполнение с базовым перехватом ошибок для журнала (не меняет API исключений наружу)
+                    try:
+                        # 🆕: проверка результата — только здесь, на границе раннера (ошибка = сбой попытки)
+                        result = self._agent_result(attempt, fut.result())
+                    except Exception as e:
+                        # Новые шаги после окончательной ошибки не запускаем, но дожидаемся уже запущенных
+                        failure = failure or self._attempt_failed(attempt, e, retry_queue)
+                        continue
+                    if self._complete_attempt(attempt, result, fanouts, outputs):
+                        sched.complete(attempt.step["id"])
+
+                for attempt in self._expire_attempts(running):
+                    abandoned = True
+                    failure = failure or self._attempt_failed(attempt, self._timeout_error(attempt), retry_queue)
+        except KeyboardInterrupt:
+            abandoned = True
+            self._cancel_token.cancel("interrupted")
+            self._journal_cancelled(running)
+            raise
+        except BaseException:
+            abandoned = True
+            raise
+        finally:
+            pool.shutdown(wait=not abandoned, cancel_futures=abandoned)
+
+        if failure is not None:
+            raise failure
+        # Отмена пришла, пока выполнялся последний шаг (он мог вернуться досрочно)
+        self._check_cancelled(running)
+        self._check_stuck(sched)
+        return outputs
+
+    def _check_stuck(self, sched: DagSchedule) -> None:
+        """🆕: Очередь опустела, а шаги остались невыполненными (цикл по input_from) — ошибка запуска, а не status=ok."""
+        stuck = sched.stuck()
+        if not stuck:
+            return
+        self._append_journal({"event": "run_error", "run_id": self.run_id, "error": "dependency cycle", "steps": stuck, "ts": time.time()})
+        raise ValueError(f"workflow steps can never run (input_from cycle): {', '.join(stuck)}")
+
+    def _next_attempt(
+        self,
+        sched: DagSchedule,
+        pending: deque[StepAttempt],
+        req: dict[str, Any],
+        skipped: set[str],
+        fanouts: dict[str, FanOut],
+        outputs: dict[str, dict[str, Any]],
+    ) -> StepAttempt | None:
+        """🆕: Следующая попытка к запуску: элемент foreach из очереди или новый готовый шаг. None — запускать нечего."""
+        while not pending and sched.has_ready():
+            step = sched.pop()
+            prepared = self._prepare_step(step, req, skipped, outputs)
+            attempts = None if prepared is None else self._expand_step(step, prepared, fanouts, outputs)
+            if not attempts:
+                sched.complete(step["id"])
+            pending.extend(attempts or ())
+        return pending.popleft() if pending else None
+
+    def _prepare_step(
+        self,
+        step: dict[str, Any],
+        req: dict[str, Any],
+        skipped: set[str],
+        outputs: dict[str, dict[str, Any]],
+    ) -> tuple[type[BaseAgent], Any, str | None] | None:
+        """
+        🆕: Подготовка шага к запуску: (класс агента, вход, ключ кэша).
+        None — шаг уже завершён без выполнения (пропущен или взят из кэша).
+        """
+        step_id = step["id"]
+
+        # Пропуск опциональных шагов без нарушения совместимости
+        if step_id in skipped:
+            self._record_step_skip(step)
+            return None
+
+        # === ПОЛУЧЕНИЕ ВХОДА ===
+        input_data = self._step_input(step, req, self.memory.get)
+
+        # === КЭШ: неизменные агент + вход → выход без выполнения ===
+        agent_cls = self._agent_class(step["agent"])
+        cache_key, cached = self._lookup_step_cache(step, agent_cls, input_data)
+        if cached is not None:
+            outputs[step_id] = cached
+            return None
+        return agent_cls, input_data, cache_key
+
+    @staticmethod
+    def _step_input(step: dict[str, Any], req: dict[str, Any], lookup: Callable[[str], Any]) -> Any:
+        """
+        🆕: Вход шага. input_from — "request", id шага или список (fan-in):
+        для списка вход — {источник: выход}, например {"plan": ..., "design": ...}.
+        """
+        input_from = step.get("input_from", "request")
+        if isinstance(input_from, list):
+            return {src: req if src == "request" else lookup(src) for src in step_sources(step)}
+        return req if input_from == "request" else lookup(input_from)
+
+    @staticmethod
+    def _foreach_items(step: dict[str, Any], input_data: Any) -> list[Any]:
+        """🆕: Список для fan-out: поле foreach во входе шага (путь через точку: design.modules)."""
+        value = input_data
+        for part in step["foreach"].split("."):
+            value = value.get(part) if isinstance(value, dict) else None
+        if not isinstance(value, list):
+            raise ValueError(f"step {step['id']!r}: foreach field {step['foreach']!r} is not a list in the step input")
+        return value
+
+    def _expand_step(
+        self,
+        step: dict[str, Any],
+        prepared: tuple[type[BaseAgent], Any, str | None],
+        fanouts: dict[str, FanOut],
+        outputs: dict[str, dict[str, Any]],
+    ) -> list[StepAttempt]:
+        """
+        🆕: Попытки, которые нужно выполнить для шага: одна — для обычного шага,
+        по одной на элемент — для foreach. Элемент получает вход шага плюс
+        {<foreach_as|item>: элемент, "item_index": номер}. Пустой список
+        завершает шаг сразу (возвращается []).
+        """
+        agent_cls, input_data, cache_key = prepared
+        attempt = StepAttempt(step, agent_cls, input_data, cache_key, t0=time.time())
+        if step.get("foreach") is None:
+            return [attempt]
+        try:
+            items = self._foreach_items(step, self.blobs.lazy(input_data))
+        except ValueError as e:
+            self._record_step_error(step, attempt.t0, e)
+            raise
+        if not items:
+            self._finish_step(attempt, self._merge_items(step, []), outputs)
+            return []
+        fanouts[step["id"]] = FanOut(attempt, [None] * len(items), len(items))
+        base = input_data if isinstance(input_data, dict) else {"input": input_data}
+        name = step.get("foreach_as", "item")
+        return [StepAttempt(step, agent_cls, {**base, name: item, "item_index": idx}, None, item=idx) for idx, item in enumerate(items)]
+
+    def _complete_attempt(self, attempt: StepAttempt, result: AgentResult, fanouts: dict[str, FanOut], outputs: dict[str, dict[str, Any]]) -> bool:
+        """🆕: Учитывает успешную попытку; True — шаг завершён целиком (для foreach — все элементы)."""
+        if attempt.item is None:
+            self._finish_step(attempt, result, outputs)
+            return True
+        step_id = attempt.step["id"]
+        fan = fanouts[step_id]
+        fan.results[attempt.item] = result.payload
+        fan.pending -= 1
+        record = {
+            "event": "step_item_done",
+            "run_id": self.run_id,
+            "step_id": step_id,
+            "item_index": attempt.item,
+            "duration_ms": int((time.time() - attempt.t0) * 1000),
+            "ts": time.time(),
+        }
+        if attempt.profile is not None:
+            record["profile"] = attempt.profile
+            fan.attempt.profile = merge_metrics(fan.attempt.profile, attempt.profile)
+        self._append_journal(record)
+        if fan.pending:
+            return False
+        del fanouts[step_id]
+        self._finish_step(fan.attempt, self._merge_items(attempt.step, fan.results), outputs)
+        return True
+
+    @staticmethod
+    def _merge_items(step: dict[str, Any], results: list[Any]) -> AgentResult:
+        """🆕: Выход foreach-шага: выходы элементов в порядке списка."""
+        return AgentResult(title=f"{step['id']} x{len(results)}", payload={"items": results, "count": len(results)})
+
+    def _finish_step(self, attempt: StepAttempt, result: AgentResult, outputs: dict[str, dict[str, Any]]) -> None:
+        """🆕: Успешное завершение шага: память, журнал, кэш."""
+        outputs[attempt.step["id"]] = self._record_step_done(attempt.step, attempt.t0, result, attempt.input_data, attempt.profile)
+        if attempt.cache_key is not None:
+            self.step_cache.put(attempt.cache_key, result.payload)
+
+    def _load_request(self, request_json_path: str | dict[str, Any]) -> dict[str, Any]:
+        """Читает запрос из файла или, если файла нет, из JSON-строки."""
+        if isinstance(request_json_path, dict):
+            return request_json_path
+        req_path = Path(request_json_path)
+        if req_path.exists():
+            req = json.loads(req_path.read_text(encoding="utf-8"))
+        else:
+            # 🆕: пробуем разобрать как JSON-строку (без падения API)
             try:
-                result: AgentResult = agent.run(input_data)
+                req = json.loads(request_json_path)
             except Exception as e:
+                # Журнал + понятная ошибка
                 self._append_journal(
                     {
-                        "event": "step_error",
-                        "step_id": step_id,
-                        "agent": agent_name,
-                        "input_from": input_from,
+                        "event": "request_error",
+                        "message": "cannot parse request_json_path as file or JSON string",
+                        "value": request_json_path[:2000],  # защита от больших строк
                         "error": str(e),
-                        "duration_ms": int((time.time() - t0) * 1000),
                         "ts": time.time(),
                     }
                 )
                 raise
+        return req
 
-            # === СОХРАНЕНИЕ РЕЗУЛЬТАТА ===
-            self.memory.set(step_id, result.payload)
-            last_output = result.payload
-
-            # === ЛОГ ЖУРНАЛА ===
+    def _lookup_step_cache(self, step: dict[str, Any], agent_cls: type[BaseAgent], input_data: Any) -> tuple[str | None, dict[str, Any] | None]:
+        """
+        🆕: Ищет выход шага в StepCache. Возвращает (ключ, payload|None);
+        ключ None — кэш выключен или агент не кэшируемый. При попадании
+        сохраняет выход в память потока и пишет step_cached в журнал.
+        """
+        if self.step_cache is None or not getattr(agent_cls, "cacheable", True):
+            return None, None
+        t0 = time.time()
+        # 🆕: foreach меняет смысл шага — входит в ключ
+        cache_step = step["id"] if step.get("foreach") is None else f"{step['id']}|foreach:{step['foreach']}|as:{step.get('foreach_as', 'item')}"
+        key = StepCache.key(agent_cls, cache_step, input_data)
+        cached = self.step_cache.get(key)
+        if cached is not None:
+            stored = self.blobs.externalize(cached)
+            self.memory.set(step["id"], stored)
+            self._step_boundary()
             self._append_journal(
                 {
-                    "event": "step_done",
-                    "step_id": step_id,
-                    "agent": agent_name,
-                    "input_from": input_from,
+                    "event": "step_cached",
+                    "step_id": step["id"],
+                    "agent": step["agent"],
+                    "input_from": step.get("input_from", "request"),
+                    "cache_key": key,
                     "duration_ms": int((time.time() - t0) * 1000),
-                    "output_keys": list(result.payload.keys()) if isinstance(result.payload, dict) else None,
+                    "run_id": self.run_id,
+                    "input_hash": content_hash(input_data),
+                    "output_hash": content_hash(stored),
                     "ts": time.time(),
                 }
             )
+        return key, cached
 
-        summary: dict[str, Any] = {"status": "ok", "result": last_output}
-        self._append_journal({"event": "run_done", "summary": summary, "ts": time.time()})
+    def _step_boundary(self) -> None:
+        """🆕: Пакетный сброс памяти: раз в flush_every завершённых шагов."""
+        self._unflushed_steps += 1
+        if self.flush_every > 0 and self._unflushed_steps >= self.flush_every:
+            self._flush_memory()
+
+    def _flush_memory(self) -> None:
+        self.memory.flush()
+        self._unflushed_steps = 0
+
+    def _record_step_skip(self, step: dict[str, Any]) -> None:
+        self.memory.set(step["id"], {"skipped": True})
+        self._step_boundary()
+        self._append_journal({"event": "skip_step", "step_id": step["id"], "agent": step["agent"], "ts": time.time()})
+
+    def _record_step_done(self, step: dict[str, Any], t0: float, result: AgentResult, input_data: Any = None, profile: dict[str, Any] | None = None) -> dict[str, Any]:
+        """
+        🆕: Сохраняет выход шага в память потока и пишет step_done в журнал.
+        input_hash/output_hash позволяют resume() проверить шаг без перезапуска;
+        profile — метрики профилировщика (только при WorkflowRunner(profile=...)).
+        """
+        # === СОХРАНЕНИЕ РЕЗУЛЬТАТА ===
+        # 🆕: в памяти — payload со ссылками на блобы; хэш — от него же (его сверяет resume)
+        stored = self.blobs.externalize(result.payload)
+        self.memory.set(step["id"], stored)
+        self._step_boundary()
+
+        # === ЛОГ ЖУРНАЛА ===
+        self._append_journal(
+            {
+                "event": "step_done",
+                "step_id": step["id"],
+                "agent": step["agent"],
+                "input_from": step.get("input_from", "request"),
+                "duration_ms": int((time.time() - t0) * 1000),
+                "output_keys": list(result.payload.keys()) if isinstance(result.payload, dict) else None,
+                "run_id": self.run_id,
+                "input_hash": content_hash(input_data),
+                "output_hash": content_hash(stored),
+                **({"profile": profile} if profile is not None else {}),
+                "ts": time.time(),
+            }
+        )
+        return result.payload
+
+    def _record_step_error(self, step: dict[str, Any], t0: float, error: BaseException) -> None:
+        """🆕: Пишет step_error в журнал (исключение пробрасывает вызывающий код)."""
+        self._append_journal(
+            {
+                "event": "step_error",
+                "step_id": step["id"],
+                "agent": step["agent"],
+                "input_from": step.get("input_from", "request"),
+                "error": str(error),
+                "duration_ms": int((time.time() - t0) * 1000),
+                "ts": time.time(),
+            }
+        )
+
+    # =========================
+    # ТАЙМАУТЫ, ПОВТОРЫ, ОТМЕНА
+    # =========================
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        """🆕: Отменяет текущий запуск (потокобезопасно; можно звать из другого потока)."""
+        self._cancel_token.cancel(reason)
+
+    def _submit_attempt(self, pool: Executor, ctx: AgentContext, attempt: StepAttempt) -> Future:
+        attempt.t0 = time.time()
+        attempt.token = self._cancel_token.child()
+        timeout_s = attempt.step.get("timeout_s")
+        attempt.deadline = time.monotonic() + float(timeout_s) if timeout_s else None
+        step_ctx = ctx.model_copy(update={"cancel_token": attempt.token})
+        on_start = None
+        if timeout_s and self._profiler is not None and not self._in_process(attempt.step):
+            # 🆕: в потоке шаг сначала ждёт очереди профилировщика — дедлайн ставится, когда она подошла
+            attempt.deadline, on_start = None, partial(self._start_deadline, attempt, float(timeout_s))
+        fn, args = self._agent_call_args(attempt, step_ctx, on_start)
+        if self._in_process(attempt.step):
+            return self._warm_pool().submit(fn, *args)
+        if timeout_s:
+            return _submit_daemon(fn, *args)
+        return pool.submit(fn, *args)
+
+    @staticmethod
+    def _start_deadline(attempt: StepAttempt, timeout_s: float) -> None:
+        attempt.deadline = time.monotonic() + timeout_s
+
+    def _agent_call_args(self, attempt: StepAttempt, step_ctx: AgentContext, on_start: Callable[[], None] | None = None) -> tuple[Callable[..., Any], tuple[Any, ...]]:
+        """
+        🆕: Функция пула и её аргументы: агент в тёплом пуле процессов или здесь, при profile — под профилировщиком
+        (on_start — начало шага после очереди профилировщика, только для потоков).
+        """
+        input_data = self.blobs.lazy(attempt.input_data)
+        if self._in_process(attempt.step):
+            fn, args = execute_ref, (self._agents.ref(attempt.step["agent"]), step_ctx, input_data)
+        else:
+            fn, args = _execute_agent, (attempt.agent_cls, step_ctx, input_data)
+        if self._profiler is not None:
+            label = attempt.step["id"] + ("" if attempt.item is None else f"-{attempt.item}") + ("" if attempt.attempt == 1 else f".{attempt.attempt}")
+            fn, args = profiled_call, (self._profiler, re.sub(r"[^\w.-]", "_", label), attempt.token, on_start, fn, *args)
+        if self._run_span is not None:
+            fn, args = traced_call, (self._run_span, "step", self._step_attributes(attempt), fn, *args)
+        return fn, args
+
+    @staticmethod
+    def _step_attributes(attempt: StepAttempt) -> dict[str, Any]:
+        """🆕: Атрибуты span шага."""
+        attributes = {"step_id": attempt.step["id"], "agent": attempt.step["agent"], "attempt": attempt.attempt}
+        return attributes if attempt.item is None else {**attributes, "item_index": attempt.item}
+
+    def _agent_result(self, attempt: StepAttempt, value: Any) -> AgentResult:
+        """🆕: Результат попытки: span из процесса пула — в трассу, метрики профилировщика — в attempt.profile; проверка — AgentResult.coerce()."""
+        if type(value) is TracedResult:
+            if self._run_span is not None and self._run_span.tracer is not None:
+                self._run_span.tracer.add(value.spans)
+            value = value.result
+        if type(value) is ProfiledResult:
+            attempt.profile = value.metrics
+            value = value.result
+        return AgentResult.coerce(value)
+
+    @staticmethod
+    def _wait_timeout(running: dict[Any, StepAttempt], retry_queue: list[tuple[float, int, StepAttempt]]) -> float:
+        """Сколько ждать завершения шагов: до ближайшего дедлайна/повтора, но не дольше CANCEL_POLL_S."""
+        now = time.monotonic()
+        marks = [a.deadline for a in running.values() if a.deadline is not None]
+        if retry_queue:
+            marks.append(retry_queue[0][0])
+        return max(0.0, min([m - now for m in marks] + [CANCEL_POLL_S]))
+
+    @staticmethod
+    def _expire_attempts(running: dict[Any, StepAttempt]) -> list[StepAttempt]:
+        """Снимает с учёта попытки с истёкшим дедлайном и взводит их токены отмены."""
+        now = time.monotonic()
+        expired = [(fut, a) for fut, a in running.items() if a.deadline is not None and now >= a.deadline]
+        for fut, attempt in expired:
+            del running[fut]
+            fut.cancel()
+            if attempt.token is not None:
+                attempt.token.cancel("timeout")
+        return [a for _, a in expired]
+
+    @staticmethod
+    def _timeout_error(attempt: StepAttempt) -> StepTimeoutError:
+        return StepTimeoutError(f"step {attempt.step['id']!r} timed out after {attempt.step.get('timeout_s')}s (attempt {attempt.attempt})")
+
+    def _plan_retry(self, attempt: StepAttempt, error: BaseException) -> float | None:
+        """
+        Журналирует неудачную попытку (step_timeout / step_retry) и возвращает
+        паузу перед повтором, либо None, если повторы исчерпаны.
+        """
+        step = attempt.step
+        if isinstance(error, StepTimeoutError):
+            self._append_journal(
+                {"event": "step_timeout", "step_id": step["id"], "agent": step["agent"], "attempt": attempt.attempt, "timeout_s": step.get("timeout_s"), "ts": time.time()}
+            )
+        if attempt.attempt > int(step.get("retries", 0)):
+            return None
+        delay = float(step.get("backoff", 0)) * 2 ** (attempt.attempt - 1)
+        self._append_journal(
+            {"event": "step_retry", "step_id": step["id"], "agent": step["agent"], "attempt": attempt.attempt, "error": str(error), "delay_s": delay, "ts": time.time()}
+        )
+        return delay
+
+    def _attempt_failed(self, attempt: StepAttempt, error: BaseException, retry_queue: list[tuple[float, int, StepAttempt]]) -> BaseException | None:
+        """Ставит повтор в очередь; если повторов не осталось — пишет step_error и возвращает ошибку."""
+        if isinstance(error, RunCancelledError):
+            return error  # отмена запуска — не сбой попытки, не повторяем
+        delay = self._plan_retry(attempt, error)
+        if delay is None:
+            self._record_step_error(attempt.step, attempt.t0, error)
+            return error
+        heapq.heappush(retry_queue, (time.monotonic() + delay, next(_RETRY_SEQ), replace(attempt, attempt=attempt.attempt + 1)))
+        return None
+
+    def _check_cancelled(self, running: dict[Any, StepAttempt]) -> None:
+        if self._cancel_token.cancelled:
+            self._journal_cancelled(running)
+            raise RunCancelledError(self._cancel_token.reason or "cancelled")
+
+    def _journal_cancelled(self, running: dict[Any, StepAttempt]) -> None:
+        reason = self._cancel_token.reason or "cancelled"
+        for fut, attempt in running.items():
+            fut.cancel()
+            if attempt.token is not None:
+                attempt.token.cancel(reason)
+        self._append_journal({"event": "run_cancelled", "run_id": self.run_id, "reason": reason, "running": [a.step["id"] for a in running.values()], "ts": time.time()})
+
+    # =========================
+    # ПЛАНИРОВАНИЕ (DAG)
+    # =========================
+
+    def _in_process(self, step: dict[str, Any]) -> bool:
+        """
+        🆕: Шаг выполняется в тёплом пуле процессов, если у агента executor: process
+        (agents.yaml) или у раннера executor="process"; остальные — в пуле потоков.
+        """
+        return self.executor == "process" or self._plan.executors.get(step["agent"]) == "process"
+
+    def _warm_pool(self) -> WarmProcessPool:
+        """
+        🆕: Общий тёплый пул (живёт между запусками); воркеры заранее импортируют
+        модули process-агентов, при executor="process" — всех агентов потока.
+        """
+        if self.executor == "process":
+            names = {step["agent"] for step in (self.flow or {}).get("workflow", {}).get("steps") or []}
+        else:
+            names = {name for name, ex in self._plan.executors.items() if ex == "process"}
+        preload = {self._agents.ref(name).partition(":")[0] for name in names if name in self._agents}
+        return warm_pool(self.process_workers, preload)
+
+    def _make_executor(self) -> Executor:
+        """🆕: Пул потоков запуска; шаги в процессах (_in_process) идут мимо него в тёплый пул."""
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="mas-step")
+
+    # =========================
+    # ПАКЕТНЫЙ РЕЖИМ
+    # =========================
+
+    def run_many(
+        self,
+        requests: str | Iterable[dict[str, Any]],
+        results_path: str | None = None,
+        max_workers: int | None = None,
+        step_workers: int = 1,
+        skip_optional: Iterable[str] | None = None,
+    ) -> dict[str, Any]:
+        """
+        🆕: Выполняет workflow для множества запросов.
+
+        - requests: путь к JSONL (одна заявка на строку) или итерируемое dict;
+          читается потоково, в работе не больше 2 × max_workers заявок;
+        - flow и реестр агентов разбираются один раз (см. _fork);
+        - каждая заявка — в своём workspace: <workspace>/runs/<request_id>;
+        - результаты пишутся по мере завершения в results_path
+          (по умолчанию <workspace>/results.jsonl), по строке на заявку;
+        - step_workers — параллелизм шагов внутри одной заявки.
+
+        Ошибка заявки не прерывает пакет: она попадает в results со status=error.
+        """
+        results = Path(results_path) if results_path else self.workspace / "results.jsonl"
+        results.parent.mkdir(parents=True, exist_ok=True)
+        workers = max(1, max_workers or self.max_workers)
+        skip = list(skip_optional or [])
+        counts = {"total": 0, "ok": 0, "error": 0}
+        t0 = time.time()
+        self._append_journal({"event": "batch_start", "results": str(results), "workers": workers, "ts": t0})
+
+        with (
+            self._journal.flushing(),
+            results.open("w", encoding="utf-8") as out,
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mas-batch") as pool,
+        ):
+            running: set[Future] = set()
+            for request_id, req in self._iter_requests(requests):
+                if len(running) >= workers * 2:
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    self._write_batch_results(done, out, counts)
+                running.add(pool.submit(self._run_one, request_id, req, step_workers, skip))
+            done, _ = wait(running)
+            self._write_batch_results(done, out, counts)
+
+        summary = {"status": "ok", **counts, "results": str(results), "duration_ms": int((time.time() - t0) * 1000)}
+        with self._journal.flushing():
+            self._append_journal({"event": "batch_done", "summary": summary, "ts": time.time()})
         return summary
 
+    def _iter_requests(self, requests: str | Iterable[dict[str, Any]]) -> Iterator[tuple[str, dict[str, Any] | str]]:
+        """(request_id, запрос | текст ошибки разбора); id уникализируются для имён каталогов."""
+        seen: set[str] = set()
+
+        def _records() -> Iterator[tuple[int, dict[str, Any] | str]]:
+            if isinstance(requests, str | Path):
+                with Path(requests).open(encoding="utf-8") as f:
+                    for n, line in enumerate(f, 1):
+                        if not line.strip():
+                            continue
+                        try:
+                            yield n, json.loads(line)
+                        except ValueError as e:
+                            yield n, f"line {n}: invalid JSON: {e}"
+            else:
+                yield from enumerate(requests, 1)
+
+        for n, req in _records():
+            raw_id = (req.get("request_id") or req.get("id")) if isinstance(req, dict) else None
+            request_id = re.sub(r"[^A-Za-z0-9_.-]+", "_", str(raw_id or f"{n:06d}"))[:100]
+            if request_id in seen:
+                request_id = f"{request_id}-{n}"
+            seen.add(request_id)
+            yield request_id, req
+
+    def _run_one(self, request_id: str, req: dict[str, Any] | str, step_workers: int, skip: list[str]) -> dict[str, Any]:
+        t0 = time.time()
+        workspace = self.workspace / "runs" / request_id
+        record: dict[str, Any] = {"request_id": request_id, "workspace": str(workspace)}
+        try:
+            if isinstance(req, str):
+                raise ValueError(req)
+            runner = self._fork(str(workspace), step_workers)
+            try:
+                summary = runner.run(req, skip_optional=skip)
+            finally:
+                # тысячи заявок — не держим открытыми файлы журналов и памяти
+                runner.close()
+            record.update(status="ok", run_id=runner.run_id, result=summary["result"])
+        except Exception as e:
+            record.update(status="error", error=f"{type(e).__name__}: {e}")
+        record["duration_ms"] = int((time.time() - t0) * 1000)
+        return record
+
+    @staticmethod
+    def _write_batch_results(done: Iterable[Future], out: Any, counts: dict[str, int]) -> None:
+        for fut in done:
+            record = fut.result()
+            counts["total"] += 1
+            counts[record["status"]] += 1
+            out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        out.flush()
+
     # =========================
     # ВСПОМОГАТЕЛЬНЫЕ МЕТОДЫ
     # =========================
 
+    def close(self) -> None:
+        """🆕: Сбрасывает и закрывает журнал и память потока."""
+        self._flush_memory()
+        self._journal.close()
+        self.memory.close()
+        self.blobs.close()
+
     def _append_journal(self, record: dict[str, Any]) -> None:
         """
         🆕: Пишет запись журнала в JSONL. Никогда не бросает исключений наружу
@@ -264,13 +1177,17 @@ class WorkflowRunner:
         Изменение ради безопасности (Bandit B110):
         - Вместо «try/except/ pass» используем contextlib.suppress(Exception).
         - Старый блок оставлен закомментированным ниже для прозрачности diff.
-        """
-        line = json.dumps(record, ensure_ascii=False)
 
+        🆕: запись уходит в буфер JournalWriter (без open/close на событие);
+        run()/resume()/plan()/run_many() сбрасывают его по завершении.
+        """
         # ✅ Новая версия (безопасно, соответствует Bandit):
         with suppress(Exception):
-            with self._journal_path.open("a", encoding="utf-8") as f:
-                f.write(line + "\n")
+            self._journal.write(record)
+        # 🆕: ошибки подписчиков шины (sync-режим) тоже не роняют запуск
+        if self.bus is not None:
+            with suppress(Exception):
+                self.bus.publish(event_topic(record), record)
 
         # ---- LEGACY (оставлено закомментированным для контроля изменений) ----
         # try:
@@ -3,6 +3,8 @@ from __future__ import annotations
 
 from pathlib import Path
 
+from mas.core.tracing import span
+
 
 class RepoOps:
     def __init__(self, root: str):
@@ -10,9 +12,11 @@ class RepoOps:
         self.root.mkdir(parents=True, exist_ok=True)
 
     def write_file(self, rel_path: str, content: str) -> None:
-        p = self.root / rel_path
-        p.parent.mkdir(parents=True, exist_ok=True)
-        p.write_text(content, encoding="utf-8")
+        # 🆕: span file.write — виден в трассе шага (WorkflowRunner(trace=True))
+        with span("file.write", path=rel_path, chars=len(content)):
+            p = self.root / rel_path
+            p.parent.mkdir(parents=True, exist_ok=True)
+            p.write_text(content, encoding="utf-8")
 
     def ensure_gitkeep(self, rel_dir: str) -> None:
         d = self.root / rel_dir
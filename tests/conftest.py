@@ -18,3 +18,186 @@ if _SRC.exists() and _src_str not in sys.path:
 # Если позже вы решите ставить пакет в editable-mode:
 #   pip install -e .
 # Тогда этот conftest можно оставить — он не мешает.
+
+
+# ---------------------------------------------------------------------------
+# 🆕 Фикстура для тестов WorkflowRunner: временный пакет агентов + YAML-конфиги.
+# Агенты регистрируются как "<pkg>.<name>" (как в configs/agents.yaml).
+# ---------------------------------------------------------------------------
+import textwrap  # noqa: E402
+
+import pytest  # noqa: E402
+import yaml  # noqa: E402
+
+TEST_AGENTS_PKG = "mas_test_agents"
+
+_TEST_AGENTS = {
+    "echo": """
+        from mas.core.agent import AgentResult, BaseAgent
+
+
+        class Echo(BaseAgent):
+            name = "echo"
+
+            def run(self, input_data):
+                return AgentResult(title="echo", payload={"echo": input_data})
+    """,
+    "sleepy": """
+        import time
+
+        from mas.core.agent import AgentResult, BaseAgent
+
+
+        class Sleepy(BaseAgent):
+            name = "sleepy"
+
+            def run(self, input_data):
+                delay = float((input_data or {}).get("delay", 0.2))
+                started = time.perf_counter()
+                time.sleep(delay)
+                return AgentResult(title="sleepy", payload={"delay": delay, "started": started, "finished": time.perf_counter()})
+    """,
+    "const": """
+        from mas.core.agent import AgentResult, BaseAgent
+
+
+        class Const(BaseAgent):
+            name = "const"
+
+            def run(self, input_data):
+                return AgentResult(title="const", payload={"const": 1})
+    """,
+    "asleep": """
+        import asyncio
+        import time
+
+        from mas.core.agent import AgentResult, BaseAgent
+
+
+        class Asleep(BaseAgent):
+            name = "asleep"
+
+            async def arun(self, input_data):
+                delay = float((input_data or {}).get("delay", 0.2))
+                started = time.perf_counter()
+                await asyncio.sleep(delay)
+                return AgentResult(title="asleep", payload={"delay": delay, "started": started, "finished": time.perf_counter()})
+    """,
+    "flaky": """
+        from pathlib import Path
+
+        from mas.core.agent import AgentResult, BaseAgent
+
+
+        class Flaky(BaseAgent):
+            name = "flaky"
+
+            def run(self, input_data):
+                counter = Path(self.ctx.workspace) / "flaky.count"
+                n = int(counter.read_text()) + 1 if counter.exists() else 1
+                counter.write_text(str(n))
+                if n <= int(input_data.get("fail_times", 0)):
+                    raise RuntimeError(f"flaky failure #{n}")
+                return AgentResult(title="flaky", payload={"attempts": n})
+    """,
+    "hang": """
+        from mas.core.agent import AgentResult, BaseAgent
+
+
+        class Hang(BaseAgent):
+            name = "hang"
+
+            def run(self, input_data):
+                # кооперативно ждём отмены (таймаут шага или cancel())
+                cancelled = self.ctx.cancel_token.wait(float(input_data.get("hang_s", 5)))
+                return AgentResult(title="hang", payload={"cancelled": cancelled})
+    """,
+    "pid": """
+        import os
+        import sys
+
+        from mas.core.agent import AgentResult, BaseAgent
+
+
+        class Pid(BaseAgent):
+            name = "pid"
+
+            def run(self, input_data):
+                loaded = sorted(m for m in sys.modules if m.startswith("mas_test_agents."))
+                return AgentResult(title="pid", payload={"pid": os.getpid(), "loaded": loaded, "input": input_data})
+    """,
+    "boom": """
+        from mas.core.agent import AgentResult, BaseAgent
+
+
+        class Boom(BaseAgent):
+            name = "boom"
+
+            def run(self, input_data):
+                raise RuntimeError("boom")
+    """,
+    "writer": """
+        from mas.core.agent import AgentResult, BaseAgent
+        from mas.core.tools import Toolset
+        from mas.tools.repo import RepoOps
+
+
+        class Writer(BaseAgent):
+            name = "writer"
+
+            def run(self, input_data):
+                text = Toolset(upper=lambda text: text.upper()).call("upper", text="hello")
+                RepoOps(f"{self.ctx.workspace}/out").write_file("hello.txt", text)
+                return AgentResult(title="writer", payload={"text": text})
+    """,
+    "quit": """
+        from mas.core.agent import BaseAgent
+        from mas.core.cancel import RunCancelledError
+
+
+        class Quit(BaseAgent):
+            name = "quit"
+
+            def run(self, input_data):
+                raise RunCancelledError("agent gave up")
+    """,
+    "loose": """
+        from mas.core.agent import BaseAgent
+
+
+        class Loose(BaseAgent):
+            name = "loose"
+
+            def run(self, input_data):
+                # результат без AgentResult — раннер проверит его на границе
+                return {"title": "loose", "payload": input_data["payload"]}
+    """,
+}
+
+
+@pytest.fixture
+def mas_flow(tmp_path, monkeypatch):
+    """
+    Возвращает make(steps) -> (agents_yaml, flow_yaml, agents_pkg).
+    steps — список dict в формате workflow.steps; agent_opts — доп. поля
+    записей agents.yaml (например, {"pid": {"executor": "process"}}).
+    """
+    root = tmp_path / "pkgs"
+    pkg = root / TEST_AGENTS_PKG
+    pkg.mkdir(parents=True)
+    (pkg / "__init__.py").write_text("", encoding="utf-8")
+    agents_cfg: dict[str, dict[str, str]] = {}
+    for name, src in _TEST_AGENTS.items():
+        (pkg / f"{name}.py").write_text(textwrap.dedent(src).lstrip(), encoding="utf-8")
+        agents_cfg[name] = {"type": name.capitalize()}
+    monkeypatch.syspath_prepend(str(root))
+
+    def make(steps: list[dict], name: str = "flow", agent_opts: dict[str, dict] | None = None) -> tuple[str, str, str]:
+        cfg = {agent: {**meta, **(agent_opts or {}).get(agent, {})} for agent, meta in agents_cfg.items()}
+        agents_yaml = tmp_path / "agents.yaml"
+        agents_yaml.write_text(yaml.safe_dump({"agents": cfg}), encoding="utf-8")
+        flow_yaml = tmp_path / f"{name}.yaml"
+        flow_yaml.write_text(yaml.safe_dump({"workflow": {"name": name, "steps": steps}}, sort_keys=False), encoding="utf-8")
+        return str(agents_yaml), str(flow_yaml), TEST_AGENTS_PKG
+
+    return make
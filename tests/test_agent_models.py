@@ -0,0 +1,55 @@
+# tests/test_agent_models.py — лёгкие AgentContext/AgentResult и проверка на границе раннера
+import json
+import pickle
+
+import pytest
+from pydantic import ValidationError
+
+from mas.core.agent import AgentContext, AgentResult
+from mas.core.async_workflow import AsyncWorkflowRunner
+from mas.core.cancel import CancelToken
+from mas.core.workflow import WorkflowRunner
+
+
+def test_context_is_slotted_and_compatible():
+    a, b = AgentContext(workspace="ws"), AgentContext("ws")
+    a.memory["k"] = 1
+    assert b.memory == {}  # у каждого контекста своя память
+    assert not hasattr(a, "__dict__")
+
+    token = CancelToken()
+    step = a.model_copy(update={"cancel_token": token})
+    assert step.cancel_token is token and a.cancel_token is None
+    assert step.memory is a.memory  # копия поверхностная, как у pydantic
+    assert step.model_dump() == {"workspace": "ws", "memory": {"k": 1}, "cancel_token": token}
+
+    clone = pickle.loads(pickle.dumps(a))
+    assert clone == a and clone is not a
+    with pytest.raises(ValidationError):
+        AgentContext.model_validate({"memory": {}})
+
+
+def test_result_coerce_keeps_payload_by_reference():
+    payload = {"big": list(range(1000))}
+    result = AgentResult(title="t", payload=payload)
+    assert AgentResult.coerce(result) is result
+    assert result.payload is payload
+
+    loose = AgentResult.coerce({"title": "t", "payload": payload})
+    assert loose == result
+    assert AgentResult.coerce(AgentResult.model_validate(result)) == result
+    with pytest.raises(ValidationError):
+        AgentResult.coerce(AgentResult(title="t", payload=["not", "a", "dict"]))  # type: ignore[arg-type]
+
+
+@pytest.mark.parametrize("runner_cls", [WorkflowRunner, AsyncWorkflowRunner])
+def test_runner_validates_results_at_boundary(mas_flow, tmp_path, runner_cls):
+    steps = [{"id": "loose", "agent": "loose", "input_from": "request"}, {"id": "tail", "agent": "echo", "input_from": "loose"}]
+    agents, flow, pkg = mas_flow(steps)
+
+    summary = runner_cls(str(tmp_path / "ok"), agents, flow, agents_pkg=pkg).run(json.dumps({"payload": {"x": 1}}))
+    assert summary["status"] == "ok"
+    assert summary["result"] == {"echo": {"x": 1}}
+
+    with pytest.raises(ValidationError):
+        runner_cls(str(tmp_path / "bad"), agents, flow, agents_pkg=pkg).run(json.dumps({"payload": [1, 2]}))
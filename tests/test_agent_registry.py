@@ -0,0 +1,57 @@
+# tests/test_agent_registry.py — ленивый реестр агентов
+import json
+import sys
+
+import pytest
+
+from mas.core import registry
+from mas.core.workflow import WorkflowRunner
+
+
+@pytest.fixture
+def fresh_imports(monkeypatch):
+    """Чистый кэш классов и выгруженные тестовые модули агентов."""
+    monkeypatch.setattr(registry, "_CLASS_CACHE", {})
+    for name in [m for m in sys.modules if m.startswith("mas_test_agents.")]:
+        monkeypatch.delitem(sys.modules, name)
+
+
+def test_only_used_agents_are_imported(mas_flow, tmp_path, fresh_imports):
+    agents, flow, pkg = mas_flow([{"id": "a", "agent": "echo", "input_from": "request"}])
+    ws = tmp_path / "ws"
+    runner = WorkflowRunner(str(ws), agents, flow, agents_pkg=pkg)
+
+    # Создание раннера и валидация ничего не импортируют
+    assert f"{pkg}.echo" not in sys.modules
+    assert "boom" in runner._agents
+
+    runner.run('{"x": 1}')
+    runner.run('{"x": 2}')
+
+    assert f"{pkg}.echo" in sys.modules
+    assert f"{pkg}.boom" not in sys.modules
+    lines = (ws / "logs" / "workflow.jsonl").read_text(encoding="utf-8").splitlines()
+    imports = [r for r in map(json.loads, lines) if r["event"] == "agent_import"]
+    assert len(imports) == 1
+    assert imports[0]["agent"] == "echo"
+    assert imports[0]["ref"] == f"{pkg}.echo:Echo"
+    assert imports[0]["process_cached"] is False
+
+
+def test_classes_are_cached_process_wide(mas_flow, tmp_path, fresh_imports):
+    agents, flow, pkg = mas_flow([{"id": "a", "agent": "echo", "input_from": "request"}])
+    first = registry.AgentRegistry.from_yaml(agents, pkg)
+    second = registry.AgentRegistry.from_yaml(agents, pkg)
+
+    cls, imported = first.resolve("echo")
+    assert imported["process_cached"] is False
+    assert first.resolve("echo") == (cls, None)
+    assert second.resolve("echo")[1]["process_cached"] is True
+    assert second["echo"] is cls
+
+
+def test_unknown_module_fails_on_first_use():
+    reg = registry.AgentRegistry({"ghost": "mas_test_agents.ghost:Ghost"})
+    assert "ghost" in reg
+    with pytest.raises(ModuleNotFoundError):
+        reg["ghost"]
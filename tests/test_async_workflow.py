@@ -0,0 +1,57 @@
+# tests/test_async_workflow.py — AsyncWorkflowRunner и BaseAgent.arun
+import asyncio
+import json
+import time
+
+import pytest
+
+from mas.core.async_workflow import AsyncWorkflowRunner
+from mas.core.workflow import WorkflowRunner
+
+STEPS = [
+    {"id": "a", "agent": "asleep", "input_from": "request"},
+    {"id": "b", "agent": "asleep", "input_from": "request"},
+    {"id": "c", "agent": "sleepy", "input_from": "request"},  # sync-агент → поток
+    {"id": "d", "agent": "echo", "input_from": "b"},
+]
+
+
+def test_many_workflows_share_one_loop(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow(STEPS)
+    runners = [AsyncWorkflowRunner(str(tmp_path / f"ws{i}"), agents, flow, agents_pkg=pkg) for i in range(5)]
+
+    async def main():
+        return await asyncio.gather(*(r.arun({"delay": 0.2}) for r in runners))
+
+    t0 = time.perf_counter()
+    summaries = asyncio.run(main())
+    assert time.perf_counter() - t0 < 0.8  # 15 шагов по 0.2 с — параллельно
+    assert all(s["result"]["echo"]["delay"] == 0.2 for s in summaries)
+    state = json.loads((tmp_path / "ws0" / "flow_state.json").read_text(encoding="utf-8"))
+    assert set(state) == {"a", "b", "c", "d"}
+
+
+def test_shared_semaphore_is_a_global_limit(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow(STEPS[:2])
+
+    async def main():
+        limit = asyncio.Semaphore(1)
+        runners = [AsyncWorkflowRunner(str(tmp_path / f"ws{i}"), agents, flow, agents_pkg=pkg, concurrency=limit) for i in range(2)]
+        return await asyncio.gather(*(r.arun({"delay": 0.05}) for r in runners))
+
+    t0 = time.perf_counter()
+    asyncio.run(main())
+    assert time.perf_counter() - t0 >= 0.2  # 4 шага строго по одному
+
+
+def test_async_only_agent_runs_in_sync_runner(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow(STEPS[:1])
+    summary = WorkflowRunner(str(tmp_path / "ws"), agents, flow, agents_pkg=pkg).run('{"delay": 0.01}')
+    assert summary["result"]["delay"] == 0.01
+
+
+def test_async_error_propagates(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow([{"id": "x", "agent": "boom", "input_from": "request"}])
+    runner = AsyncWorkflowRunner(str(tmp_path / "ws"), agents, flow, agents_pkg=pkg)
+    with pytest.raises(RuntimeError, match="boom"):
+        asyncio.run(runner.arun("{}"))
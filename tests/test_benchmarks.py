@@ -0,0 +1,52 @@
+# tests/test_benchmarks.py — харнесс бенчмарков: сравнение с базовой линией и CLI (make bench)
+import json
+
+from benchmarks.__main__ import main
+from benchmarks.harness import CASES, compare, failures
+
+
+def _report(**medians):
+    return {"results": {name: {"status": "ok", "median_ms": ms} for name, ms in medians.items()}}
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    baseline = _report(a=1.0, b=1.0, c=1.0)
+    current = _report(a=1.2, b=1.5, c=0.5, d=1.0)
+    current["results"]["e"] = {"status": "error", "reason": "boom"}
+
+    rows = {row["name"]: row for row in compare(current, baseline, threshold=0.25)}
+    assert rows["a"]["status"] == "ok" and rows["a"]["ratio"] == 1.2
+    assert rows["b"]["status"] == "regression"
+    assert rows["c"]["status"] == "improvement"
+    assert rows["d"]["status"] == "new"
+    assert [row["name"] for row in failures(list(rows.values()))] == ["b", "e"]
+    assert compare(current, baseline, threshold=0.6)[1]["status"] == "ok"
+
+
+def test_cli_saves_baseline_and_compares(tmp_path, capsys):
+    baseline = tmp_path / "baseline.json"
+    args = ["-k", "bus.publish[1]", "--quick", "--baseline", str(baseline)]
+
+    # без базовой линии гейт не проходит молча
+    assert main([*args, "--out", str(tmp_path / "none.json")]) == 2
+    assert main([*args, "--out", str(tmp_path / "none.json"), "--allow-missing-baseline"]) == 0
+
+    assert main([*args, "--out", str(tmp_path / "first.json"), "--save-baseline"]) == 0
+    saved = json.loads(baseline.read_text(encoding="utf-8"))
+    assert saved["environment"]["python"] and "git_commit" in saved["environment"]
+    assert saved["results"]["bus.publish[1]"]["status"] == "ok"
+
+    assert main([*args, "--out", str(tmp_path / "second.json"), "--threshold", "100"]) == 0
+    assert "bus.publish[1]" in capsys.readouterr().out
+
+    # искусственно быстрая базовая линия → регрессия и код выхода 1
+    saved["results"]["bus.publish[1]"]["median_ms"] = 1e-9
+    baseline.write_text(json.dumps(saved), encoding="utf-8")
+    assert main([*args, "--out", str(tmp_path / "third.json")]) == 1
+
+
+def test_suite_covers_requested_areas():
+    names = set(CASES)
+    assert {"workflow.construct", "workflow.plan", "workflow.app_build", "api.contracts[raw]"} <= names
+    assert {f"memory.{backend}.set_flush[10000]" for backend in ("json", "sqlite", "journal")} <= names
+    assert "bus.publish[100]" in names
@@ -0,0 +1,83 @@
+# tests/test_blobs.py — блобы крупных выходов шагов и ленивые ссылки (BlobStore/LazyPayload)
+import json
+import os
+import pickle
+
+from mas.core.blobs import BlobStore, LazyPayload, is_ref
+from mas.core.workflow import WorkflowRunner
+
+BIG = "x" * 5000
+
+
+def test_externalize_dedupes_and_loads_once(tmp_path):
+    store = BlobStore(tmp_path, threshold=1024)
+    small = {"a": 1, "b": "short"}
+    assert store.externalize(small) is small
+
+    payload = {"code": BIG, "files": [BIG], "n": 1}
+    stored = store.externalize(payload)
+    assert is_ref(stored["code"]) and is_ref(stored["files"]) and stored["n"] == 1
+    assert payload["code"] == BIG  # исходный payload не меняется
+    assert store.externalize({"same": BIG})["same"] == stored["code"]
+    assert store.stats()["stored"] == 2 and store.stats()["deduped"] == 1
+
+    assert bytes(store.view(stored["code"])) == BIG.encode()
+    for _ in range(3):
+        assert store.load(stored["files"]) == [BIG]
+    assert store.stats()["loads"] == 1 and store.stats()["hits"] == 2
+    assert store.materialize(stored) == payload
+    store.close()
+
+
+def test_lazy_payload_resolves_on_access(tmp_path):
+    store = BlobStore(tmp_path, threshold=1024)
+    stored = store.externalize({"code": BIG, "n": 1})
+    lazy = store.lazy({"up": stored, "req": {"k": "v"}})
+
+    assert isinstance(lazy, LazyPayload)
+    assert lazy["up"]["code"] == BIG
+    assert lazy.get("up").get("n") == 1
+    assert store.stats()["loads"] == 1  # "n" и "req" не трогают блоб
+    plain = {"up": {"code": BIG, "n": 1}, "req": {"k": "v"}}
+    assert lazy == plain and dict(lazy) == plain and {**lazy} == plain
+    assert json.loads(json.dumps(lazy)) == plain
+    assert pickle.loads(pickle.dumps(lazy)) == plain
+    assert len(pickle.dumps(lazy)) < len(BIG)  # в пул процессов уходят ссылки, а не значения
+    assert is_ref(lazy.raw()["up"]["code"])
+
+
+def test_runner_keeps_references_in_flow_memory(mas_flow, tmp_path):
+    steps = [{"id": "root", "agent": "echo", "input_from": "request"}, {"id": "remote", "agent": "pid", "input_from": "root"}]
+    agents, flow, pkg = mas_flow(steps, agent_opts={"pid": {"executor": "process"}})
+    ws = tmp_path / "ws"
+    runner = WorkflowRunner(str(ws), agents, flow, agents_pkg=pkg, process_workers=1, blob_threshold=1024)
+
+    result = runner.run({"blob": BIG})["result"]
+    runner.close()
+
+    # воркер процесса получил ссылку и развернул её сам
+    assert result["pid"] != os.getpid()
+    assert result["input"] == {"echo": {"blob": BIG}}
+    state = json.loads((ws / "flow_state.json").read_text(encoding="utf-8"))
+    assert is_ref(state["root"]["echo"]) and is_ref(state["remote"]["input"])
+    assert len(list((ws / ".blobs").glob("*/*"))) == 2
+    assert os.path.getsize(ws / "flow_state.json") < 1024
+
+
+def test_user_dicts_with_blob_key_round_trip(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow([{"id": "root", "agent": "echo", "input_from": "request"}, {"id": "next", "agent": "echo", "input_from": "root"}])
+    runner = WorkflowRunner(str(tmp_path / "ws"), agents, flow, agents_pkg=pkg, blob_threshold=1024)
+    # похоже на ссылку, но не ссылка: чужой $blob, лишние поля, не тот kind/size
+    request = {
+        "$blob": "notes",
+        "meta": {"$blob": "0" * 64, "kind": "json", "size": 3, "extra": 1},
+        "odd": {"$blob": "0" * 64, "kind": "yaml", "size": 3},
+        "big": BIG,
+    }
+
+    result = runner.run(request)["result"]
+    runner.close()
+
+    assert result == {"echo": {"echo": request}}
+    assert not is_ref(request["meta"]) and not is_ref(request["odd"])
+    assert is_ref(BlobStore(tmp_path, threshold=1024).put(BIG))
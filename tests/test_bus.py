@@ -0,0 +1,176 @@
+# tests/test_bus.py — EventBus: sync-режим, очереди подписчиков, шаблоны тем
+import asyncio
+import threading
+import time
+from pathlib import Path
+
+import pytest
+import yaml
+
+from mas.core.bus import EventBus, TopicTrie
+from mas.core.workflow import WorkflowRunner, event_topic
+
+
+def test_sync_mode_delivers_inline():
+    bus = EventBus()
+    seen = []
+    bus.subscribe("t", seen.append)
+    bus.publish("t", 1)
+    bus.publish("other", 2)
+    assert seen == [1]
+    with pytest.raises(ZeroDivisionError):
+        bus.subscribe("t", lambda e: 1 / 0)
+        bus.publish("t", 3)
+
+
+def test_slow_subscriber_does_not_stall_publisher():
+    seen_fast, seen_slow = [], []
+    with EventBus(mode="thread", workers=2) as bus:
+        bus.subscribe("t", lambda e: (time.sleep(0.05), seen_slow.append(e)))
+        bus.subscribe("t", seen_fast.append)
+
+        t0 = time.perf_counter()
+        for n in range(10):
+            bus.publish("t", n)
+        assert time.perf_counter() - t0 < 0.2
+        assert bus.drain(timeout=5)
+
+    assert seen_fast == list(range(10))
+    assert seen_slow == list(range(10))
+    slow = next(s for s in bus.stats() if s["delivered"] and s["max_lag_s"] > 0.2)
+    assert slow["queued"] == 0
+    with pytest.raises(RuntimeError):
+        bus.publish("t", 99)
+
+
+@pytest.mark.parametrize(("policy", "expected"), [("drop_oldest", [0, 3, 4]), ("drop_newest", [0, 1, 2])])
+def test_drop_policies(policy, expected):
+    gate = threading.Event()
+    seen = []
+    bus = EventBus(mode="thread", maxsize=2, policy=policy)
+
+    def handler(event):
+        gate.wait(5)
+        seen.append(event)
+
+    bus.subscribe("t", handler)
+    bus.publish("t", 0)
+    time.sleep(0.05)  # 0 уже доставляется, очередь пуста
+    for n in range(1, 5):
+        bus.publish("t", n)
+    gate.set()
+    bus.close(timeout=5)
+
+    assert seen == expected
+    assert bus.stats()[0]["dropped"] == 2
+
+
+def test_block_policy_waits_for_space_and_errors_are_counted():
+    bus = EventBus(mode="thread", maxsize=1, policy="block")
+    seen = []
+
+    def handler(event):
+        time.sleep(0.02)
+        if event == 2:
+            raise ValueError("bad event")
+        seen.append(event)
+
+    bus.subscribe("t", handler)
+    for n in range(5):
+        bus.publish("t", n)
+    assert bus.close(timeout=5)
+
+    assert seen == [0, 1, 3, 4]
+    stats = bus.stats()[0]
+    assert stats["dropped"] == 0
+    assert stats["max_queued"] == 1
+    assert stats["errors"] == 1
+    assert "bad event" in stats["last_error"]
+
+
+def test_async_mode():
+    async def main():
+        seen = []
+        bus = EventBus(mode="async", maxsize=2)
+
+        async def handler(event):
+            await asyncio.sleep(0.01)
+            seen.append(event)
+
+        bus.subscribe("t", handler)
+        with pytest.raises(RuntimeError, match="apublish"):
+            bus.publish("t", -1)
+        for n in range(5):
+            await bus.apublish("t", n)
+        assert await bus.aclose(timeout=5)
+        return seen, bus.stats()[0]
+
+    seen, stats = asyncio.run(main())
+    assert seen == [0, 1, 2, 3, 4]
+    assert stats["max_queued"] == 2
+
+
+def test_wildcard_topics():
+    bus = EventBus()
+    seen: dict[str, list[str]] = {}
+    for pattern in ("step.done.backend", "step.*", "step.*.backend", "step.#", "#", "run.#.x"):
+        bus.subscribe(pattern, lambda e, p=pattern: seen.setdefault(p, []).append(e))
+
+    for topic in ("step", "step.done", "step.done.backend", "step.error.frontend", "run.x", "run.a.b.x", "run.a"):
+        bus.publish(topic, topic)
+
+    assert seen["step.done.backend"] == ["step.done.backend"]
+    assert seen["step.*"] == ["step.done"]
+    assert seen["step.*.backend"] == ["step.done.backend"]
+    assert seen["step.#"] == ["step", "step.done", "step.done.backend", "step.error.frontend"]
+    assert len(seen["#"]) == 7
+    assert seen["run.#.x"] == ["run.x", "run.a.b.x"]
+
+    with pytest.raises(ValueError, match="whole segment"):
+        bus.subscribe("step.do*", print)
+    with pytest.raises(ValueError, match="wildcards"):
+        bus.publish("step.*", 1)
+
+
+def test_trie_match_is_ordered_and_deduplicated():
+    bus = EventBus()
+    order = []
+    bus.subscribe("a.#", lambda e: order.append("a.#"))
+    bus.subscribe("a.b", lambda e: order.append("a.b"))
+    bus.subscribe("a.#.#", lambda e: order.append("a.#.#"))
+    bus.publish("a.b", None)
+    assert order == ["a.#", "a.b", "a.#.#"]
+    # кэш сопоставлений сбрасывается новой подпиской
+    bus.subscribe("*.b", lambda e: order.append("*.b"))
+    bus.publish("a.b", None)
+    assert order[3:] == ["a.#", "a.b", "a.#.#", "*.b"]
+    assert TopicTrie().match("a.b") == []
+
+
+def test_runner_publishes_journal_events(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow([{"id": "s1", "agent": "echo"}, {"id": "s2", "agent": "const", "input_from": "s1"}])
+    bus = EventBus()
+    steps, runs = [], []
+    bus.subscribe("step.done.#", lambda r: steps.append(r["step_id"]))
+    bus.subscribe("run.*", lambda r: runs.append(r["event"]))
+    bus.subscribe("step.#", lambda r: 1 / 0)  # ошибка подписчика не роняет запуск
+
+    WorkflowRunner(str(tmp_path / "ws"), agents, flow, agents_pkg=pkg, max_workers=1, bus=bus).run('{"x": 1}')
+
+    assert steps == ["s1", "s2"]
+    assert runs == ["run_start", "run_done"]
+
+
+def test_agent_names_become_single_topic_segment(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow([{"id": "s1", "agent": "api.v2*"}])
+    cfg = yaml.safe_load(Path(agents).read_text(encoding="utf-8"))
+    cfg["agents"]["api.v2*"] = {"type": "Echo", "module": f"{pkg}.echo"}
+    Path(agents).write_text(yaml.safe_dump(cfg), encoding="utf-8")
+    bus = EventBus()
+    topics = []
+    bus.subscribe("step.done.*", lambda r: topics.append(r["step_id"]))
+
+    WorkflowRunner(str(tmp_path / "ws"), agents, flow, agents_pkg=pkg, max_workers=1, bus=bus).run('{"x": 1}')
+
+    assert topics == ["s1"]
+    assert event_topic({"event": "step_done", "agent": "api.v2*"}) == "step.done.api_v2_"
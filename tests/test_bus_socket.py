@@ -0,0 +1,106 @@
+# tests/test_bus_socket.py — EventBus между процессами через локальный брокер
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from mas.core.bus_socket import EventBroker, SocketBus
+from mas.core.eventlog import EventLog
+
+
+@pytest.fixture
+def broker():
+    # Путь Unix-сокета ограничен ~100 байтами — tmp_path pytest может быть длиннее
+    with tempfile.TemporaryDirectory(prefix="mas-bus-") as tmp:
+        broker = EventBroker(Path(tmp) / "bus.sock").start()
+        yield broker
+        broker.stop()
+
+
+def _wait(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "timeout"
+        time.sleep(0.005)
+
+
+def test_events_fan_out_to_other_processes(broker):
+    with SocketBus(broker.path) as monitor, SocketBus(broker.path) as runner:
+        got, local = [], []
+        done = threading.Event()
+        monitor.subscribe("step.#", lambda e: (got.append(e), e == 999 and done.set()))
+        runner.subscribe("step.#", local.append)
+        _wait(lambda: sum(len(s["patterns"]) for s in broker.stats()) == 2)
+
+        runner.publish("run.start", "ignored")
+        for n in range(1000):
+            runner.publish("step.done.backend", n)
+        assert done.wait(5)
+
+        assert got == list(range(1000))
+        # свои события — только локально, без эха от брокера
+        assert local == list(range(1000))
+        # счётчик sent растёт после sendall() — брокер мог доставить пачку раньше
+        _wait(lambda: runner.transport_stats()["sent"] == 1001)
+        stats = runner.transport_stats()
+        assert stats["connected"] is True
+        assert stats["unsent"] == 0
+    assert monitor.transport_stats()["received"] == 1000
+
+
+def test_overlapping_patterns_deliver_once(broker):
+    with SocketBus(broker.path) as monitor, SocketBus(broker.path) as runner:
+        got = []
+        monitor.subscribe("#", got.append)
+        monitor.subscribe("step.*", got.append)
+        _wait(lambda: sum(len(s["patterns"]) for s in broker.stats()) == 2)
+        runner.publish("step.done", {"x": 1})
+        _wait(lambda: monitor.transport_stats()["received"] == 1)
+        # один кадр от брокера, локально — оба подписчика
+        assert got == [{"x": 1}, {"x": 1}]
+
+
+def test_broker_unavailable(tmp_path):
+    with pytest.raises(ConnectionError, match="not available"):
+        SocketBus(tmp_path / "missing.sock")
+
+
+def test_publisher_survives_broker_shutdown(broker):
+    bus = SocketBus(broker.path)
+    seen = []
+    bus.subscribe("t", seen.append)
+    broker.stop()
+    _wait(lambda: not bus.connected)
+    bus.publish("t", 1)
+    bus.close()
+    assert seen == [1]
+    assert bus.transport_stats()["unsent"] == 1
+
+
+def test_broker_persists_routed_events(tmp_path):
+    with tempfile.TemporaryDirectory(prefix="mas-bus-") as tmp:
+        log = EventLog(tmp_path / "events")
+        broker = EventBroker(Path(tmp) / "bus.sock", log=log).start()
+        try:
+            with SocketBus(broker.path) as runner:
+                for n in range(5):
+                    runner.publish("step.done.a", n)
+            _wait(lambda: log.next_offset == 5)
+        finally:
+            broker.stop()
+    # опоздавший читатель догоняет запуск по журналу
+    reader = EventLog(tmp_path / "events", readonly=True)
+    assert [(r.topic, r.event) for r in reader.read(3)] == [("step.done.a", 3), ("step.done.a", 4)]
+
+
+def test_socket_bus_replays_local_log(broker, tmp_path):
+    with EventLog(tmp_path / "events") as log, SocketBus(broker.path, log=log) as bus:
+        for n in range(3):
+            bus.publish("step.done.backend", n)
+        seen = []
+        bus.subscribe("step.#", seen.append, replay_from=0)
+        assert seen == [0, 1, 2]
+        bus.publish("step.done.qa", 3)
+        assert seen == [0, 1, 2, 3]
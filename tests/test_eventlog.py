@@ -0,0 +1,104 @@
+# tests/test_eventlog.py — сегментированный журнал событий и replay в EventBus
+import threading
+import time
+
+import pytest
+
+from mas.core.bus import EventBus
+from mas.core.eventlog import EventLog
+
+
+def test_append_rotate_and_read(tmp_path):
+    with EventLog(tmp_path, segment_bytes=200) as log:
+        offsets = [log.append(f"step.done.a{n % 2}", {"n": n}, ts=1000.0 + n) for n in range(20)]
+        assert offsets == list(range(20))
+        assert log.stats()["segments"] > 3
+
+    log = EventLog(tmp_path, segment_bytes=200)
+    assert log.next_offset == 20
+    assert [r.event["n"] for r in log.read(7)] == list(range(7, 20))
+    assert [r.event["n"] for r in log.read(5, pattern="step.*.a1", end=12)] == [5, 7, 9, 11]
+    assert log.offset_for_time(1012.5) == 13
+    assert [r.offset for r in log.read(since=1017)] == [17, 18, 19]
+    assert log.append("run.done", None) == 20
+
+
+def test_retention_by_segment_count_and_age(tmp_path):
+    with EventLog(tmp_path, segment_bytes=100, max_segments=2) as log:
+        for n in range(30):
+            log.append("t", n)
+        assert log.stats()["segments"] == 2
+        first = log.first_offset
+        assert first > 0
+        assert [r.event for r in log.read(0)] == list(range(first, 30))
+
+
+def test_retention_by_age(tmp_path):
+    old = time.time() - 3600
+    with EventLog(tmp_path, segment_bytes=100) as log:
+        for n in range(10):
+            log.append("t", n, ts=old)
+        segments = log.stats()["segments"]
+    assert segments > 2
+
+    # max_age_s: старые сегменты уходят при открытии и ротации, текущий остаётся
+    log = EventLog(tmp_path, segment_bytes=100, max_age_s=60)
+    assert log.stats()["segments"] == 1
+    log.append("t", "new")
+    assert [r.event for r in log.read(0)][-1] == "new"
+
+
+def test_recovery_truncates_partial_tail(tmp_path):
+    with EventLog(tmp_path) as log:
+        for n in range(3):
+            log.append("t", n)
+    seg = next(tmp_path.glob("*.log"))
+    with seg.open("ab") as f:
+        f.write(b"\x00\x00\x00\x40garbage")  # оборванная запись
+    next(tmp_path.glob("*.idx")).unlink()  # и потерянный индекс
+
+    log = EventLog(tmp_path)
+    assert log.next_offset == 3
+    assert log.append("t", 3) == 3
+    assert [r.event for r in log.read(0)] == [0, 1, 2, 3]
+
+
+def test_readonly_reader_follows_writer(tmp_path):
+    writer = EventLog(tmp_path, segment_bytes=150)
+    reader = EventLog(tmp_path, readonly=True)
+    assert reader.next_offset == 0
+    for n in range(10):
+        writer.append("t", n)
+    assert [r.event for r in reader.read(4)] == list(range(4, 10))
+    with pytest.raises(RuntimeError):
+        reader.append("t", 0)
+
+
+def test_bus_replay_then_live_without_gaps(tmp_path):
+    bus = EventBus(mode="thread", log=EventLog(tmp_path))
+    for n in range(100):
+        bus.publish("step.done.x", n)
+
+    stop = threading.Event()
+    published = [100]
+
+    def spam():
+        while not stop.is_set() and published[0] < 5000:
+            bus.publish("step.done.x", published[0])
+            published[0] += 1
+
+    t = threading.Thread(target=spam)
+    t.start()
+    seen = []
+    sub = bus.subscribe("step.#", seen.append, replay_from=10)
+    stop.set()
+    t.join()
+    assert bus.drain(timeout=10)
+
+    assert seen == list(range(10, published[0]))
+    assert sub.replayed >= 90
+    bus.close()
+
+    late = []
+    with pytest.raises(ValueError, match="log"):
+        EventBus().subscribe("t", late.append, replay_from=0)
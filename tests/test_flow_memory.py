@@ -0,0 +1,146 @@
+# tests/test_flow_memory.py — FlowMemory: кэш в процессе и отложенная запись
+import json
+
+import pytest
+
+from mas.core.memory import FlowMemory, JournalFlowMemory, SQLiteFlowMemory
+from mas.core.workflow import WorkflowRunner
+
+
+def _on_disk(path) -> dict:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def test_autoflush_keeps_legacy_behaviour(tmp_path):
+    path = tmp_path / "flow_state.json"
+    mem = FlowMemory(str(path))
+    assert _on_disk(path) == {}
+    mem.set("a", {"x": 1})
+    assert _on_disk(path) == {"a": {"x": 1}}
+    assert FlowMemory(str(path)).get("a") == {"x": 1}
+
+
+def test_write_back_flushes_on_exit(tmp_path):
+    path = tmp_path / "flow_state.json"
+    with FlowMemory(str(path), autoflush=False) as mem:
+        mem.set("a", 1)
+        mem.set("b", 2)
+        assert mem.dirty
+        assert mem.get("a") == 1
+        assert _on_disk(path) == {}
+    assert _on_disk(path) == {"a": 1, "b": 2}
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_failed_write_keeps_previous_file(tmp_path):
+    path = tmp_path / "flow_state.json"
+    mem = FlowMemory(str(path), autoflush=False)
+    mem.set("ok", 1)
+    mem.flush()
+    mem.set("bad", object())
+    with pytest.raises(TypeError):
+        mem.flush()
+    assert _on_disk(path) == {"ok": 1}
+
+
+def test_runner_batches_flushes(mas_flow, tmp_path):
+    steps = [{"id": "a", "agent": "echo", "input_from": "request"}, {"id": "b", "agent": "boom", "input_from": "a"}]
+    agents, flow, pkg = mas_flow(steps)
+    ws = tmp_path / "ws"
+    runner = WorkflowRunner(str(ws), agents, flow, agents_pkg=pkg, flush_every=0)
+    with pytest.raises(RuntimeError):
+        runner.run('{"x": 1}')
+    # даже при ошибке выполненные шаги сохранены
+    assert _on_disk(ws / "flow_state.json") == {"a": {"echo": {"x": 1}}}
+
+
+def test_sqlite_keeps_runs_and_allows_concurrent_readers(tmp_path):
+    db = tmp_path / "flow_state.sqlite3"
+    mem = SQLiteFlowMemory(str(db), run_id="r1")
+    mem.set("a", {"x": 1})
+    mem.start_run("r2")
+    assert mem.get("a") is None
+    mem.set("a", {"x": 2})
+
+    reader = SQLiteFlowMemory(str(db), read_only=True)
+    assert reader.run_id == "r2"
+    assert reader.get("a") == {"x": 2}
+    assert reader.snapshot("r1") == {"a": {"x": 1}}
+    assert mem.runs() == ["r1", "r2"]
+    reader.close()
+
+    mem.keep_history = False
+    mem.start_run("r3")
+    mem.set("a", {"x": 3})
+    assert mem.runs() == ["r3"]
+    assert mem.snapshot("r1") == {}
+    mem.close()
+
+
+def test_sqlite_imports_flow_state_json(tmp_path):
+    src = tmp_path / "flow_state.json"
+    src.write_text(json.dumps({"intake": {"t": 1}, "plan": [1, 2]}), encoding="utf-8")
+    with SQLiteFlowMemory(str(tmp_path / "m.sqlite3")) as mem:
+        assert mem.import_json(str(src), run_id="imported") == 2
+        assert mem.snapshot("imported") == {"intake": {"t": 1}, "plan": [1, 2]}
+
+
+def test_runner_selects_backend_from_workspace_config(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow([{"id": "a", "agent": "echo", "input_from": "request"}])
+    ws = tmp_path / "ws"
+    ws.mkdir()
+    (ws / "mas.yaml").write_text("memory:\n  backend: sqlite\n", encoding="utf-8")
+    runner = WorkflowRunner(str(ws), agents, flow, agents_pkg=pkg)
+    run_ids = []
+    for x in (1, 2):
+        runner.run(json.dumps({"x": x}))
+        run_ids.append(runner.run_id)
+
+    with SQLiteFlowMemory(str(ws / "flow_state.sqlite3"), read_only=True) as mem:
+        assert mem.runs() == run_ids
+        assert mem.get("a") == {"echo": {"x": 2}}
+
+
+def test_journal_replays_and_recovers_from_torn_write(tmp_path):
+    path = tmp_path / "flow_state.jsonl"
+    with JournalFlowMemory(str(path)) as mem:
+        mem.start_run("r1")
+        mem.set("a", 1)
+        mem.set("a", 2)
+        mem.set("b", {"x": [1]})
+    with path.open("a", encoding="utf-8") as f:
+        f.write('{"op": "set", "key": "c", "val')  # «обрыв» при сбое
+
+    mem = JournalFlowMemory(str(path))
+    assert (mem.get("a"), mem.get("b"), mem.get("c")) == (2, {"x": [1]}, None)
+    assert [r["op"] for r in mem.history()] == ["run", "set", "set", "set"]
+    mem.set("c", 3)
+    mem.close()
+    assert JournalFlowMemory(str(path)).get("c") == 3
+
+
+@pytest.mark.parametrize("tail", ["[]", "1", '"x"', '{"op": "set", "key": "c"}', '{"key": "c", "value": 3}'])
+def test_journal_truncates_parsed_but_invalid_tail(tmp_path, tail):
+    path = tmp_path / "flow_state.jsonl"
+    with JournalFlowMemory(str(path)) as mem:
+        mem.set("a", 1)
+    with path.open("a", encoding="utf-8") as f:
+        f.write(tail + "\n" + json.dumps({"op": "set", "key": "b", "value": 2}) + "\n")
+
+    mem = JournalFlowMemory(str(path))
+    assert (mem.get("a"), mem.get("b")) == (1, None)
+    assert [r["key"] for r in mem.history()] == ["a"]
+    mem.close()
+
+
+def test_journal_compacts_by_record_count(tmp_path):
+    path = tmp_path / "flow_state.jsonl"
+    mem = JournalFlowMemory(str(path), compact_max_records=3, compact_max_bytes=None)
+    for i in range(5):
+        mem.set(f"k{i % 2}", i)
+    mem.close()
+
+    assert path.with_suffix(".snapshot.json").exists()
+    assert len(path.read_text(encoding="utf-8").splitlines()) < 3
+    reopened = JournalFlowMemory(str(path))
+    assert (reopened.get("k0"), reopened.get("k1")) == (4, 3)
@@ -0,0 +1,61 @@
+# tests/test_journal.py — буферизованный журнал выполнения
+import json
+import time
+
+import pytest
+
+from mas.core import plan as plan_mod
+from mas.core.journal import FLUSH_INTERVAL_S, JournalWriter
+from mas.core.workflow import WorkflowRunner
+
+
+def _lines(path) -> list[dict]:
+    return [json.loads(x) for x in path.read_text(encoding="utf-8").splitlines()] if path.exists() else []
+
+
+def test_records_are_buffered_until_flush(tmp_path):
+    path = tmp_path / "j.jsonl"
+    journal = JournalWriter(path, max_records=1000)
+    for n in range(10):
+        journal.write({"n": n})
+    journal.flush()
+    assert [r["n"] for r in _lines(path)] == list(range(10))
+
+
+def test_background_flush_by_time_and_size(tmp_path):
+    timed = JournalWriter(tmp_path / "timed.jsonl", max_records=1000)
+    sized = JournalWriter(tmp_path / "sized.jsonl", max_records=5)
+    timed.write({"n": 1})
+    for n in range(5):
+        sized.write({"n": n})
+
+    deadline = time.monotonic() + 5 * FLUSH_INTERVAL_S + 1
+    while time.monotonic() < deadline and not (_lines(timed.path) and len(_lines(sized.path)) == 5):
+        time.sleep(0.02)
+    assert _lines(timed.path) == [{"n": 1}]
+    assert len(_lines(sized.path)) == 5
+
+
+def test_flushing_survives_exceptions(tmp_path):
+    journal = JournalWriter(tmp_path / "j.jsonl", max_records=1000)
+    with pytest.raises(RuntimeError), journal.flushing():
+        journal.write({"event": "x"})
+        raise RuntimeError("boom")
+    assert _lines(journal.path) == [{"event": "x"}]
+
+    journal.close()
+    journal.write({"event": "after-close"})
+    assert _lines(journal.path)[-1] == {"event": "after-close"}
+
+
+def test_validation_runs_once_per_runner(mas_flow, tmp_path, monkeypatch):
+    agents, flow, pkg = mas_flow([{"id": "a", "agent": "echo", "input_from": "request"}])
+    calls = []
+    original = plan_mod.check_flow
+    monkeypatch.setattr(plan_mod, "check_flow", lambda *a: calls.append(1) or original(*a))
+
+    runner = WorkflowRunner(str(tmp_path / "ws"), agents, flow, agents_pkg=pkg, plan_cache=False)
+    runner.run("{}")
+    runner.run("{}")
+    runner.plan()
+    assert len(calls) == 1
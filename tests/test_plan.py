@@ -0,0 +1,64 @@
+# tests/test_plan.py — скомпилированный план и его кэш
+import json
+
+from mas.core import plan as plan_mod
+from mas.core.plan import CompiledPlan
+from mas.core.workflow import WorkflowRunner
+
+STEPS = [
+    {"id": "a", "agent": "echo", "input_from": "request"},
+    {"id": "late", "agent": "echo", "input_from": "b"},
+    {"id": "b", "agent": "echo", "input_from": "a"},
+]
+
+
+def _plan_loads(ws) -> list[dict]:
+    lines = (ws / "logs" / "workflow.jsonl").read_text(encoding="utf-8").splitlines()
+    return [r for r in map(json.loads, lines) if r["event"] == "plan_load"]
+
+
+def test_plan_is_compiled(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow(STEPS)
+    plan = WorkflowRunner(str(tmp_path / "ws"), agents, flow, agents_pkg=pkg).plan()
+
+    assert isinstance(plan, CompiledPlan)
+    # «late» ссылается на следующий шаг — ошибка проверки, но ребро в DAG есть
+    assert plan["ok"] is False
+    assert any("late" in e or "step[1]" in e for e in plan["errors"])
+    assert [s["id"] for s in plan["steps"]] == ["a", "late", "b"]
+    assert plan.order == ["a", "b", "late"]
+    assert plan.deps["late"] == ["b"]
+    assert plan.agents["echo"] == f"{pkg}.echo:Echo"
+
+
+def test_plan_cache_is_reused_and_keyed_by_content(mas_flow, tmp_path, monkeypatch):
+    agents, flow, pkg = mas_flow(STEPS[:1])
+    ws = tmp_path / "ws"
+    calls = []
+    original = plan_mod.check_flow
+    monkeypatch.setattr(plan_mod, "check_flow", lambda *a: calls.append(1) or original(*a))
+
+    first = WorkflowRunner(str(ws), agents, flow, agents_pkg=pkg, plan_cache=True)
+    second = WorkflowRunner(str(ws), agents, flow, agents_pkg=pkg, plan_cache=True)
+    assert second.run("{}")["status"] == "ok"
+    assert len(calls) == 1
+    assert second.plan().key == first.plan().key
+    assert sorted(r["cached"] for r in _plan_loads(ws)) == [False, True]
+
+    # Изменение YAML — новый ключ и перекомпиляция
+    mas_flow(STEPS[:1] + [{"id": "b", "agent": "echo", "input_from": "a"}])
+    third = WorkflowRunner(str(ws), agents, flow, agents_pkg=pkg, plan_cache=True)
+    assert third.plan().key != first.plan().key
+    assert third.plan().order == ["a", "b"]
+    assert len(calls) == 2
+
+
+def test_corrupt_cache_entry_is_recompiled(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow(STEPS[:1])
+    cache = tmp_path / "plans"
+    key = WorkflowRunner(str(tmp_path / "ws"), agents, flow, agents_pkg=pkg, plan_cache=str(cache)).plan().key
+    (cache / f"{key}.json").write_text("{broken", encoding="utf-8")
+
+    runner = WorkflowRunner(str(tmp_path / "ws"), agents, flow, agents_pkg=pkg, plan_cache=str(cache))
+    assert runner.plan()["ok"] is True
+    assert json.loads((cache / f"{key}.json").read_text(encoding="utf-8"))["key"] == key
@@ -0,0 +1,87 @@
+# tests/test_process_agents.py — агенты с executor: process (тёплый пул процессов)
+import asyncio
+import os
+import sys
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from mas.core.async_workflow import AsyncWorkflowRunner
+from mas.core.procpool import WarmProcessPool
+from mas.core.workflow import WorkflowRunner
+
+STEPS = [
+    {"id": "local", "agent": "echo", "input_from": "request"},
+    {"id": "remote", "agent": "pid", "input_from": "local"},
+]
+OPTS = {"pid": {"executor": "process"}, "const": {"executor": "process"}}
+
+
+def test_process_agent_runs_in_warm_worker(mas_flow, tmp_path, monkeypatch):
+    # const нигде не используется: в воркере он может оказаться только предзагрузкой
+    for name in [m for m in sys.modules if m.startswith("mas_test_agents.")]:
+        monkeypatch.delitem(sys.modules, name)
+    agents, flow, pkg = mas_flow(STEPS, agent_opts=OPTS)
+    runner = WorkflowRunner(str(tmp_path / "ws"), agents, flow, agents_pkg=pkg, process_workers=1)
+    assert runner.plan().executors == {"pid": "process", "const": "process"}
+
+    result = runner.run('{"x": 1}')["result"]
+
+    assert result["pid"] != os.getpid()
+    assert result["input"] == {"echo": {"x": 1}}
+    assert {f"{pkg}.pid", f"{pkg}.const"} <= set(result["loaded"])
+    assert f"{pkg}.const" not in sys.modules
+
+    # Пул тёплый и общий: следующий запуск попадает в тот же воркер
+    again = WorkflowRunner(str(tmp_path / "ws2"), agents, flow, agents_pkg=pkg, process_workers=1).run('{"x": 2}')
+    assert again["result"]["pid"] == result["pid"]
+
+
+def test_async_runner_dispatches_process_agents(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow(STEPS, agent_opts=OPTS)
+    runner = AsyncWorkflowRunner(str(tmp_path / "ws"), agents, flow, agents_pkg=pkg, process_workers=1)
+
+    result = asyncio.run(runner.arun({"x": 1}))["result"]
+
+    assert result["pid"] != os.getpid()
+
+
+@pytest.mark.parametrize("runner_cls", [WorkflowRunner, AsyncWorkflowRunner])
+def test_process_executor_uses_worker_processes(mas_flow, tmp_path, runner_cls):
+    agents, flow, pkg = mas_flow(STEPS)
+    runner = runner_cls(str(tmp_path / "ws"), agents, flow, agents_pkg=pkg, executor="process", max_workers=1, process_workers=1)
+
+    result = asyncio.run(runner.arun({"x": 1}))["result"] if runner_cls is AsyncWorkflowRunner else runner.run({"x": 1})["result"]
+
+    assert result["pid"] != os.getpid()
+    assert result["input"] == {"echo": {"x": 1}}
+
+
+def test_unknown_agent_executor_is_reported(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow(STEPS, agent_opts={"pid": {"executor": "gpu"}})
+    ok, errors = WorkflowRunner(str(tmp_path / "ws"), agents, flow, agents_pkg=pkg)._validate_flow()
+    assert not ok
+    assert any("unknown executor 'gpu'" in e for e in errors)
+
+
+def test_warm_pool_restarts_after_worker_death():
+    pool = WarmProcessPool(1)
+    try:
+        first = pool.submit(os.getpid).result()
+        with pytest.raises(BrokenProcessPool):
+            pool.submit(os._exit, 1).result()
+        # пул сломан — следующая задача уходит в новый воркер
+        assert pool.submit(os.getpid).result() not in (first, os.getpid())
+    finally:
+        pool.shutdown()
+
+
+def test_process_executor_reuses_warm_workers_across_runs(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow(STEPS)
+    runner = WorkflowRunner(str(tmp_path / "ws"), agents, flow, agents_pkg=pkg, executor="process", max_workers=1, process_workers=1)
+
+    first = runner.run({"x": 1})["result"]["pid"]
+    second = runner.run({"x": 2})["result"]["pid"]
+
+    # воркер не пересоздаётся на каждый run(): тот же процесс, что и в первый раз
+    assert first == second != os.getpid()
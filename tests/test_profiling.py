@@ -0,0 +1,85 @@
+# tests/test_profiling.py — профилирование шагов (WorkflowRunner(profile=...), mas run --profile)
+import asyncio
+import json
+import pstats
+
+import pytest
+
+from mas.core import profiling
+from mas.core.async_workflow import AsyncWorkflowRunner
+from mas.core.workflow import WorkflowRunner
+
+
+def _events(ws, event):
+    lines = (ws / "logs" / "workflow.jsonl").read_text(encoding="utf-8").splitlines()
+    return [r for r in map(json.loads, lines) if r.get("event") == event]
+
+
+def test_profile_writes_stats_and_step_metrics(mas_flow, tmp_path):
+    steps = [{"id": "root", "agent": "echo", "input_from": "request"}, {"id": "remote", "agent": "pid", "input_from": "root"}]
+    agents, flow, pkg = mas_flow(steps, agent_opts={"pid": {"executor": "process"}})
+    ws = tmp_path / "ws"
+    runner = WorkflowRunner(str(ws), agents, flow, agents_pkg=pkg, process_workers=1, profile="both")
+
+    runner.run({"x": 1})
+
+    profiles = ws / "logs" / "profiles" / runner.run_id
+    done = {r["step_id"]: r["profile"] for r in _events(ws, "step_done")}
+    for step_id in ("root", "remote"):  # remote — в процессе пула
+        metrics = done[step_id]
+        assert {"cpu_ms", "rss_kb", "rss_delta_kb", "process_peak_rss_kb", "alloc_kb", "alloc_peak_kb"} <= set(metrics)
+        assert (profiles / metrics["alloc"]).exists()
+        functions = {func for _, _, func in pstats.Stats(str(profiles / metrics["pstats"])).stats}
+        assert "run" in functions
+
+
+def test_async_foreach_profile_is_aggregated(mas_flow, tmp_path):
+    steps = [{"id": "mods", "agent": "asleep", "input_from": "request", "foreach": "delays", "foreach_as": "delay"}]
+    agents, flow, pkg = mas_flow(steps)
+    ws = tmp_path / "ws"
+    runner = AsyncWorkflowRunner(str(ws), agents, flow, agents_pkg=pkg, profile="cpu")
+
+    asyncio.run(runner.arun({"delays": [0.01, 0.02, 0.03]}))
+
+    items = _events(ws, "step_item_done")
+    assert sorted(p.name for p in (ws / "logs" / "profiles" / runner.run_id).iterdir()) == ["mods-0.pstats", "mods-1.pstats", "mods-2.pstats"]
+    (done,) = _events(ws, "step_done")
+    assert done["profile"]["cpu_ms"] == pytest.approx(sum(r["profile"]["cpu_ms"] for r in items), abs=0.01)
+    assert "pstats" not in done["profile"] and "alloc_kb" not in done["profile"]
+
+
+def test_unknown_profile_mode_rejected(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow([{"id": "a", "agent": "echo"}])
+    with pytest.raises(ValueError, match="profile"):
+        WorkflowRunner(str(tmp_path / "ws"), agents, flow, agents_pkg=pkg, profile="gpu")
+
+
+def test_rss_delta_belongs_to_the_step(tmp_path):
+    if profiling._rss_kb() is None:
+        pytest.skip("no way to read current RSS here")
+    profiler = profiling.StepProfiler("cpu", str(tmp_path))
+    kept = []
+
+    # первый шаг поднимает пик RSS процесса и освобождает память
+    profiler.call("big", None, None, lambda: len(b"x" * (64 << 20)))
+    small = profiler.call("small", None, None, lambda: kept.append(b"x" * (32 << 20))).metrics
+
+    # ru_maxrss этого не увидел бы: пик процесса выше, чем RSS после второго шага
+    assert small["rss_delta_kb"] >= 24 << 10
+    assert small["process_peak_rss_kb"] >= small["rss_kb"]
+    kept.clear()
+
+
+@pytest.mark.parametrize("runner_cls", [WorkflowRunner, AsyncWorkflowRunner])
+def test_profiler_queue_does_not_count_against_timeout(mas_flow, tmp_path, runner_cls):
+    # шаги параллельны, но профилируются по одному: второй ждёт первого ~0.3 с
+    steps = [{"id": s, "agent": "sleepy", "input_from": "request", "timeout_s": 0.5} for s in ("a", "b")]
+    agents, flow, pkg = mas_flow(steps)
+    runner = runner_cls(str(tmp_path / "ws"), agents, flow, agents_pkg=pkg, max_workers=2, profile="cpu")
+
+    request = {"delay": 0.3}
+    asyncio.run(runner.arun(request)) if runner_cls is AsyncWorkflowRunner else runner.run(request)
+
+    done = _events(tmp_path / "ws", "step_done")
+    assert sorted(r["step_id"] for r in done) == ["a", "b"]
+    assert not _events(tmp_path / "ws", "step_timeout")
@@ -0,0 +1,100 @@
+# tests/test_step_cache.py — кэш результатов шагов (StepCache)
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+import yaml
+
+from mas.core.step_cache import StepCache
+from mas.core.workflow import WorkflowRunner
+
+STEPS = [
+    {"id": "a", "agent": "echo", "input_from": "request"},
+    {"id": "b", "agent": "const", "input_from": "request"},
+    {"id": "c", "agent": "echo", "input_from": "b"},
+]
+
+
+def _events(ws: Path, run_no: int) -> dict[str, str]:
+    """step_id -> событие (step_done/step_cached) для run_no-го запуска."""
+    records = [json.loads(x) for x in (ws / "logs" / "workflow.jsonl").read_text(encoding="utf-8").splitlines()]
+    runs: list[dict[str, str]] = [{}]
+    for r in records:
+        if r["event"] in ("step_done", "step_cached"):
+            runs[-1][r["step_id"]] = r["event"]
+        elif r["event"] == "run_done":
+            runs.append({})
+    return runs[run_no]
+
+
+def test_rerun_only_executes_affected_subgraph(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow(STEPS)
+    ws = tmp_path / "ws"
+
+    def run(req: dict) -> dict:
+        return WorkflowRunner(str(ws), agents, flow, agents_pkg=pkg, step_cache=True).run(json.dumps(req))
+
+    first = run({"title": "A"})
+    second = run({"title": "A"})
+    third = run({"title": "B"})
+
+    assert _events(ws, 0) == {"a": "step_done", "b": "step_done", "c": "step_done"}
+    assert _events(ws, 1) == {"a": "step_cached", "b": "step_cached", "c": "step_cached"}
+    # b перевыполнен (вход изменился), но его выход тот же — c взят из кэша
+    assert _events(ws, 2) == {"a": "step_done", "b": "step_done", "c": "step_cached"}
+    assert first == second == third
+    assert json.loads((ws / "flow_state.json").read_text(encoding="utf-8"))["a"] == {"echo": {"title": "B"}}
+
+
+def _artifacts(payload: dict) -> list[Path]:
+    if "summary_path" in payload:
+        return [Path(payload["summary_path"])]
+    return [Path(payload["app_dir"]) / f for f in payload["files"]]
+
+
+@pytest.mark.parametrize(("agent", "agent_type"), [("integrator", "Integrator"), ("backend", "BackendDev")])
+def test_file_writing_agents_rerun_in_new_workspace(tmp_path, agent, agent_type):
+    if agent == "backend":
+        pytest.importorskip("jinja2")  # SimpleCodeGen
+    agents = tmp_path / "agents.yaml"
+    agents.write_text(yaml.safe_dump({"agents": {agent: {"type": agent_type}}}), encoding="utf-8")
+    flow = tmp_path / "flow.yaml"
+    flow.write_text(yaml.safe_dump({"workflow": {"name": "f", "steps": [{"id": "s", "agent": agent, "input_from": "request"}]}}), encoding="utf-8")
+    cache = StepCache(str(tmp_path / "cache"))
+
+    for name in ("ws1", "ws2"):
+        ws = tmp_path / name
+        runner = WorkflowRunner(str(ws), str(agents), str(flow), step_cache=cache)
+        runner.run({"title": "App"})
+        runner.close()
+        # общий кэш, новый workspace: шаг выполняется заново, пути в выходе существуют
+        state = json.loads((ws / "flow_state.json").read_text(encoding="utf-8"))
+        assert _events(ws, 0) == {"s": "step_done"}
+        assert all(path.exists() for path in _artifacts(state["s"]))
+
+
+def test_key_depends_on_agent_version():
+    class Agent:
+        version = "1"
+
+    k1 = StepCache.key(Agent, "s", {"x": 1, "y": 2})
+    assert k1 == StepCache.key(Agent, "s", {"y": 2, "x": 1})
+    Agent.version = "2"
+    assert k1 != StepCache.key(Agent, "s", {"x": 1, "y": 2})
+
+
+def test_evict_by_count_and_age(tmp_path):
+    cache = StepCache(str(tmp_path / "c"), max_entries=2, max_bytes=None, max_age_s=3600)
+    for i in range(4):
+        cache.put(f"{i:064x}", {"i": i})
+        past = time.time() - 10 + i
+        os.utime(cache._path(f"{i:064x}"), (past, past))
+
+    assert cache.evict() == 2
+    assert cache.get(f"{0:064x}") is None
+    assert cache.get(f"{3:064x}") == {"i": 3}
+
+    cache.max_age_s = 1
+    assert cache.get(f"{2:064x}") is None  # просрочена
@@ -0,0 +1,173 @@
+# tests/test_tools.py — Toolset: политики, async-инструменты и gather()
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from mas.core.tools import LatencyHistogram, ToolCall, ToolPolicy, Toolset
+
+
+class Counter:
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, **kwargs):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        if kwargs.get("fail"):
+            raise RuntimeError("boom")
+        return {"echo": kwargs}
+
+
+def test_memoize_lru_and_ttl():
+    tool = Counter()
+    tools = Toolset()
+    tools.register("scan", tool, ToolPolicy(memoize=True, cache_size=2, ttl_s=0.2))
+
+    assert tools.call("scan", path="a", depth=1) == {"echo": {"path": "a", "depth": 1}}
+    tools.call("scan", depth=1, path="a")  # тот же ключ при другом порядке kwargs
+    assert tool.calls == 1
+    tools.call("scan", path="b")
+    tools.call("scan", path="c")  # вытесняет "a"
+    tools.call("scan", path="a", depth=1)
+    assert tool.calls == 4
+    time.sleep(0.25)
+    tools.call("scan", path="a", depth=1)
+    assert tool.calls == 5
+
+    stats = tools.stats()["scan"]
+    assert (stats["calls"], stats["hits"], stats["misses"]) == (6, 1, 5)
+    assert stats["latency"]["count"] == 5
+
+
+def test_concurrent_identical_calls_run_once_and_errors_are_not_cached():
+    tool = Counter(delay=0.2)
+    tools = Toolset()
+    tools.register("gen", tool, ToolPolicy(memoize=True))
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: tools.call("gen", spec="x"), range(8)))
+    assert tool.calls == 1
+    assert all(r is results[0] for r in results)
+    assert tools.stats()["gen"]["deduped"] + tools.stats()["gen"]["hits"] == 7
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            tools.call("gen", fail=True)
+    assert tool.calls == 3
+    assert tools.stats()["gen"]["errors"] == 2
+
+
+def test_concurrency_and_rate_limits():
+    tool = Counter(delay=0.05)
+    tools = Toolset()
+    tools.register("tests", tool, ToolPolicy(max_concurrency=2))
+    with ThreadPoolExecutor(6) as pool:
+        list(pool.map(lambda n: tools.call("tests", n=n), range(6)))
+    assert tool.peak == 2
+
+    limited = Counter()
+    tools.register("lint", limited, ToolPolicy(rate=50, burst=2))
+    t0 = time.perf_counter()
+    for n in range(6):
+        tools.get("lint")(n=n)
+    # 2 вызова из запаса, остальные 4 — по 20 мс
+    assert time.perf_counter() - t0 >= 0.07
+    assert tools.stats()["lint"]["throttled_s"] > 0
+
+
+def test_plain_tools_keep_working():
+    tools = Toolset(add=lambda a, b: a + b)
+    tools.register("mul", lambda a, b: a * b)
+    assert tools.get("add")(a=1, b=2) == 3
+    assert tools.call("mul", a=2, b=3) == 6
+    assert tools.stats() == {}
+
+
+def test_latency_histogram_percentiles():
+    hist = LatencyHistogram()
+    for ms in [0.5] * 90 + [150] * 9 + [7000]:
+        hist.observe(ms)
+    snap = hist.snapshot()
+    assert snap["p50_ms"] == 1
+    assert snap["p95_ms"] == 200
+    assert snap["p99_ms"] == 200
+    assert snap["max_ms"] == 7000
+    assert snap["buckets"]["le_10000"] == 1
+
+
+class AsyncSleeper:
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+
+    async def __call__(self, delay, value=None, fail=False):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self.active -= 1
+        if fail:
+            raise ValueError(f"failed {value}")
+        return value
+
+
+def test_gather_runs_concurrently_in_order():
+    sleeper = AsyncSleeper()
+    tools = Toolset(sleep=sleeper, lint=lambda delay, value: (time.sleep(delay), value)[1])
+    calls = [ToolCall("sleep", {"delay": 0.2, "value": "tests"}), ("lint", {"delay": 0.2, "value": "lint"}), ToolCall("sleep", {"delay": 0.05, "value": "docs"})]
+
+    t0 = time.perf_counter()
+    assert tools.gather(calls) == ["tests", "lint", "docs"]
+    assert time.perf_counter() - t0 < 0.35
+
+    tools.gather([("sleep", {"delay": 0.05, "value": n}) for n in range(6)], concurrency=2)
+    assert sleeper.peak == 2
+    assert tools.call("sleep", delay=0, value=1) == 1
+    assert tools.gather([]) == []
+
+
+def test_gather_timeout_and_errors():
+    tools = Toolset(sleep=AsyncSleeper())
+    slow = [("sleep", {"delay": 0.01, "value": "fast"}), ("sleep", {"delay": 5, "value": "slow"})]
+
+    t0 = time.perf_counter()
+    with pytest.raises(TimeoutError, match="1 of 2"):
+        tools.gather(slow, timeout=0.1)
+    assert time.perf_counter() - t0 < 1
+
+    results = tools.gather(slow, timeout=0.1, return_exceptions=True)
+    assert results[0] == "fast"
+    assert isinstance(results[1], TimeoutError)
+
+    failing = [("sleep", {"delay": 5}), ("sleep", {"delay": 0.01, "value": 1, "fail": True})]
+    with pytest.raises(ValueError, match="failed 1"):
+        tools.gather(failing, timeout=2)
+
+
+def test_async_tool_with_policy():
+    sleeper = AsyncSleeper()
+    tools = Toolset()
+    tools.register("sleep", sleeper, ToolPolicy(memoize=True, max_concurrency=1))
+
+    async def main():
+        return await tools.agather([("sleep", {"delay": 0.05, "value": n % 2}) for n in range(4)])
+
+    assert asyncio.run(main()) == [0, 1, 0, 1]
+    stats = tools.stats()["sleep"]
+    assert stats["misses"] == 2
+    assert stats["deduped"] + stats["hits"] == 2
+    assert sleeper.peak == 1
+    # синхронный вызов async-инструмента — из кэша
+    assert tools.call("sleep", delay=0.05, value=1) == 1
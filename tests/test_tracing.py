@@ -0,0 +1,78 @@
+# tests/test_tracing.py — span запуска, шагов, инструментов и записи файлов; экспорт OTLP / Chrome
+import asyncio
+import json
+import os
+
+from mas.core.async_workflow import AsyncWorkflowRunner
+from mas.core.tools import Toolset
+from mas.core.tracing import Tracer, span, to_chrome, to_otlp
+from mas.core.workflow import WorkflowRunner
+from mas.tools.repo import RepoOps
+
+STEPS = [
+    {"id": "a", "agent": "writer", "input_from": "request"},
+    {"id": "b", "agent": "writer", "input_from": "request"},
+    {"id": "remote", "agent": "pid", "input_from": "a"},
+]
+
+
+def _by_name(spans):
+    out = {}
+    for s in spans:
+        out.setdefault(s["name"], []).append(s)
+    return out
+
+
+def test_spans_nest_through_context(tmp_path):
+    assert span("outside") is span("outside too")  # вне трассы — общий no-op
+    tracer = Tracer()
+    with tracer.span("run") as run:
+        Toolset(echo=lambda x: x).call("echo", x=1)
+        RepoOps(str(tmp_path)).write_file("f.txt", "data")
+
+    spans = {s.name: s for s in tracer.spans()}
+    assert spans["tool.call"].parent_id == run.span_id and spans["tool.call"].attributes == {"tool": "echo"}
+    assert spans["file.write"].parent_id == run.span_id and spans["file.write"].attributes["path"] == "f.txt"
+    assert run.start_ns <= spans["tool.call"].start_ns <= spans["tool.call"].end_ns <= run.end_ns
+
+    otlp = to_otlp(tracer.spans())["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert {s["traceId"] for s in otlp} == {tracer.trace_id}
+    assert [s["parentSpanId"] for s in otlp if s["name"] == "run"] == [""]
+    events = to_chrome(tracer.spans())["traceEvents"]
+    assert all(e["ph"] == "X" and e["dur"] >= 0 for e in events)
+
+
+def test_runner_exports_nested_trace(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow(STEPS, agent_opts={"pid": {"executor": "process"}})
+    ws = tmp_path / "ws"
+    runner = WorkflowRunner(str(ws), agents, flow, agents_pkg=pkg, max_workers=2, process_workers=1, trace=True)
+
+    runner.run({"x": 1})
+
+    otlp = json.loads((ws / "logs" / "traces" / f"{runner.run_id}.otlp.json").read_text(encoding="utf-8"))
+    spans = _by_name(otlp["resourceSpans"][0]["scopeSpans"][0]["spans"])
+    (run,) = spans["run"]
+    steps = {next(a["value"]["stringValue"] for a in s["attributes"] if a["key"] == "step_id"): s for s in spans["step"]}
+    assert set(steps) == {"a", "b", "remote"}
+    assert all(s["parentSpanId"] == run["spanId"] for s in steps.values())
+    # tool.call и file.write — внутри своих шагов
+    assert sorted(s["parentSpanId"] for s in spans["tool.call"]) == sorted([steps["a"]["spanId"], steps["b"]["spanId"]])
+    assert sorted(s["parentSpanId"] for s in spans["file.write"]) == sorted([steps["a"]["spanId"], steps["b"]["spanId"]])
+    # шаг в процессе пула: span записан воркером и вернулся с результатом
+    remote_pid = next(a["value"]["intValue"] for a in steps["remote"]["attributes"] if a["key"] == "process.pid")
+    assert int(remote_pid) != os.getpid()
+
+    chrome = json.loads((ws / "logs" / "traces" / f"{runner.run_id}.trace.json").read_text(encoding="utf-8"))
+    assert len(chrome["traceEvents"]) == sum(len(v) for v in spans.values())
+
+
+def test_async_runner_traces_native_steps(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow(STEPS[:2])
+    ws = tmp_path / "ws"
+    runner = AsyncWorkflowRunner(str(ws), agents, flow, agents_pkg=pkg, trace=True)
+
+    asyncio.run(runner.arun({"x": 1}))
+
+    events = json.loads((ws / "logs" / "traces" / f"{runner.run_id}.trace.json").read_text(encoding="utf-8"))["traceEvents"]
+    names = sorted(e["name"] for e in events)
+    assert names == ["file.write", "file.write", "run", "step", "step", "tool.call", "tool.call"]
@@ -0,0 +1,66 @@
+# tests/test_workflow_batch.py — пакетный режим WorkflowRunner.run_many / mas run --requests
+import json
+
+from click.testing import CliRunner
+
+from mas.cli import main
+from mas.core.workflow import WorkflowRunner
+
+STEPS = [
+    {"id": "a", "agent": "echo", "input_from": "request"},
+    {"id": "b", "agent": "echo", "input_from": "a"},
+]
+
+
+def _write_requests(path, lines):
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_run_many_isolates_workspaces_and_streams_results(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow(STEPS)
+    ws = tmp_path / "ws"
+    reqs = _write_requests(
+        tmp_path / "requests.jsonl",
+        [json.dumps({"request_id": "r-1", "n": 1}), json.dumps({"request_id": "r/2", "n": 2}), "{broken", json.dumps({"n": 4})],
+    )
+    runner = WorkflowRunner(str(ws), agents, flow, agents_pkg=pkg)
+
+    summary = runner.run_many(reqs, max_workers=2)
+
+    assert (summary["total"], summary["ok"], summary["error"]) == (4, 3, 1)
+    results = {r["request_id"]: r for r in map(json.loads, (ws / "results.jsonl").read_text(encoding="utf-8").splitlines())}
+    assert set(results) == {"r-1", "r_2", "000003", "000004"}
+    assert results["000003"]["status"] == "error"
+    assert results["r_2"]["result"] == {"echo": {"echo": {"request_id": "r/2", "n": 2}}}
+    state = json.loads((ws / "runs" / "r-1" / "flow_state.json").read_text(encoding="utf-8"))
+    assert state["a"] == {"echo": {"request_id": "r-1", "n": 1}}
+    assert (ws / "runs" / "000004" / "logs" / "workflow.jsonl").exists()
+
+
+def test_run_many_step_cache_is_per_workspace(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow([{"id": "w", "agent": "writer", "input_from": "request"}])
+    ws = tmp_path / "ws"
+    runner = WorkflowRunner(str(ws), agents, flow, agents_pkg=pkg, step_cache=True)
+
+    summary = runner.run_many([{"x": 1}, {"x": 1}], max_workers=1)
+
+    assert summary["ok"] == 2
+    # одинаковые заявки: вторая не берёт выход из кэша первой и пишет свои артефакты
+    for request_id in ("000001", "000002"):
+        assert (ws / "runs" / request_id / "out" / "hello.txt").read_text(encoding="utf-8") == "HELLO"
+        assert (ws / "runs" / request_id / ".cache" / "steps").is_dir()
+
+
+def test_cli_batch_mode(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow(STEPS)
+    reqs = _write_requests(tmp_path / "requests.jsonl", [json.dumps({"id": "x"})])
+    out = tmp_path / "out.jsonl"
+
+    args = ["run", "--workflow", flow, "--agents", agents, "--agents-pkg", pkg, "--workspace", str(tmp_path / "ws")]
+    res = CliRunner().invoke(main, [*args, "--requests", reqs, "--results", str(out)])
+
+    assert res.exit_code == 0, res.output
+    assert json.loads(out.read_text(encoding="utf-8"))["status"] == "ok"
+    bad = CliRunner().invoke(main, ["run", "--workflow", flow, "--agents", agents])
+    assert bad.exit_code != 0
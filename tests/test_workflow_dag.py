@@ -0,0 +1,109 @@
+# tests/test_workflow_dag.py — DAG-планировщик WorkflowRunner
+import asyncio
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+from mas.core.async_workflow import AsyncWorkflowRunner
+from mas.core.workflow import WorkflowRunner
+
+FAN_OUT = [
+    {"id": "root", "agent": "echo", "input_from": "request"},
+    {"id": "a", "agent": "sleepy", "input_from": "request"},
+    {"id": "b", "agent": "sleepy", "input_from": "request"},
+    {"id": "c", "agent": "sleepy", "input_from": "request"},
+    {"id": "tail", "agent": "echo", "input_from": "c"},
+]
+
+
+def _journal(ws: Path) -> list[dict]:
+    lines = (ws / "logs" / "workflow.jsonl").read_text(encoding="utf-8").splitlines()
+    return [json.loads(x) for x in lines]
+
+
+def test_independent_steps_run_concurrently(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow(FAN_OUT)
+    ws = tmp_path / "ws"
+    runner = WorkflowRunner(str(ws), agents, flow, agents_pkg=pkg, max_workers=4)
+
+    t0 = time.perf_counter()
+    summary = runner.run(json.dumps({"delay": 0.3}))
+    elapsed = time.perf_counter() - t0
+
+    assert summary["status"] == "ok"
+    # Результат — выход последнего шага в порядке YAML
+    assert summary["result"]["echo"]["delay"] == 0.3
+    # Три шага по 0.3 с параллельно — заметно быстрее последовательных 0.9 с
+    assert elapsed < 0.75
+
+    state = json.loads((ws / "flow_state.json").read_text(encoding="utf-8"))
+    assert set(state) == {"root", "a", "b", "c", "tail"}
+    done = [r["step_id"] for r in _journal(ws) if r["event"] == "step_done"]
+    assert sorted(done) == sorted(state)
+    assert done[-1] == "tail"
+
+
+def test_single_worker_keeps_yaml_order(mas_flow, tmp_path):
+    steps = [
+        {"id": "a", "agent": "echo", "input_from": "request"},
+        {"id": "b", "agent": "echo", "input_from": "a"},
+        {"id": "c", "agent": "echo", "input_from": "request"},
+        {"id": "d", "agent": "echo", "input_from": "b"},
+    ]
+    agents, flow, pkg = mas_flow(steps)
+    ws = tmp_path / "ws"
+    WorkflowRunner(str(ws), agents, flow, agents_pkg=pkg, max_workers=1).run('{"x": 1}')
+
+    done = [r["step_id"] for r in _journal(ws) if r["event"] == "step_done"]
+    assert done == ["a", "b", "c", "d"]
+
+
+def test_skip_and_error_are_journaled(mas_flow, tmp_path):
+    steps = [
+        {"id": "a", "agent": "echo", "input_from": "request"},
+        {"id": "opt", "agent": "echo", "input_from": "a"},
+        {"id": "bad", "agent": "boom", "input_from": "opt"},
+        {"id": "never", "agent": "echo", "input_from": "bad"},
+    ]
+    agents, flow, pkg = mas_flow(steps)
+    ws = tmp_path / "ws"
+    runner = WorkflowRunner(str(ws), agents, flow, agents_pkg=pkg)
+
+    with pytest.raises(RuntimeError, match="boom"):
+        runner.run("{}", skip_optional=["opt"])
+
+    events = [(r["event"], r.get("step_id")) for r in _journal(ws)]
+    assert ("skip_step", "opt") in events
+    assert ("step_error", "bad") in events
+    assert ("step_done", "never") not in events
+
+
+def test_unknown_executor_rejected(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow(FAN_OUT)
+    with pytest.raises(ValueError):
+        WorkflowRunner(str(tmp_path / "ws"), agents, flow, agents_pkg=pkg, executor="gpu")
+
+
+@pytest.mark.parametrize("runner_cls", [WorkflowRunner, AsyncWorkflowRunner])
+def test_input_from_cycle_fails_the_run(mas_flow, tmp_path, runner_cls):
+    steps = [
+        {"id": "root", "agent": "echo", "input_from": "request"},
+        {"id": "a", "agent": "echo", "input_from": "b"},
+        {"id": "b", "agent": "echo", "input_from": "a"},
+    ]
+    agents, flow, pkg = mas_flow(steps)
+    ws = tmp_path / "ws"
+    runner = runner_cls(str(ws), agents, flow, agents_pkg=pkg)
+
+    with pytest.raises(ValueError, match="a, b"):
+        if runner_cls is AsyncWorkflowRunner:
+            asyncio.run(runner.arun({"x": 1}))
+        else:
+            runner.run({"x": 1})
+
+    journal = _journal(ws)
+    assert [r["steps"] for r in journal if r["event"] == "run_error"] == [["a", "b"]]
+    assert not any(r["event"] == "run_done" for r in journal)
+    assert {r["step_id"] for r in journal if r["event"] == "step_done"} == {"root"}
@@ -0,0 +1,94 @@
+# tests/test_workflow_fanout.py — fan-in (список input_from) и fan-out (foreach)
+import asyncio
+import json
+import time
+
+import pytest
+
+from mas.core.async_workflow import AsyncWorkflowRunner
+from mas.core.workflow import WorkflowRunner
+
+
+def _events(ws) -> list[tuple[str, str | None]]:
+    lines = (ws / "logs" / "workflow.jsonl").read_text(encoding="utf-8").splitlines()
+    return [(r["event"], r.get("step_id")) for r in map(json.loads, lines)]
+
+
+def test_list_input_merges_upstream_payloads(mas_flow, tmp_path):
+    steps = [
+        {"id": "plan", "agent": "const", "input_from": "request"},
+        {"id": "design", "agent": "echo", "input_from": "request"},
+        {"id": "integrate", "agent": "echo", "input_from": ["plan", "design", "request"]},
+    ]
+    agents, flow, pkg = mas_flow(steps)
+    runner = WorkflowRunner(str(tmp_path / "ws"), agents, flow, agents_pkg=pkg)
+    assert runner.plan()["ok"] is True
+    assert runner.plan().deps["integrate"] == ["plan", "design"]
+
+    summary = runner.run('{"x": 1}')
+
+    assert summary["result"]["echo"] == {"plan": {"const": 1}, "design": {"echo": {"x": 1}}, "request": {"x": 1}}
+
+
+def test_foreach_runs_items_in_parallel_and_merges(mas_flow, tmp_path):
+    steps = [{"id": "mods", "agent": "sleepy", "input_from": "request", "foreach": "delays", "foreach_as": "delay"}]
+    agents, flow, pkg = mas_flow(steps)
+    ws = tmp_path / "ws"
+    runner = WorkflowRunner(str(ws), agents, flow, agents_pkg=pkg, max_workers=4)
+
+    t0 = time.perf_counter()
+    summary = runner.run('{"delays": [0.3, 0.3, 0.3]}')
+    assert time.perf_counter() - t0 < 0.75
+
+    result = summary["result"]
+    assert result["count"] == 3
+    assert [item["delay"] for item in result["items"]] == [0.3, 0.3, 0.3]
+    assert _events(ws).count(("step_item_done", "mods")) == 3
+    assert _events(ws).count(("step_done", "mods")) == 1
+
+
+def test_foreach_over_upstream_field(mas_flow, tmp_path):
+    steps = [
+        {"id": "design", "agent": "echo", "input_from": "request"},
+        {"id": "module", "agent": "echo", "input_from": "design", "foreach": "echo.modules", "foreach_as": "module"},
+        {"id": "empty", "agent": "echo", "input_from": "request", "foreach": "none"},
+    ]
+    agents, flow, pkg = mas_flow(steps)
+    runner = WorkflowRunner(str(tmp_path / "ws"), agents, flow, agents_pkg=pkg, max_workers=2)
+    runner.run('{"modules": ["api", "web"], "none": []}')
+
+    items = runner.memory.get("module")["items"]
+    assert [(i["echo"]["module"], i["echo"]["item_index"]) for i in items] == [("api", 0), ("web", 1)]
+    assert runner.memory.get("empty") == {"items": [], "count": 0}
+
+
+def test_foreach_on_non_list_fails(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow([{"id": "m", "agent": "echo", "input_from": "request", "foreach": "modules"}])
+    ws = tmp_path / "ws"
+    with pytest.raises(ValueError, match="not a list"):
+        WorkflowRunner(str(ws), agents, flow, agents_pkg=pkg).run('{"modules": "api"}')
+    assert ("step_error", "m") in _events(ws)
+
+
+def test_async_foreach(mas_flow, tmp_path):
+    steps = [{"id": "mods", "agent": "asleep", "input_from": "request", "foreach": "delays", "foreach_as": "delay"}]
+    agents, flow, pkg = mas_flow(steps)
+    runner = AsyncWorkflowRunner(str(tmp_path / "ws"), agents, flow, agents_pkg=pkg, concurrency=4)
+
+    summary = asyncio.run(runner.arun({"delays": [0.1, 0.2]}))
+
+    assert [item["delay"] for item in summary["result"]["items"]] == [0.1, 0.2]
+
+
+def test_invalid_fan_in_is_reported(mas_flow, tmp_path):
+    steps = [
+        {"id": "a", "agent": "echo", "input_from": "request"},
+        {"id": "b", "agent": "echo", "input_from": ["a", "later"]},
+        {"id": "c", "agent": "echo", "input_from": [], "foreach": ""},
+    ]
+    agents, flow, pkg = mas_flow(steps)
+    ok, errors = WorkflowRunner(str(tmp_path / "ws"), agents, flow, agents_pkg=pkg)._validate_flow()
+    assert not ok
+    assert any("'later'" in e for e in errors)
+    assert any("non-empty list" in e for e in errors)
+    assert any("'foreach'" in e for e in errors)
@@ -0,0 +1,97 @@
+# tests/test_workflow_limits.py — таймауты, повторы и отмена запусков
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from mas.core.async_workflow import AsyncWorkflowRunner
+from mas.core.cancel import RunCancelledError, StepTimeoutError
+from mas.core.workflow import WorkflowRunner
+
+
+def _events(ws) -> list[tuple[str, str | None]]:
+    lines = (ws / "logs" / "workflow.jsonl").read_text(encoding="utf-8").splitlines()
+    return [(r["event"], r.get("step_id")) for r in map(json.loads, lines)]
+
+
+def test_failed_attempts_are_retried_with_backoff(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow([{"id": "f", "agent": "flaky", "input_from": "request", "retries": 2, "backoff": 0.01}])
+    ws = tmp_path / "ws"
+    summary = WorkflowRunner(str(ws), agents, flow, agents_pkg=pkg).run('{"fail_times": 2}')
+
+    assert summary["result"] == {"attempts": 3}
+    assert _events(ws).count(("step_retry", "f")) == 2
+    assert ("step_error", "f") not in _events(ws)
+
+
+def test_hung_step_times_out_after_retries(mas_flow, tmp_path):
+    steps = [
+        {"id": "h", "agent": "hang", "input_from": "request", "timeout_s": 0.2, "retries": 1},
+        {"id": "after", "agent": "echo", "input_from": "h"},
+    ]
+    agents, flow, pkg = mas_flow(steps)
+    ws = tmp_path / "ws"
+    runner = WorkflowRunner(str(ws), agents, flow, agents_pkg=pkg, max_workers=1)
+
+    t0 = time.perf_counter()
+    with pytest.raises(StepTimeoutError):
+        runner.run('{"hang_s": 30}')
+    assert time.perf_counter() - t0 < 2
+
+    events = _events(ws)
+    assert events.count(("step_timeout", "h")) == 2
+    assert events.count(("step_retry", "h")) == 1
+    assert ("step_error", "h") in events
+    assert ("step_done", "after") not in events
+
+
+def test_cancel_from_another_thread(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow([{"id": "h", "agent": "hang", "input_from": "request"}])
+    ws = tmp_path / "ws"
+    runner = WorkflowRunner(str(ws), agents, flow, agents_pkg=pkg)
+
+    def cancel_when_running():
+        # cancel() до начала run() не действует: run() заводит новый токен
+        while runner.run_id is None:
+            time.sleep(0.01)
+        time.sleep(0.2)
+        runner.cancel("stop requested")
+
+    threading.Thread(target=cancel_when_running, daemon=True).start()
+
+    t0 = time.perf_counter()
+    with pytest.raises(RunCancelledError, match="stop requested"):
+        runner.run('{"hang_s": 30}')
+    assert time.perf_counter() - t0 < 2
+    assert ("run_cancelled", None) in _events(ws)
+
+
+def test_invalid_limits_are_reported(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow([{"id": "a", "agent": "echo", "timeout_s": -1, "retries": "3"}])
+    ok, errors = WorkflowRunner(str(tmp_path / "ws"), agents, flow, agents_pkg=pkg)._validate_flow()
+    assert not ok
+    assert len(errors) == 2
+
+
+def test_async_runner_times_out_and_retries(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow([{"id": "h", "agent": "hang", "input_from": "request", "timeout_s": 0.1, "retries": 1}])
+    ws = tmp_path / "ws"
+    runner = AsyncWorkflowRunner(str(ws), agents, flow, agents_pkg=pkg)
+    with pytest.raises(StepTimeoutError):
+        asyncio.run(runner.arun('{"hang_s": 30}'))
+    assert _events(ws).count(("step_timeout", "h")) == 2
+
+
+@pytest.mark.parametrize("runner_cls", [WorkflowRunner, AsyncWorkflowRunner])
+def test_agent_cancellation_is_not_retried(mas_flow, tmp_path, runner_cls):
+    agents, flow, pkg = mas_flow([{"id": "q", "agent": "quit", "input_from": "request", "retries": 3}])
+    ws = tmp_path / "ws"
+    runner = runner_cls(str(ws), agents, flow, agents_pkg=pkg)
+    with pytest.raises(RunCancelledError, match="agent gave up"):
+        if runner_cls is AsyncWorkflowRunner:
+            asyncio.run(runner.arun("{}"))
+        else:
+            runner.run("{}")
+    assert ("step_retry", "q") not in _events(ws)
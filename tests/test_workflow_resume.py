@@ -0,0 +1,102 @@
+# tests/test_workflow_resume.py — продолжение прерванного запуска (resume)
+import asyncio
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from mas.cli import main
+from mas.core.async_workflow import AsyncWorkflowRunner
+from mas.core.workflow import WorkflowRunner
+
+STEPS = [
+    {"id": "a", "agent": "echo", "input_from": "request"},
+    {"id": "f", "agent": "flaky", "input_from": "request"},
+    {"id": "tail", "agent": "echo", "input_from": "f"},
+]
+
+
+def _journal(ws) -> list[dict]:
+    lines = (ws / "logs" / "workflow.jsonl").read_text(encoding="utf-8").splitlines()
+    return [json.loads(x) for x in lines]
+
+
+def _done(ws) -> list[str]:
+    return [r["step_id"] for r in _journal(ws) if r["event"] == "step_done"]
+
+
+def _failed_run(mas_flow, tmp_path, **kw) -> tuple[WorkflowRunner, str]:
+    agents, flow, pkg = mas_flow(STEPS)
+    runner = WorkflowRunner(str(tmp_path / "ws"), agents, flow, agents_pkg=pkg, max_workers=1, **kw)
+    with pytest.raises(RuntimeError, match="flaky"):
+        runner.run('{"fail_times": 1}')
+    return runner, runner.run_id
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite", "journal"])
+def test_resume_skips_completed_steps(mas_flow, tmp_path, backend):
+    runner, run_id = _failed_run(mas_flow, tmp_path, memory_backend=backend)
+
+    # Заявка берётся из журнала; шаг «a» не выполняется повторно
+    summary = runner.resume(run_id)
+
+    ws = tmp_path / "ws"
+    assert summary["result"]["echo"] == {"attempts": 2}
+    assert _done(ws) == ["a", "f", "tail"]
+    resumed = next(r for r in _journal(ws) if r["event"] == "run_resume")
+    assert resumed["run_id"] == run_id
+    assert resumed["completed"] == ["a"]
+
+
+def test_changed_request_invalidates_steps(mas_flow, tmp_path):
+    runner, run_id = _failed_run(mas_flow, tmp_path)
+
+    runner.resume(run_id, {"fail_times": 0, "extra": 1})
+
+    assert _done(tmp_path / "ws") == ["a", "a", "f", "tail"]
+
+
+def test_tampered_output_is_recomputed(mas_flow, tmp_path):
+    runner, run_id = _failed_run(mas_flow, tmp_path)
+    runner.memory.set("a", {"echo": "tampered"})
+
+    runner.resume(run_id)
+
+    assert _done(tmp_path / "ws") == ["a", "a", "f", "tail"]
+
+
+def test_async_resume(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow(STEPS)
+    runner = AsyncWorkflowRunner(str(tmp_path / "ws"), agents, flow, agents_pkg=pkg, max_workers=1)
+    with pytest.raises(RuntimeError, match="flaky"):
+        asyncio.run(runner.arun({"fail_times": 1}))
+
+    summary = asyncio.run(runner.aresume(runner.run_id))
+
+    assert summary["result"]["echo"] == {"attempts": 2}
+    assert _done(tmp_path / "ws") == ["a", "f", "tail"]
+
+
+def test_unknown_run_id_rejected(mas_flow, tmp_path):
+    agents, flow, pkg = mas_flow(STEPS)
+    runner = WorkflowRunner(str(tmp_path / "ws"), agents, flow, agents_pkg=pkg)
+    with pytest.raises(ValueError, match="не найден"):
+        runner.resume("nope")
+
+
+def test_imported_json_memory_resumes_on_sqlite(mas_flow, tmp_path):
+    runner, run_id = _failed_run(mas_flow, tmp_path)
+    runner.close()
+    ws = tmp_path / "ws"
+
+    # без --run-id состояние попадает в последний запуск журнала
+    result = CliRunner().invoke(main, ["memory-import", "--workspace", str(ws)])
+    assert result.exit_code == 0, result.output
+    assert f"into run {run_id}" in result.output
+
+    agents, flow, pkg = mas_flow(STEPS)
+    resumed = WorkflowRunner(str(ws), agents, flow, agents_pkg=pkg, max_workers=1, memory_backend="sqlite")
+    resumed.resume(run_id)
+
+    assert _done(ws) == ["a", "f", "tail"]
+    assert next(r for r in _journal(ws) if r["event"] == "run_resume")["completed"] == ["a"]
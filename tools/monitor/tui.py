@@ -1,12 +1,15 @@
 #!/usr/bin/env python3
 # Простая TUI на rich, читает workspace/.monitor/state.json и обновляет экран
+# 🆕 --bus SOCKET: события запусков приходят от брокера (mas bus-broker) сразу, без опроса файлов
 from __future__ import annotations
 
 import argparse
 import json
 import pathlib
 import sys
+import threading
 import time
+from collections import deque
 from typing import Any, Tuple
 
 from rich.console import Console
@@ -16,6 +19,10 @@ from rich.table import Table
 
 STATE = pathlib.Path("workspace/.monitor/state.json")
 
+# 🆕 Последние события запусков из шины (--bus) и сигнал «пришло новое»
+EVENTS: deque[dict] = deque(maxlen=15)
+CHANGED = threading.Event()
+
 # Глобальная переменная для "анти-спама" в stderr: выводим ошибку только при изменении текста
 _LAST_ERR: str | None = None
 
@@ -51,6 +58,45 @@ def _safe_str(v: Any, dash: str = "—") -> str:
     return s if s else dash
 
 
+def _on_event(record: Any) -> None:
+    if isinstance(record, dict):
+        EVENTS.append(record)
+        CHANGED.set()
+
+
+def _connect_bus(path: str) -> Any:
+    """Подписка на события запусков через брокер; без пакета mas или брокера — None (TUI работает как раньше)."""
+    try:
+        from mas.core.bus_socket import SocketBus  # noqa: PLC0415 — зависимость нужна только с --bus
+
+        bus = SocketBus(path)
+    except (ImportError, ConnectionError, RuntimeError) as e:
+        print(f"[tui] bus disabled: {e}", file=sys.stderr)
+        return None
+    bus.subscribe("run.#", _on_event)
+    bus.subscribe("step.#", _on_event)
+    return bus
+
+
+def render_events() -> Table:
+    t = Table(title="Run events (bus)")
+    t.add_column("Time")
+    t.add_column("Event")
+    t.add_column("Step")
+    t.add_column("Agent")
+    t.add_column("ms")
+    for r in list(EVENTS):
+        ts = r.get("ts")
+        t.add_row(
+            time.strftime("%H:%M:%S", time.localtime(ts)) if isinstance(ts, (int, float)) else "—",
+            _safe_str(r.get("event")),
+            _safe_str(r.get("step_id")),
+            _safe_str(r.get("agent")),
+            _safe_str(r.get("duration_ms")),
+        )
+    return t
+
+
 def render() -> Tuple[Panel, Table, Table]:
     data = _read_state_safely()
 
@@ -99,7 +145,9 @@ def main():
     parser.add_argument("--once", action="store_true", help="Один кадр и выход")
     parser.add_argument("--no-clear", action="store_true", help="Не очищать экран в цикле")
     parser.add_argument("--no-screen", action="store_true", help="Не включать полноэкранный режим Live(screen=False)")
+    parser.add_argument("--bus", default=None, metavar="SOCKET", help="Сокет брокера событий (mas bus-broker), например workspace/.monitor/bus.sock")
     args = parser.parse_args()
+    bus = _connect_bus(args.bus) if args.bus else None
 
     interval = max(0.1, float(args.interval or 2.0))  # сохраняем дефолт ≈2 сек как было
     console = Console()
@@ -114,6 +162,8 @@ def main():
         console.print(p)
         console.print(a)
         console.print(b)
+        if bus is not None:
+            console.print(render_events())
 
     if args.once:
         _tick()
@@ -123,7 +173,9 @@ def main():
     with Live(refresh_per_second=int(1 / interval) if interval >= 0.5 else 2, screen=use_screen):
         while True:
             _tick()
-            time.sleep(interval)
+            # Новое событие из шины перерисовывает экран сразу, иначе — раз в interval
+            CHANGED.wait(interval)
+            CHANGED.clear()
 
 
 # -----------------------------------------------------------------------------